@@ -0,0 +1,10 @@
+"""ASGI entry point
+
+    GUNICORN_WORKER_CLASS=asgi gunicorn    # settings from gunicorn.conf.py
+    uvicorn asgi:application          # single process, for development
+"""
+from app import create_app
+from utils.asgi import WsgiToAsgi
+
+app = create_app()
+application = WsgiToAsgi(app)
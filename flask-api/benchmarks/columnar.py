@@ -0,0 +1,71 @@
+"""Payload size and serialization time: per-row JSON vs columnar binary output
+
+    python -m benchmarks.columnar
+
+Orbit rows as /api/simulation/orbital-mechanics builds them: JSON objects
+from rounded ``tolist()`` values, against ``encode_columnar`` on the same
+arrays (float64 time, float32 everything else). Sizes are also given after
+gzip level 6, as a compressing proxy would send them.
+"""
+import json
+import time
+import zlib
+
+import numpy as np
+
+from services.orbits import EARTH_RADIUS_KM, propagate
+from utils.columnar import encode_columnar, encode_msgpack, msgpack
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+REPEATS = 3
+FIELDS = (('time', 3), ('x', 2), ('y', 2), ('z', 2), ('vx', 4), ('vy', 4), ('vz', 4), ('velocity', 4), ('altitude', 2))
+
+
+def orbit_columns(samples: int):
+    elements = {'a': EARTH_RADIUS_KM + 408.0, 'e': 0.0005, 'i': np.radians(51.6), 'raan': 0.0, 'argp': 0.0,
+                'mean_anomaly': 0.0}
+    times = np.linspace(0.0, 86400.0, samples)
+    positions, velocities = propagate(elements, times)
+    r, v = positions[0], velocities[0]
+    return {
+        'time': times, 'x': r[:, 0], 'y': r[:, 1], 'z': r[:, 2], 'vx': v[:, 0], 'vy': v[:, 1], 'vz': v[:, 2],
+        'velocity': np.linalg.norm(v, axis=1), 'altitude': np.linalg.norm(r, axis=1) - EARTH_RADIUS_KM,
+    }
+
+
+def as_json(columns) -> bytes:
+    names = [name for name, _ in FIELDS]
+    rows = zip(range(len(columns['time'])), *(columns[name].round(decimals).tolist() for name, decimals in FIELDS))
+    return json.dumps({'orbital_data': [dict(zip(['time_step'] + names, row)) for row in rows]}).encode()
+
+
+def as_columnar(columns) -> bytes:
+    body = encode_columnar({name: column if name == 'time' else column.astype(np.float32)
+                            for name, column in columns.items()})
+    return b''.join(body)
+
+
+def as_msgpack(columns) -> bytes:
+    return encode_msgpack({name: column if name == 'time' else column.astype(np.float32)
+                           for name, column in columns.items()})
+
+
+def best_of(fn, repeats: int = REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == '__main__':
+    encoders = [('json', as_json), ('columnar', as_columnar)] + ([('msgpack', as_msgpack)] if msgpack else [])
+    print(f"{'points':>9} {'format':>9} {'ms':>9} {'MB':>8} {'gzip MB':>8} {'bytes/pt':>9}")
+    for n in SIZES:
+        columns = orbit_columns(n)
+        for name, encode in encoders:
+            elapsed, body = best_of(lambda: encode(columns), 1 if n >= 1_000_000 and name == 'json' else REPEATS)
+            compressed = len(zlib.compress(body, 6))
+            print(f'{n:>9} {name:>9} {elapsed * 1000:>9.2f} {len(body) / 1e6:>8.2f} {compressed / 1e6:>8.2f} '
+                  f'{len(body) / n:>9.1f}')
@@ -0,0 +1,42 @@
+"""All-vs-all close-approach search: O(n^2) brute force against the uniform grid index
+
+    python -m benchmarks.conjunctions
+"""
+import datetime
+import time
+
+from services.debris import MAX_RELATIVE_SPEED, DebrisCatalog, screen_conjunctions
+from services.spatial_index import SpatialGrid, brute_force_pairs
+
+SIZES = [1_000, 10_000, 50_000]
+THRESHOLD_KM = 10.0
+STEP = 30.0
+WHEN = datetime.datetime(2026, 10, 17, tzinfo=datetime.timezone.utc)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    # Per sample, screening looks for pairs that could close to THRESHOLD_KM before the next sample
+    radius = THRESHOLD_KM + MAX_RELATIVE_SPEED * STEP / 2
+    print(f'one epoch, pairs within {radius:g} km')
+    print(f"{'objects':>8} {'pairs':>8} {'brute s':>9} {'grid s':>8} {'speed-up':>9} {'same':>5}")
+    for n in SIZES:
+        positions, _ = DebrisCatalog.synthetic(n).objects.state_at(WHEN.timestamp())
+        brute_seconds, brute = timed(lambda: brute_force_pairs(positions, radius))
+        grid_seconds, indexed = timed(lambda: SpatialGrid(positions, radius).pairs_within(radius))
+        same = set(zip(*map(list, brute))) == set(zip(*map(list, indexed)))
+        print(f'{n:>8} {len(indexed[0]):>8} {brute_seconds:>9.3f} {grid_seconds:>8.3f} '
+              f'{brute_seconds / grid_seconds:>8.0f}x {str(same):>5}')
+
+    print(f'\nfull screening, 10 minute window every {STEP:g} s, threshold {THRESHOLD_KM:g} km')
+    print(f"{'objects':>8} {'conjunctions':>13} {'seconds':>8}")
+    for n in SIZES:
+        catalog = DebrisCatalog.synthetic(n)
+        seconds, found = timed(lambda: screen_conjunctions(catalog.objects, WHEN.timestamp(), 600.0, STEP,
+                                                           THRESHOLD_KM))
+        print(f'{n:>8} {len(found):>13} {seconds:>8.2f}')
@@ -0,0 +1,138 @@
+"""Conversation log: enqueue cost, writer throughput, and chat latency with 5k records/s flowing through the log
+
+    python -m benchmarks.conversation_log [seconds]
+
+Part one floods the log from four threads and reports what ``log()`` costs
+the caller and how fast the writer persists records (fsync on). Part two
+runs chat requests through the Flask test client while a load thread
+pushes LOAD_RATE records/s into the same log, standing in for the rest of
+the traffic; the chat requests are logged too. A synchronous fsync'd write
+per message is measured the same way for contrast.
+"""
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import routes.ai_chat as chat
+from app import create_app
+from services.conversation_log import SINKS, ConversationLog, JsonlSink
+
+FLOOD_RECORDS = 200_000
+FLOOD_THREADS = 4
+LOAD_RATE = 5000
+CHAT_MESSAGES = ['How does a rocket work?', 'Tell me about the ISS', 'What is space debris?', 'Life on Mars']
+
+
+class NullSink(JsonlSink):
+    """Takes batches without serializing or writing them: the cost of the queue and writer thread alone"""
+
+    def _open(self, path):
+        pass
+
+    def _append(self, records):
+        return 0
+
+    def _close(self):
+        pass
+
+
+def record(i: int) -> dict:
+    return {'user_id': f'user-{i % 1000}', 'user_message': f'{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} {i}',
+            'bot_response': 'Rockets work on the principle of action and reaction. ' * 4, 'confidence': 0.85,
+            'timestamp': '2026-01-01T00:00:00'}
+
+
+def flood(kind: str, directory: str) -> None:
+    log = ConversationLog(SINKS[kind](directory), max_queue=FLOOD_RECORDS)
+    per_thread = FLOOD_RECORDS // FLOOD_THREADS
+    latencies = np.empty(FLOOD_RECORDS)
+
+    def produce(offset):
+        for i in range(offset, offset + per_thread):
+            start = time.perf_counter()
+            log.log(record(i))
+            latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(n * per_thread,)) for n in range(FLOOD_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    enqueued = time.perf_counter() - start
+    log.flush()
+    elapsed = time.perf_counter() - start
+    stats = log.stats()
+    print(f'{kind:>6}: log() p50 {np.percentile(latencies, 50) * 1e6:.1f} us, '
+          f'p99 {np.percentile(latencies, 99) * 1e6:.1f} us; '
+          f'{FLOOD_RECORDS / enqueued:,.0f} records/s enqueued, {stats["written"] / elapsed:,.0f} records/s written '
+          f'in {stats["batches"]} batches (avg {stats["avg_write_ms"]:.1f} ms each), {stats["dropped"]} dropped')
+    log.close()
+
+
+def background_load(log: ConversationLog, stop: threading.Event, sent: list) -> None:
+    """LOAD_RATE records/s in 1 ms ticks"""
+    start = time.perf_counter()
+    i = 0
+    while not stop.is_set():
+        due = int((time.perf_counter() - start) * LOAD_RATE)
+        while i < due:
+            log.log(record(i))
+            i += 1
+        time.sleep(0.001)
+    sent.append(i / (time.perf_counter() - start))
+
+
+def chat_latency(seconds: float, directory: str) -> None:
+    print(f'{"chat latency":>40} {"p50 ms":>8} {"p99 ms":>8} {"log records/s":>14}')
+    for label, kind in [('log off', 'off'), ('5k records/s into a null sink', 'null'),
+                        ('jsonl, 5k records/s', 'jsonl'), ('sqlite, 5k records/s', 'sqlite'),
+                        ('synchronous fsync per message', 'sync')]:
+        log_format = {'null': 'jsonl', 'sync': 'off'}.get(kind, kind)
+        app = create_app({'CONVERSATION_LOG': log_format, 'CONVERSATION_LOG_DIR': directory, 'CHAT_CACHE_SIZE': 0,
+                          'METRICS_ENABLED': False, 'SPACE_WEATHER_INTERVAL': 3600.0})
+        client = app.test_client()
+        log = chat.chat_log
+        sync_sink = JsonlSink(f'{directory}/sync') if kind == 'sync' else None
+        if kind == 'null':
+            log.sink = NullSink(directory)
+        stop, sent = threading.Event(), []
+        loader = None
+        if log is not None:
+            loader = threading.Thread(target=background_load, args=(log, stop, sent))
+            loader.start()
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < deadline:
+            message = f'{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} {i}'
+            start = time.perf_counter()
+            client.post('/api/ai/chat', json={'message': message})
+            if sync_sink is not None:
+                sync_sink.write([record(i)])
+            latencies.append(time.perf_counter() - start)
+            i += 1
+        stop.set()
+        if loader is not None:
+            loader.join()
+        if log is not None:
+            log.flush()
+        rate = f'{sent[0] + len(latencies) / seconds:,.0f}' if sent else '-'
+        print(f'{label:>40} {np.percentile(latencies, 50) * 1e3:8.3f} {np.percentile(latencies, 99) * 1e3:8.3f} '
+              f'{rate:>14}')
+        if log is not None:
+            stats = log.stats()
+            print(f'{"":>40} written {stats["written"]:,}, dropped {stats["dropped"]}, '
+                  f'max queue depth {stats["max_queue_depth"]:,}')
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    with tempfile.TemporaryDirectory() as directory:
+        print(f'{FLOOD_RECORDS:,} records from {FLOOD_THREADS} threads, fsync per batch:')
+        for kind in SINKS:
+            flood(kind, f'{directory}/{kind}')
+        chat_latency(seconds, directory)
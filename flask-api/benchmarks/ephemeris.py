@@ -0,0 +1,90 @@
+"""Ephemeris startup cost, query speed, interpolation error and memory sharing
+
+    python -m benchmarks.ephemeris
+
+Memory sharing is read from /proc/self/smaps, so that part needs Linux.
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from services.ephemeris import BODIES, STATES, Ephemeris, generate_states
+
+WORKERS = 4
+QUERY_EPOCHS = [1, 100, 10_000]
+
+
+def mapping_usage(path: str) -> dict:
+    """kB of Rss, Pss and private pages in this process's mappings of ``path``"""
+    usage = dict.fromkeys(('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'), 0)
+    current = None
+    with open('/proc/self/smaps') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if ' ' in key or '-' in key:
+                current = line.split()[-1] if len(line.split()) >= 6 else None
+            elif current == path and key in usage:
+                usage[key] += int(rest.split()[0])
+    return usage
+
+
+def worker(directory: str, barrier, results) -> None:
+    ephemeris = Ephemeris.load(directory)
+    float(np.asarray(ephemeris.states).sum())  # touch every page
+    barrier.wait()  # every worker has the file mapped now
+    results.put(mapping_usage(os.path.realpath(os.path.join(directory, STATES))))
+    barrier.wait()
+
+
+def memory_sharing(directory: str) -> None:
+    barrier = multiprocessing.Barrier(WORKERS)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(directory, barrier, results)) for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+    usage = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    print(f'{WORKERS} workers, kB per worker for the mapped tables:')
+    for key in usage[0]:
+        print(f"  {key:>14}: {', '.join(str(worker_usage[key]) for worker_usage in usage)}")
+    # Pss splits shared pages between the processes mapping them
+    print(f"  {'Pss total':>14}: {sum(worker_usage['Pss'] for worker_usage in usage)}")
+
+
+if __name__ == '__main__':
+    directory = tempfile.mkdtemp(prefix='ephemeris-')
+    start = time.perf_counter()
+    built = Ephemeris.build()
+    build_s = time.perf_counter() - start
+    built.save(directory)
+    del built
+    start = time.perf_counter()
+    ephemeris = Ephemeris.load(directory)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f'build {build_s:.2f} s, {ephemeris.states.nbytes / 1e6:.1f} MB; load (mmap) {load_ms:.2f} ms')
+
+    print(f"{'epochs':>8} {'all bodies ms':>14}")
+    rng = np.random.default_rng(2)
+    for n in QUERY_EPOCHS:
+        times = rng.uniform(ephemeris.start, ephemeris.end, n)
+        timings = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            for body in ephemeris.bodies:
+                ephemeris.state(body, times)
+            timings.append(time.perf_counter() - t0)
+        print(f'{n:>8} {min(timings) * 1000:>14.2f}')
+
+    print(f"{'body':>9} {'max error km':>13}")
+    times = rng.uniform(ephemeris.start, ephemeris.end, 20_000)
+    for body in BODIES:
+        position, _ = ephemeris._relative_state(ephemeris.bodies[body.name], times)
+        error = np.abs(position - generate_states(body, times)[:, :3]).max()
+        print(f'{body.name:>9} {error:>13.3f}')
+
+    if os.path.exists('/proc/self/smaps'):
+        memory_sharing(directory)
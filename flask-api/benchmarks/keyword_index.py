@@ -0,0 +1,82 @@
+"""Compare the per-topic substring scan with the precompiled KeywordIndex
+
+Run from the flask-api directory:
+
+    python -m benchmarks.keyword_index
+"""
+import random
+import string
+import time
+
+from services.keyword_index import KeywordIndex
+from services.ml_model import SpaceKnowledgeBot
+
+KEYWORD_COUNTS = [100, 1000, 10000]
+KEYWORDS_PER_TOPIC = 10
+MESSAGES = 200
+
+
+def _synthetic_keywords(count: int, rng: random.Random):
+    keywords = set()
+    while len(keywords) < count:
+        length = rng.randint(3, 9)
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+        if rng.random() < 0.1:
+            word += ' ' + ''.join(rng.choice(string.ascii_lowercase) for _ in range(4))
+        keywords.add(word)
+    return sorted(keywords)
+
+
+def _synthetic_messages(keywords, rng: random.Random):
+    filler = ['how', 'does', 'the', 'a', 'work', 'in', 'space', 'tell', 'me', 'about', 'what', 'is']
+    messages = []
+    for _ in range(MESSAGES):
+        words = [rng.choice(filler) for _ in range(rng.randint(4, 14))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        messages.append(' '.join(words))
+    return messages
+
+
+def run(keyword_count: int, seed: int = 7):
+    rng = random.Random(seed)
+    keywords = _synthetic_keywords(keyword_count, rng)
+    topics = {
+        f'topic_{i // KEYWORDS_PER_TOPIC}': keywords[i:i + KEYWORDS_PER_TOPIC]
+        for i in range(0, len(keywords), KEYWORDS_PER_TOPIC)
+    }
+    messages = _synthetic_messages(keywords, rng)
+    bot = SpaceKnowledgeBot()
+
+    start = time.perf_counter()
+    index = KeywordIndex(topics)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan_scores = [
+        [bot._calculate_confidence(message, kws) for kws in topics.values()]
+        for message in messages
+    ]
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_scores = [index.score(message) for message in messages]
+    index_seconds = time.perf_counter() - start
+
+    assert scan_scores == index_scores, 'KeywordIndex diverged from the reference scan'
+    return {
+        'keywords': keyword_count,
+        'topics': len(topics),
+        'build_ms': build_seconds * 1000,
+        'scan_us_per_msg': scan_seconds / MESSAGES * 1e6,
+        'index_us_per_msg': index_seconds / MESSAGES * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    print(f"{'keywords':>9} {'topics':>7} {'build ms':>9} {'scan us/msg':>12} {'index us/msg':>13} {'speedup':>8}")
+    for count in KEYWORD_COUNTS:
+        r = run(count)
+        speedup = r['scan_us_per_msg'] / r['index_us_per_msg']
+        print(f"{r['keywords']:>9} {r['topics']:>7} {r['build_ms']:>9.1f} "
+              f"{r['scan_us_per_msg']:>12.1f} {r['index_us_per_msg']:>13.1f} {speedup:>7.1f}x")
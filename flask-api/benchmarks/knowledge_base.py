@@ -0,0 +1,101 @@
+"""Cold-start time and memory of the file-backed knowledge base
+
+Each size is loaded in a fresh interpreter so RSS numbers (Linux, from
+/proc/self/statm) are not polluted by earlier runs. "load" is reading the index and shard offsets, "total" adds the
+KeywordIndex build. The eager columns parse every shard line up front, which is
+what an in-memory dict knowledge base costs.
+
+    python -m benchmarks.knowledge_base
+"""
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+
+from services.knowledge_base import write_shards
+
+SIZES = [1000, 10000, 100000]
+
+_CHILD = r'''
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+
+def rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+rss_before = rss_kb()
+start = time.perf_counter()
+if sys.argv[2] == 'lazy':
+    from services.knowledge_base import KnowledgeBase
+    from services.keyword_index import KeywordIndex
+    kb = KnowledgeBase(sys.argv[1])
+    kb_seconds = time.perf_counter() - start
+    index = KeywordIndex(kb.keywords())
+    kb.topic(kb.topic_ids()[-1])
+else:
+    from services.keyword_index import KeywordIndex
+    topics = {}
+    for name in sorted(os.listdir(sys.argv[1])):
+        if name.startswith('responses-'):
+            with open(os.path.join(sys.argv[1], name), encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    topics[record['topic']] = record
+    kb_seconds = time.perf_counter() - start
+    with open(os.path.join(sys.argv[1], 'topics.jsonl'), encoding='utf-8') as f:
+        keywords = {e['id']: e['keywords'] for e in map(json.loads, f)}
+    index = KeywordIndex(keywords)
+elapsed = time.perf_counter() - start
+rss_after = rss_kb()
+print(json.dumps({'seconds': elapsed, 'kb_seconds': kb_seconds, 'rss_kb': rss_after - rss_before}))
+'''
+
+
+VOCABULARY_SIZE = 50000
+
+
+def _random_text(rng: random.Random, vocabulary, words: int) -> str:
+    return ' '.join(rng.choices(vocabulary, k=words))
+
+
+def build_corpus(directory: str, entries: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    vocabulary = sorted({
+        ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(VOCABULARY_SIZE)
+    })
+    topics = {}
+    for i in range(entries):
+        keywords = rng.sample(vocabulary, 4)
+        topics[f'topic_{i}'] = {
+            'keywords': keywords,
+            'name': f'Topic {i}',
+            'description': _random_text(rng, vocabulary, 12),
+            'examples': keywords[:2],
+            'suggestions': [_random_text(rng, vocabulary, 6) + '?' for _ in range(3)],
+            'responses': {kw: _random_text(rng, vocabulary, 60) for kw in keywords[:3]},
+        }
+    write_shards(directory, topics)
+
+
+def measure(directory: str, mode: str) -> dict:
+    output = subprocess.check_output([sys.executable, '-c', _CHILD, directory, mode], text=True)
+    return json.loads(output)
+
+
+if __name__ == '__main__':
+    print(f"{'entries':>8} {'disk MB':>8} {'lazy load s':>12} {'lazy total s':>13} {'lazy RSS MB':>12} "
+          f"{'eager load s':>13} {'eager total s':>14} {'eager RSS MB':>13}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            build_corpus(directory, size)
+            disk = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+            lazy = measure(directory, 'lazy')
+            eager = measure(directory, 'eager')
+            print(f"{size:>8} {disk / 2**20:>8.1f} {lazy['kb_seconds']:>12.2f} {lazy['seconds']:>13.2f} "
+                  f"{lazy['rss_kb'] / 1024:>12.1f} {eager['kb_seconds']:>13.2f} {eager['seconds']:>14.2f} "
+                  f"{eager['rss_kb'] / 1024:>13.1f}")
@@ -0,0 +1,248 @@
+"""Load test: mixed traffic through the app's WSGI interface and through a local HTTP server
+
+    python -m benchmarks.load [--target wsgi|http|both] [--seconds 10] [--concurrency 8]
+                              [--save results.json] [--compare baseline.json] [--threshold 0.25]
+
+``concurrency`` closed-loop clients each send the next request of MIX as
+soon as the previous one returns, for WARMUP_SECONDS and then ``seconds``
+measured. The "wsgi" target calls the app in this process with
+``run_wsgi_app``, which includes building the environ, as a server would; the
+"http" target starts the threaded werkzeug server in a child process and
+talks to it over keep-alive connections. The app runs with its production
+settings (caches, sessions, conversation log, metrics all on), with data
+directories in a temporary directory. Parameters vary per request from a
+seeded generator, so caches see the mix of hits and misses real clients
+would cause.
+
+Throughput and p50/p95/p99 latency are reported overall and per endpoint.
+With ``--compare``, throughput and p95 of the overall run and of every
+endpoint with at least MIN_COMPARED_REQUESTS requests are checked against
+the baseline file; the run exits with status 1 when one is worse by more
+than ``--threshold``.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import results
+
+WARMUP_SECONDS = 2.0
+MIN_COMPARED_REQUESTS = 200
+COMPARED = ('throughput', 'p95_ms')
+USERS = 500
+CHAT_MESSAGES = [
+    'Tell me about Mars', 'what about its moons?', 'How do astronauts sleep', 'what do they eat?',
+    'Tell me about the ISS', 'how fast does it go?', 'How does a rocket work?', 'what fuel does it use?',
+    'Tell me about black holes', 'What were the Apollo missions?', 'How far away is Jupiter?', 'hello',
+]
+BODY_SETS = ['earth,mars', 'earth,moon', 'mercury,venus,earth,mars', 'jupiter,saturn', '']
+
+
+def _chat(rng):
+    body = {'message': rng.choice(CHAT_MESSAGES), 'user_id': f'user-{rng.randrange(USERS)}'}
+    return 'POST', '/api/ai/chat', json.dumps(body).encode('utf-8')
+
+
+def _trajectory(rng):
+    return 'GET', (f'/api/simulation/rocket-trajectory?dry_mass={rng.choice([15000, 20000, 25000, 30000])}'
+                   f'&dt={rng.choice([0.05, 0.1, 0.2])}'), None
+
+
+def _orbit(rng):
+    return 'GET', (f'/api/simulation/orbital-mechanics?altitude={rng.randrange(300, 2000, 50)}'
+                   f'&inclination={rng.choice([0, 28.5, 51.6, 97.8])}'), None
+
+
+def _ephemeris(rng):
+    bodies = rng.choice(BODY_SETS)
+    if rng.random() < 0.5:
+        return 'GET', f'/api/simulation/ephemeris?bodies={bodies}', None
+    year = rng.randrange(2026, 2036)
+    return 'GET', f'/api/simulation/ephemeris?bodies={bodies}&start={year}-01-01&end={year + 1}-01-01&samples=365', None
+
+
+def _fixed(path):
+    return lambda rng: ('GET', path, None)
+
+
+# (weight, endpoint, request maker)
+MIX = [
+    (30, 'chat', _chat),
+    (15, 'satellites', lambda rng: ('GET', f'/api/nasa/satellites?page={rng.randrange(1, 6)}', None)),
+    (10, 'iss', _fixed('/api/nasa/iss')),
+    (10, 'rocket-trajectory', _trajectory),
+    (10, 'orbital-mechanics', _orbit),
+    (8, 'ephemeris', _ephemeris),
+    (5, 'space-weather', _fixed('/api/simulation/space-weather')),
+    (5, 'passes', _fixed('/api/nasa/passes')),
+    (4, 'astronauts', _fixed('/api/astronauts/current')),
+    (2, 'monte-carlo', lambda rng: ('GET', f'/api/simulation/monte-carlo?runs=200&seed={rng.randrange(10)}', None)),
+    (1, 'debris', _fixed('/api/space/debris')),
+]
+
+
+def build_app(directory: str):
+    from app import create_app
+    return create_app({
+        'SIMULATION_CACHE_DIR': os.path.join(directory, 'simulation-cache'),
+        'CONVERSATION_LOG_DIR': os.path.join(directory, 'conversations'),
+    })
+
+
+def serve(directory: str) -> None:
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, build_app(directory), threaded=True)
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def wsgi_sender(app):
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+    def send(method, path, body):
+        environ = EnvironBuilder(path=path, method=method, data=body,
+                                 content_type='application/json' if body else None).get_environ()
+        app_iter, status, _ = run_wsgi_app(app, environ)
+        try:
+            for _ in app_iter:
+                pass
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        return int(status.split(None, 1)[0])
+
+    return lambda: send
+
+
+def http_sender(port: int):
+    def connect():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+        def send(method, path, body):
+            try:
+                connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                return 0
+
+        return send
+
+    return connect
+
+
+def drive(connect, seconds: float, concurrency: int, seed: int = 0):
+    """(endpoint index, latency in seconds, status) of every request sent after the warm-up"""
+    endpoints = [index for index, (weight, _, _) in enumerate(MIX) for _ in range(weight)]
+    samples = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from, stop = start + WARMUP_SECONDS, start + WARMUP_SECONDS + seconds
+
+    def client(client_seed):
+        rng = random.Random(client_seed)
+        send = connect()
+        mine = []
+        while True:
+            index = rng.choice(endpoints)
+            method, path, body = MIX[index][2](rng)
+            began = time.perf_counter()
+            if began >= stop:
+                break
+            status = send(method, path, body)
+            if began >= measure_from:
+                mine.append((index, time.perf_counter() - began, status))
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(seed * 1000 + i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(target: str, samples, seconds: float):
+    def figures(rows):
+        latencies = np.array([latency for _, latency, status in rows if status == 200]) * 1e3
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        return {'requests': len(rows), 'errors': sum(status != 200 for _, _, status in rows),
+                'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+    summary = {target: {'throughput': sum(status == 200 for _, _, status in samples) / seconds, **figures(samples)}}
+    for index, (_, endpoint, _) in enumerate(MIX):
+        rows = [row for row in samples if row[0] == index]
+        if rows:
+            summary[f'{target} {endpoint}'] = figures(rows)
+    return summary
+
+
+def report(summary) -> None:
+    print(f'{"":>28} {"req/s":>8} {"requests":>9} {"errors":>7} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for name, row in summary.items():
+        throughput = f'{row["throughput"]:8.1f}' if 'throughput' in row else ''
+        print(f'{name:>28} {throughput:>8} {row["requests"]:>9} {row["errors"]:>7} {row["p50_ms"]:>8.2f} '
+              f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f}')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description=__doc__.split('\n')[0])
+    parser.add_argument('--target', choices=['wsgi', 'http', 'both'], default='both')
+    parser.add_argument('--seconds', type=float, default=10.0, help='measured seconds per target')
+    parser.add_argument('--concurrency', type=int, default=8, help='closed-loop clients')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to check the results against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='change that fails the run (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    print(f'{args.seconds:.0f} s per target, {args.concurrency} clients, mix: '
+          + ', '.join(f'{weight}% {endpoint}' for weight, endpoint, _ in MIX))
+    measured = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if args.target in ('wsgi', 'both'):
+            samples = drive(wsgi_sender(build_app(os.path.join(directory, 'wsgi'))), args.seconds,
+                            args.concurrency, args.seed)
+            measured.update(summarize('wsgi', samples, args.seconds))
+        if args.target in ('http', 'both'):
+            server = subprocess.Popen([sys.executable, '-m', 'benchmarks.load', '--serve',
+                                       os.path.join(directory, 'http')],
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            try:
+                port = int(server.stdout.readline())
+                samples = drive(http_sender(port), args.seconds, args.concurrency, args.seed)
+            finally:
+                server.terminate()
+                server.wait()
+            measured.update(summarize('http', samples, args.seconds))
+    report(measured)
+
+    if args.save:
+        results.save(args.save, 'load', measured)
+    if args.compare:
+        compared = {name: row for name, row in measured.items() if row['requests'] >= MIN_COMPARED_REQUESTS}
+        regressions = results.compare(results.load(args.compare, 'load'), compared, COMPARED, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) over {args.threshold:.0%}:\n  '
+                  + '\n  '.join(regressions.values()))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve(sys.argv[2])
+    else:
+        sys.exit(main())
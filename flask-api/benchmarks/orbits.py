@@ -0,0 +1,41 @@
+"""Vectorized Kepler propagation of many objects to many epochs
+
+    python -m benchmarks.orbits
+"""
+import time
+
+import numpy as np
+
+from services.orbits import EARTH_RADIUS_KM, propagate
+
+CASES = [(1_000, 1_000), (10_000, 100), (10_000, 1_000)]
+
+
+def random_elements(n: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return {
+        'a': EARTH_RADIUS_KM + rng.uniform(300, 36000, n),
+        'e': rng.uniform(0, 0.3, n),
+        'i': rng.uniform(0, np.pi, n),
+        'raan': rng.uniform(0, 2 * np.pi, n),
+        'argp': rng.uniform(0, 2 * np.pi, n),
+        'mean_anomaly': rng.uniform(0, 2 * np.pi, n),
+    }
+
+
+def run(objects: int, epochs: int, with_velocity: bool, dtype) -> float:
+    elements = random_elements(objects)
+    times = np.linspace(0, 86400, epochs)
+    start = time.perf_counter()
+    propagate(elements, times, with_velocity=with_velocity, dtype=dtype)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f"{'objects':>8} {'epochs':>7} {'output':>18} {'seconds':>8} {'M states/s':>11}")
+    for objects, epochs in CASES:
+        for with_velocity, dtype, label in [(False, np.float64, 'r float64'),
+                                            (True, np.float32, 'r+v float32'),
+                                            (True, np.float64, 'r+v float64')]:
+            seconds = run(objects, epochs, with_velocity, dtype)
+            print(f'{objects:>8} {epochs:>7} {label:>18} {seconds:>8.2f} {objects * epochs / seconds / 1e6:>11.1f}')
@@ -0,0 +1,52 @@
+"""Porkchop grid: Lambert solves per second and wall time against grid size, serial and on the process pool
+
+    python -m benchmarks.porkchop [workers]
+
+Earth to Mars over the 2026 opportunity, departures 2026-09-01..2027-02-01
+against arrivals 2027-06-01..2028-03-01. The pool is started before timing,
+so its columns are warm-pool times; the first call also pays for spawning
+the workers.
+"""
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+from services.ephemeris import Ephemeris
+from services.lambert import porkchop
+
+SIZES = [100, 250, 500, 1000]
+REPEATS = 3
+
+
+def unix(text: str) -> float:
+    return datetime.datetime.fromisoformat(text).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def best_seconds(ephemeris, departures, arrivals, workers):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = porkchop(ephemeris, 'earth', 'mars', departures, arrivals, workers=workers)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    ephemeris = Ephemeris.open()
+    if workers > 1:
+        grid = np.linspace(unix('2026-09-01'), unix('2027-02-01'), 1000)
+        porkchop(ephemeris, 'earth', 'mars', grid, grid + 300 * 86400.0, workers=workers)
+    print(f'{"grid":>11} {"serial s":>9} {"Mcells/s":>9} {f"pool x{workers} s":>13} {"best dv km/s":>13} '
+          f'{"C3":>7} {"days":>6}')
+    for size in SIZES:
+        departures = np.linspace(unix('2026-09-01'), unix('2027-02-01'), size)
+        arrivals = np.linspace(unix('2027-06-01'), unix('2028-03-01'), size)
+        serial, result = best_seconds(ephemeris, departures, arrivals, 1)
+        pooled = f'{best_seconds(ephemeris, departures, arrivals, workers)[0]:13.3f}' if workers > 1 else f'{"-":>13}'
+        best = result.best()
+        print(f'{size:>5} x {size:<4} {serial:9.3f} {size * size / serial / 1e6:9.2f} {pooled} {best["delta_v"]:13.3f} '
+              f'{best["c3"]:7.2f} {best["time_of_flight_days"]:6.0f}')
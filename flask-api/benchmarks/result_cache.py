@@ -0,0 +1,62 @@
+"""Simulation result cache: request time computed, from memory, from the disk tier, and as a 304
+
+    python -m benchmarks.result_cache
+
+Requests go through the Flask test client. "disk" empties the memory tier
+before every request, as a worker that has not served the result yet
+would see it; results faster than SIMULATION_CACHE_MIN_DISK_MS are not
+written to disk and show "-".
+"""
+import tempfile
+import time
+
+import numpy as np
+
+import routes.simulation as simulation
+from app import create_app
+
+REPEAT = 50
+URLS = [
+    ('default trajectory', '/api/simulation/rocket-trajectory'),
+    ('trajectory, dt=0.005', '/api/simulation/rocket-trajectory?dt=0.005&points=1000'),
+    ('default orbit', '/api/simulation/orbital-mechanics'),
+    ('orbit, 10k samples', '/api/simulation/orbital-mechanics?samples=10000&format=columnar'),
+    ('Monte Carlo, 1000 runs', '/api/simulation/monte-carlo'),
+    ('ephemeris, 1 year', '/api/simulation/ephemeris?start=2030-01-01&end=2031-01-01&samples=1000'),
+]
+
+
+def median_ms(client, url, repeat, before=None, headers=None):
+    times = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e3, response
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({'SIMULATION_CACHE_DIR': directory, 'CONVERSATION_LOG': 'off', 'METRICS_ENABLED': False,
+                          'SPACE_WEATHER_INTERVAL': 3600.0})
+        client = app.test_client()
+        cache = simulation.result_cache
+        print(f'{"request":>24} {"computed":>10} {"memory":>9} {"disk":>9} {"304":>9}')
+        for label, url in URLS:
+            repeat = 5 if 'monte' in url else REPEAT
+            simulation.result_cache = None
+            computed, _ = median_ms(client, url, repeat)
+            simulation.result_cache = cache
+            writes = cache.disk_writes
+            memory, response = median_ms(client, url, REPEAT)
+            disk = '-'
+            if cache.disk_writes > writes:
+                disk_ms, _ = median_ms(client, url, REPEAT, before=cache.memory.clear)
+                disk = f'{disk_ms:6.2f} ms'
+            not_modified, reply = median_ms(client, url, REPEAT, headers={'If-None-Match': response.headers['ETag']})
+            assert reply.status_code == 304
+            print(f'{label:>24} {computed:7.2f} ms {memory:6.2f} ms {disk:>9} {not_modified:6.3f} ms')
+        stats = cache.stats()
+        print(f'disk tier: {stats["disk_writes"]} results written, {stats["disk_bytes"]:,} bytes')
@@ -0,0 +1,88 @@
+"""Benchmark results as JSON files, and comparison of a run against a saved baseline
+
+Shared by benchmarks.suite and benchmarks.load. A results file records the
+suite, the environment it ran in, and one flat dict of metrics per
+benchmark. ``compare`` prints the change of each compared metric and returns
+the ones that got worse by more than the threshold; the runners exit non-zero
+when there are any.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+# Direction of every metric that can be compared
+LOWER_IS_BETTER = {'min_ms', 'median_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'}
+HIGHER_IS_BETTER = {'ops', 'throughput'}
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+        'argv': sys.argv[1:],
+    }
+
+
+def save(path: str, suite: str, results: Dict[str, Dict[str, Any]]) -> None:
+    document = {
+        'suite': suite,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'environment': environment(),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+
+
+def load(path: str, suite: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        document = json.load(f)
+    if document.get('suite') != suite:
+        raise ValueError(f"{path} holds '{document.get('suite')}' results, not '{suite}'")
+    return document['results']
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], results: Dict[str, Dict[str, Any]], metrics: Sequence[str],
+            threshold: float, show: bool = True) -> Dict[str, str]:
+    """Benchmarks with a metric more than ``threshold`` (a fraction) worse than the baseline, with what changed
+
+    With ``show``, every compared metric is printed along the way.
+    """
+    regressions = {}
+    if show:
+        print(f'{"benchmark":>40} {"metric":>11} {"baseline":>11} {"current":>11} {"change":>8}')
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            if show:
+                print(f'{name:>40} {"":>11} {"":>11} {"":>11} {"new":>8}')
+            continue
+        for metric in metrics:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1.0
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            if show:
+                flag = '  REGRESSION' if worse else ''
+                print(f'{name:>40} {metric:>11} {old:>11.4g} {new:>11.4g} {change:>+7.1%}{flag}')
+            if worse:
+                text = f'{metric}: {old:.4g} -> {new:.4g} ({change:+.1%})'
+                regressions[name] = f'{regressions[name]}, {text}' if name in regressions else f'{name} {text}'
+    return regressions
@@ -0,0 +1,49 @@
+"""Propagating a whole synthetic TLE catalog to one epoch
+
+    python -m benchmarks.satellite_catalog
+"""
+import datetime
+import time
+
+import numpy as np
+
+from services.satellite_catalog import ELEMENTS, REV_PER_DAY, SatelliteCatalog
+
+SIZES = [1_000, 10_000, 30_000, 100_000]
+REPEATS = 5
+
+
+def synthetic_catalog(n: int, seed: int = 9) -> SatelliteCatalog:
+    """LEO-heavy population with some MEO/GEO objects, epochs spread over two weeks"""
+    rng = np.random.default_rng(seed)
+    rev_per_day = np.where(rng.random(n) < 0.85, rng.uniform(11.5, 16.0, n), rng.uniform(1.0, 2.1, n))
+    elements = np.empty((n, len(ELEMENTS)))
+    elements[:, 0] = datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc).timestamp() + rng.uniform(0, 14 * 86400, n)
+    elements[:, 1] = rng.uniform(0, np.pi, n)
+    elements[:, 2] = rng.uniform(0, 2 * np.pi, n)
+    elements[:, 3] = rng.uniform(0, 0.05, n)
+    elements[:, 4] = rng.uniform(0, 2 * np.pi, n)
+    elements[:, 5] = rng.uniform(0, 2 * np.pi, n)
+    elements[:, 6] = rev_per_day * REV_PER_DAY
+    elements[:, 7] = rng.uniform(0, 1e-4, n) * REV_PER_DAY / 86400.0
+    return SatelliteCatalog.from_arrays(np.arange(n), [f'OBJECT {i}' for i in range(n)],
+                                        np.zeros(n, dtype=int), ['Synthetic'], elements)
+
+
+def best_of(fn, repeats: int = REPEATS) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    when = datetime.datetime(2026, 10, 17, tzinfo=datetime.timezone.utc)
+    print(f"{'objects':>8} {'r+v+geodetic ms':>16} {'r+geodetic ms':>14}")
+    for n in SIZES:
+        catalog = synthetic_catalog(n)
+        full = best_of(lambda: catalog.propagate(when))
+        positions = best_of(lambda: catalog.propagate(when, with_velocity=False))
+        print(f'{n:>8} {full * 1000:>16.1f} {positions * 1000:>14.1f}')
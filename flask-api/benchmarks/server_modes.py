@@ -0,0 +1,177 @@
+"""Throughput of each server mode on a fixed request mix
+
+    python -m benchmarks.server_modes [seconds] [connections] [workers]
+
+Every mode serves the production app plus /bench/upstream, which sleeps
+UPSTREAM_SECONDS to stand in for a call to an upstream API. Each server
+is started in turn, warmed up, then driven by the same closed-loop client:
+``connections`` threads with keep-alive connections, each sending the next
+request of MIX as soon as the previous one returns. Memory is the Pss of
+the whole server process tree, so pages shared between preloaded workers
+are counted once.
+"""
+import http.client
+import itertools
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+UPSTREAM_SECONDS = 0.05
+WARMUP_SECONDS = 2.0
+PORT = 5099
+
+# (weight, method, path, JSON body)
+MIX = [
+    (30, 'GET', '/api/nasa/satellites', None),
+    (15, 'GET', '/api/simulation/orbital-mechanics?samples=200', None),
+    (15, 'POST', '/api/ai/chat', b'{"message": "How do astronauts train for spacewalks?"}'),
+    (10, 'GET', '/api/simulation/ephemeris?bodies=earth,mars,jupiter', None),
+    (10, 'GET', '/api/nasa/iss', None),
+    (20, 'GET', '/bench/upstream', None),
+]
+
+
+def _modes(workers: int):
+    gunicorn = [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{PORT}', '-w', str(workers)]
+    return {
+        'werkzeug threaded (app.run)': ([sys.executable, '-m', 'benchmarks.server_modes', '--serve'], {}),
+        f'gunicorn sync x{workers}': (gunicorn + ['benchmarks.server_modes:app'], {'GUNICORN_WORKER_CLASS': 'sync'}),
+        f'gunicorn gthread x{workers}': (gunicorn + ['benchmarks.server_modes:app'],
+                                         {'GUNICORN_WORKER_CLASS': 'gthread'}),
+        f'gunicorn asgi x{workers}': (gunicorn + ['benchmarks.server_modes:application'],
+                                      {'GUNICORN_WORKER_CLASS': 'asgi'}),
+        'uvicorn x1': ([sys.executable, '-m', 'uvicorn', 'benchmarks.server_modes:application', '--port', str(PORT),
+                        '--log-level', 'warning'], {}),
+    }
+
+
+def _bench_app():
+    from app import create_app
+    bench_app = create_app()
+
+    @bench_app.route('/bench/upstream')
+    def upstream():
+        time.sleep(UPSTREAM_SECONDS)
+        return {'status': 'success'}
+
+    return bench_app
+
+
+if __name__ != '__main__':
+    # Imported by the servers under test
+    from utils.asgi import WsgiToAsgi
+    app = _bench_app()
+    application = WsgiToAsgi(app)
+
+
+def serve() -> None:
+    from werkzeug.serving import make_server
+    make_server('127.0.0.1', PORT, _bench_app(), threaded=True).serve_forever()
+
+
+def tree_pss_mb(root: int) -> float:
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    pids, total = [root], 0
+    while pids:
+        pid = pids.pop()
+        pids.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def wait_ready(timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=5)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def drive(seconds: float, connections: int):
+    requests = [(method, path, body) for weight, method, path, body in MIX for _ in range(weight)]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from, stop = start + WARMUP_SECONDS, start + WARMUP_SECONDS + seconds
+
+    def client(seed):
+        order = requests[:]
+        random.Random(seed).shuffle(order)
+        connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+        mine, failed = [], 0
+        for method, path, body in itertools.cycle(order):
+            began = time.monotonic()
+            if began >= stop:
+                break
+            try:
+                connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            if began >= measure_from:
+                if ok:
+                    mine.append(time.monotonic() - began)
+                else:
+                    failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), errors[0]
+
+
+def main(seconds: float, connections: int, workers: int) -> None:
+    print(f'{seconds:.0f} s per mode, {connections} connections, mix: '
+          + ', '.join(f'{weight}% {path.split("?")[0]}' for weight, _, path, _ in MIX))
+    print(f"{'mode':>28} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'Pss MB':>8}")
+    for name, (command, env) in _modes(workers).items():
+        server = subprocess.Popen(command, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL)
+        try:
+            wait_ready()
+            latencies, errors = drive(seconds, connections)
+            pss = tree_pss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        p50, p99 = (np.percentile(latencies, [50, 99]) * 1000) if len(latencies) else (0.0, 0.0)
+        print(f'{name:>28} {len(latencies) / seconds:>8.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7} {pss:>8.0f}')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve()
+    else:
+        args = sys.argv[1:]
+        main(float(args[0]) if args else 10.0, int(args[1]) if len(args) > 1 else 32,
+             int(args[2]) if len(args) > 2 else 2)
@@ -0,0 +1,81 @@
+"""Session context: memory per user, cost per chat turn, and follow-ups resolved
+
+    python -m benchmarks.sessions
+
+Footprint is measured with tracemalloc while 1M distinct users each leave a
+session with two topics and two keywords, first with no cap and then with
+the default 64 MB cap. Per-turn cost compares ``get_response`` with and
+without a user id, against the memory and SQLite stores.
+"""
+import tempfile
+import time
+import tracemalloc
+
+from services.ml_model import SpaceKnowledgeBot
+from services.sessions import MemorySessionStore, Session, SqliteSessionStore
+
+USERS = 1_000_000
+TURNS = 20_000
+CONVERSATIONS = [
+    ('Tell me about Mars', 'what about its moons?'),
+    ('How do astronauts sleep', 'what do they eat?'),
+    ('Tell me about the ISS', 'how fast does it go?'),
+    ('How does a rocket work?', 'what fuel does it use?'),
+    ('Tell me about the Apollo missions', 'who was first on it?'),
+]
+
+
+def footprint(max_bytes: int) -> None:
+    bot = SpaceKnowledgeBot()
+    topics, keywords = bot.keyword_index.topics, bot.keyword_index.keywords
+    tracemalloc.start()
+    store = MemorySessionStore(max_bytes=max_bytes)
+    start = time.perf_counter()
+    for i in range(USERS):
+        store.put(f'user-{i}', Session((topics[i % len(topics)], topics[(i + 1) % len(topics)]),
+                                       (keywords[i % len(keywords)], keywords[(i + 7) % len(keywords)])))
+    elapsed = time.perf_counter() - start
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = store.stats()
+    print(f'cap {max_bytes / 2 ** 20:>6.0f} MB: {stats["entries"]:>9,} sessions held, '
+          f'{traced / 2 ** 20:6.1f} MB traced ({traced / stats["entries"]:.0f} B each), '
+          f'{stats["bytes"] / 2 ** 20:6.1f} MB accounted, {stats["evictions"]:,} evicted, '
+          f'{elapsed / USERS * 1e6:.2f} us per put under tracemalloc')
+
+
+def turn_cost(engine: str, store, label: str) -> None:
+    bot = SpaceKnowledgeBot(engine=engine, cache_size=1024, seed=0, sessions=store)
+    messages = [message for conversation in CONVERSATIONS for message in conversation]
+    for message in messages:
+        bot.get_response(message)
+    timings = {}
+    for user_id in (None, 'user'):
+        start = time.perf_counter()
+        for i in range(TURNS):
+            bot.get_response(messages[i % len(messages)], f'{user_id}-{i % 1000}' if user_id else None)
+        timings[user_id] = (time.perf_counter() - start) / TURNS * 1e6
+    print(f'{engine:>8} {label:>7}: {timings[None]:6.1f} us stateless, {timings["user"]:6.1f} us with a session '
+          f'(+{timings["user"] - timings[None]:.1f} us)')
+
+
+def follow_ups(engine: str) -> None:
+    bot = SpaceKnowledgeBot(engine=engine, seed=0, sessions=MemorySessionStore())
+    alone = in_context = 0
+    for n, (opener, follow_up) in enumerate(CONVERSATIONS):
+        alone += bot.get_response(follow_up)['topic'] is not None
+        bot.get_response(opener, f'user-{n}')
+        in_context += bot.get_response(follow_up, f'user-{n}')['topic'] is not None
+    print(f'{engine:>8}: follow-ups answered on a topic {alone}/{len(CONVERSATIONS)} alone, '
+          f'{in_context}/{len(CONVERSATIONS)} with a session')
+
+
+if __name__ == '__main__':
+    footprint(max_bytes=1 << 40)
+    footprint(max_bytes=64 << 20)
+    with tempfile.TemporaryDirectory() as directory:
+        for engine in SpaceKnowledgeBot.ENGINES:
+            turn_cost(engine, MemorySessionStore(), 'memory')
+            turn_cost(engine, SqliteSessionStore(f'{directory}/{engine}.sqlite3'), 'sqlite')
+    for engine in SpaceKnowledgeBot.ENGINES:
+        follow_ups(engine)
@@ -0,0 +1,58 @@
+"""Space-weather store: ingest rate, range query cost and rolling aggregates vs recomputing
+
+    python -m benchmarks.space_weather
+
+Uses the synthetic source, so the numbers do not depend on the network.
+"""
+import time
+
+import numpy as np
+
+from services.space_weather import DAY, SpaceWeatherFeed, SpaceWeatherStore, synthetic_source
+
+POINTS = 500
+SPANS = [('6 h', 0.25 * DAY), ('24 h', DAY), ('7 d', 7 * DAY)]
+REPEAT = 200
+
+
+def timed(fn, repeat: int = REPEAT) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+if __name__ == '__main__':
+    now = time.time()
+    store = SpaceWeatherStore(retention_hours=7 * 24)
+    feed = SpaceWeatherFeed(store, synthetic_source)
+    start = time.perf_counter()
+    added = feed.backfill(now)
+    elapsed = time.perf_counter() - start
+    print(f'backfill: {added} samples in {elapsed:.2f} s ({added / elapsed:,.0f} samples/s, '
+          f'including rolling windows and alerts); ring buffers {store.stats()["bytes"] / 1e6:.1f} MB')
+
+    print(f"{'span':>6} {'samples':>8} {'raw ms':>8} {'lttb ms':>8} {'minmax ms':>10} {'points':>7}")
+    for label, span in SPANS:
+        raw = store.buffers['solar_wind_speed'].range(now - span, now)
+        raw_ms = timed(lambda: store.buffers['solar_wind_speed'].range(now - span, now))
+        lttb_ms = timed(lambda: store.query('solar_wind_speed', now - span, now, POINTS, 'lttb'))
+        minmax_ms = timed(lambda: store.query('solar_wind_speed', now - span, now, POINTS, 'minmax'))
+        times, _, _ = store.query('solar_wind_speed', now - span, now, POINTS)
+        print(f'{label:>6} {len(raw[0]):>8} {raw_ms:>8.3f} {lttb_ms:>8.3f} {minmax_ms:>10.3f} {len(times):>7}')
+
+    incremental = timed(store.rolling)
+
+    def recompute():
+        for buffer in store.buffers.values():
+            times, values = buffer.ordered()
+            for seconds in (3600.0, 6 * 3600.0, DAY):
+                window = values[times > times[-1] - seconds]
+                window.min(), window.max(), window.mean()
+
+    print(f'rolling 1h/6h/24h min/max/mean for all metrics: incremental {incremental:.3f} ms, '
+          f'recomputed from buffers {timed(recompute):.3f} ms')
+    full = store.buffers['solar_wind_speed'].ordered()[1]
+    _, values, _ = store.query('solar_wind_speed', 0, now, POINTS)
+    print(f'7 d at {POINTS} points keeps the extremes: lttb range {values.min():.1f}-{values.max():.1f}, '
+          f'full range {np.min(full):.1f}-{np.max(full):.1f}')
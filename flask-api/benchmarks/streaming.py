@@ -0,0 +1,43 @@
+"""Peak memory of buffered vs streamed /orbital-mechanics responses
+
+    python -m benchmarks.streaming
+
+The body is read chunk by chunk and thrown away, the way a socket would
+consume it, so the traced peak is what the server side holds at once.
+"""
+import time
+import tracemalloc
+
+from wsgi import app
+
+SIZES = [10_000, 100_000, 1_000_000]
+URL = '/api/simulation/orbital-mechanics?span=86400&samples={samples}'
+
+
+def consume(client, url: str):
+    response = client.get(url, buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    return size
+
+
+def measure(client, url: str):
+    start = time.perf_counter()
+    size = consume(client, url)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    consume(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+if __name__ == '__main__':
+    client = app.test_client()
+    print(f"{'mode':>8} {'points':>9} {'body MB':>8} {'seconds':>8} {'rows/s':>10} {'peak MB':>8}")
+    runs = [('buffered', SIZES[0], URL)] + [(fmt, n, URL + '&stream=' + fmt) for fmt in ('json', 'ndjson') for n in SIZES]
+    for mode, samples, url in runs:
+        size, elapsed, peak = measure(client, url.format(samples=samples))
+        print(f'{mode:>8} {samples:>9} {size / 1e6:>8.1f} {elapsed:>8.2f} {samples / elapsed:>10.0f} {peak / 1e6:>8.2f}')
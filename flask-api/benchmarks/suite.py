@@ -0,0 +1,270 @@
+"""Microbenchmarks of the chat scorer, the simulation engines and every simulation and tracking route
+
+    python -m benchmarks.suite [-k filter] [--save results.json] [--compare baseline.json] [--threshold 0.2]
+
+Every ``bench_*`` function receives a ``benchmark`` fixture, as with
+pytest-benchmark: ``benchmark(fn, *args)`` warms ``fn`` up, calibrates the
+iterations per round so that a round lasts at least MIN_ROUND_SECONDS, then
+runs rounds for MAX_TIME seconds (MIN_ROUNDS at least). Times are per call.
+
+Routes go through the Flask test client with the chat response cache, the
+simulation result cache, sessions and the conversation log turned off, so
+every request does the full work. Epochs are fixed so runs are comparable.
+With ``--compare``, the fastest round of each benchmark is checked against
+the baseline file, as pytest-benchmark does: on a shared CPU the median of
+identical runs moves by up to 40%, the minimum far less. Benchmarks over
+``--threshold`` are measured again up to ``--retries`` times, keeping their
+best figures, and the run exits with status 1 if one is still slower.
+"""
+import argparse
+import functools
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from benchmarks import results
+from services.ephemeris import Ephemeris
+from services.lambert import porkchop
+from services.ml_model import SpaceKnowledgeBot
+from services.monte_carlo import run_monte_carlo
+from services.orbits import propagate
+from services.trajectory import Vehicle, simulate_ascent
+
+MIN_ROUND_SECONDS = 0.01
+MAX_TIME = 1.0
+MIN_ROUNDS = 5
+EPOCH = '2026-10-17T12:00:00Z'
+COMPARED = ('min_ms',)
+MESSAGES = [
+    'Tell me about Mars',
+    'How do astronauts sleep in space?',
+    'What is the International Space Station?',
+    'How does a rocket engine work?',
+    'Tell me about black holes',
+    'What were the Apollo missions?',
+    'How far away is Jupiter?',
+    'What is the weather like today?',
+]
+
+
+class Benchmark:
+    """Times one callable; ``stats`` holds per-call figures in milliseconds once it has run"""
+
+    def __init__(self, max_time: float = MAX_TIME, min_rounds: int = MIN_ROUNDS):
+        self.max_time = max_time
+        self.min_rounds = min_rounds
+        self.stats = None
+
+    def __call__(self, fn, *args, **kwargs):
+        result = fn(*args, **kwargs)
+
+        def run_round(iterations):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn(*args, **kwargs)
+            return time.perf_counter() - start
+
+        iterations = 1
+        while True:
+            elapsed = run_round(iterations)
+            if elapsed >= MIN_ROUND_SECONDS:
+                break
+            iterations = max(iterations * 2, int(iterations * MIN_ROUND_SECONDS / max(elapsed, 1e-9)))
+        rounds = [elapsed / iterations]
+        deadline = time.perf_counter() + self.max_time
+        while len(rounds) < self.min_rounds or time.perf_counter() < deadline:
+            rounds.append(run_round(iterations) / iterations)
+        mean = statistics.fmean(rounds)
+        self.stats = {
+            'min_ms': min(rounds) * 1e3,
+            'median_ms': statistics.median(rounds) * 1e3,
+            'mean_ms': mean * 1e3,
+            'stddev_ms': statistics.stdev(rounds) * 1e3,
+            'ops': 1.0 / mean,
+            'rounds': len(rounds),
+            'iterations': iterations,
+        }
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def _client():
+    from app import create_app
+    return create_app({
+        'CHAT_CACHE_SIZE': 0,
+        'CHAT_SESSIONS': 'off',
+        'CONVERSATION_LOG': 'off',
+        'SIMULATION_CACHE_BYTES': 0,
+        'SIMULATION_CACHE_DIR': '',
+        'SPACE_WEATHER_INTERVAL': 3600.0,
+    }).test_client()
+
+
+def _request(method, url, **kwargs):
+    response = _client().open(url, method=method, **kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} answered {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return response
+
+
+def _get(url, **kwargs):
+    return _request('GET', url, **kwargs)
+
+
+def _answer_all(bot):
+    return [bot.get_response(message) for message in MESSAGES]
+
+
+# Chat scorer
+
+def bench_keyword_get_response(benchmark):
+    """All of MESSAGES, one ``get_response`` each, keyword engine"""
+    benchmark(_answer_all, SpaceKnowledgeBot(engine='keyword', seed=0))
+
+
+def bench_tfidf_get_response(benchmark):
+    """All of MESSAGES, one ``get_response`` each, TF-IDF engine"""
+    benchmark(_answer_all, SpaceKnowledgeBot(engine='tfidf', seed=0))
+
+
+def bench_tfidf_get_responses_batch(benchmark):
+    """All of MESSAGES in one ``get_responses`` call, TF-IDF engine"""
+    bot = SpaceKnowledgeBot(engine='tfidf', seed=0)
+    benchmark(bot.get_responses, MESSAGES)
+
+
+# Engines
+
+def bench_simulate_ascent(benchmark):
+    benchmark(simulate_ascent, Vehicle(), 0.1, 300.0)
+
+
+def bench_monte_carlo_200_runs(benchmark):
+    benchmark(run_monte_carlo, Vehicle(), runs=200, seed=0)
+
+
+def bench_propagate_1k_orbits_100_epochs(benchmark):
+    rng = np.random.default_rng(0)
+    elements = {'a': rng.uniform(6700.0, 42164.0, 1000), 'e': rng.uniform(0.0, 0.1, 1000),
+                'i': rng.uniform(0.0, np.pi, 1000), 'raan': rng.uniform(0.0, 2 * np.pi, 1000),
+                'argp': rng.uniform(0.0, 2 * np.pi, 1000), 'mean_anomaly': rng.uniform(0.0, 2 * np.pi, 1000)}
+    benchmark(propagate, elements, np.linspace(0.0, 86400.0, 100))
+
+
+def bench_porkchop_100x100(benchmark):
+    ephemeris = Ephemeris.open()
+    departures = np.linspace(1788220800.0, 1801440000.0, 100)  # 2026-09-01..2027-02-01
+    benchmark(porkchop, ephemeris, 'earth', 'mars', departures, departures + 270 * 86400.0, workers=1)
+
+
+# Simulation routes
+
+def bench_route_rocket_trajectory(benchmark):
+    benchmark(_get, '/api/simulation/rocket-trajectory')
+
+
+def bench_route_rocket_trajectory_columnar(benchmark):
+    benchmark(_get, '/api/simulation/rocket-trajectory?points=10000',
+              headers={'Accept': 'application/vnd.spaceandtravel.columnar'})
+
+
+def bench_route_monte_carlo(benchmark):
+    benchmark(_get, '/api/simulation/monte-carlo?runs=200')
+
+
+def bench_route_orbital_mechanics(benchmark):
+    benchmark(_get, '/api/simulation/orbital-mechanics')
+
+
+def bench_route_ephemeris(benchmark):
+    benchmark(_get, f'/api/simulation/ephemeris?epoch={EPOCH}')
+
+
+def bench_route_ephemeris_range(benchmark):
+    benchmark(_get, '/api/simulation/ephemeris?bodies=earth,mars,jupiter&start=2030-01-01&end=2031-01-01'
+                    '&samples=365')
+
+
+def bench_route_porkchop(benchmark):
+    benchmark(_get, '/api/simulation/porkchop')
+
+
+def bench_route_space_weather(benchmark):
+    benchmark(_get, '/api/simulation/space-weather')
+
+
+# Chat and tracking routes
+
+def bench_route_chat(benchmark):
+    benchmark(_request, 'POST', '/api/ai/chat', json={'message': 'How do astronauts train for spacewalks?'})
+
+
+def bench_route_iss(benchmark):
+    benchmark(_get, f'/api/nasa/iss?epoch={EPOCH}')
+
+
+def bench_route_satellites(benchmark):
+    benchmark(_get, f'/api/nasa/satellites?epoch={EPOCH}')
+
+
+def bench_route_passes(benchmark):
+    benchmark(_get, f'/api/nasa/passes?start={EPOCH}')
+
+
+def bench_route_debris(benchmark):
+    benchmark(_get, f'/api/space/debris?epoch={EPOCH}')
+
+
+def bench_route_astronauts(benchmark):
+    benchmark(_get, '/api/astronauts/current')
+
+
+def collect(pattern: str = ''):
+    return {name[len('bench_'):]: fn for name, fn in globals().items()
+            if name.startswith('bench_') and callable(fn) and pattern in name}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n')[0])
+    parser.add_argument('-k', dest='pattern', default='', help='only benchmarks whose name contains this')
+    parser.add_argument('--max-time', type=float, default=MAX_TIME, help='seconds of rounds per benchmark')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to check the results against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown that fails the run (0.2 = 20%%)')
+    parser.add_argument('--retries', type=int, default=2, help='re-measurements of a benchmark over the threshold')
+    args = parser.parse_args(argv)
+    benchmarks = collect(args.pattern)
+
+    def measure(name):
+        benchmark = Benchmark(args.max_time)
+        benchmarks[name](benchmark)
+        return benchmark.stats
+
+    measured = {}
+    print(f'{"benchmark":>40} {"min ms":>10} {"median ms":>10} {"stddev ms":>10} {"ops/s":>10} {"rounds":>7}')
+    for name in benchmarks:
+        stats = measured[name] = measure(name)
+        print(f'{name:>40} {stats["min_ms"]:>10.3f} {stats["median_ms"]:>10.3f} {stats["stddev_ms"]:>10.3f} '
+              f'{stats["ops"]:>10.1f} {stats["rounds"]:>7}')
+    regressions = {}
+    if args.compare:
+        baseline = results.load(args.compare, 'suite')
+        for _ in range(args.retries):
+            suspects = results.compare(baseline, measured, COMPARED, args.threshold, show=False)
+            for name in suspects:
+                stats = measure(name)
+                if stats['min_ms'] < measured[name]['min_ms']:
+                    measured[name] = stats
+        regressions = results.compare(baseline, measured, COMPARED, args.threshold)
+    if args.save:
+        results.save(args.save, 'suite', measured)
+    if regressions:
+        print(f'{len(regressions)} regression(s) over {args.threshold:.0%}:\n  ' + '\n  '.join(regressions.values()))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Load test: many concurrent SSE telemetry subscribers against one server process
+
+    python -m benchmarks.telemetry_load [subscribers] [seconds] [debris_subscribers]
+
+Starts the app in a child process (threaded WSGI server, one hub), opens the
+connections from a single selector loop here, and reports delivery rate and
+tick-to-client latency once every connection is up and a warm-up period has
+passed. Subscriptions are a mix of the whole satellite channel, a single
+object, and optionally a few whole-debris-catalog streams (~0.7 MB per tick
+each). The hub's per-worker stream limit is lifted in the child: this
+measures fan-out, not how many streams a production worker's threads allow.
+"""
+import json
+import os
+import re
+import selectors
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+PATHS = [
+    '/api/stream/telemetry?channels=satellites',
+    '/api/stream/telemetry?objects=satellites:25544',
+    '/api/stream/telemetry?channels=debris',
+]
+SATELLITE_CHANNEL_SHARE = 0.7
+WARMUP_SECONDS = 3.0
+_EVENT = re.compile(rb'event: (\w+)\ndata: \{"type":"\w+","seq":(\d+),"time":([\d.]+)')
+
+
+def serve() -> None:
+    from werkzeug.serving import make_server
+    from wsgi import app
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def rss_mb(pid: int) -> float:
+    with open(f'/proc/{pid}/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def open_stream(port: int, path: str) -> socket.socket:
+    for _ in range(50):
+        try:
+            sock = socket.create_connection(('127.0.0.1', port))
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    sock.sendall(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n'.encode())
+    sock.setblocking(False)
+    return sock
+
+
+def main(subscribers: int, seconds: float, debris_subscribers: int) -> None:
+    server = subprocess.Popen([sys.executable, '-m', 'benchmarks.telemetry_load', '--serve'],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                              env={**os.environ, 'TELEMETRY_MAX_SUBSCRIBERS': '0'})
+    try:
+        port = int(server.stdout.readline())
+        selector = selectors.DefaultSelector()
+        whole_channel = round((subscribers - debris_subscribers) * SATELLITE_CHANNEL_SHARE)
+        kinds = np.repeat([0, 1, 2], [whole_channel, subscribers - debris_subscribers - whole_channel,
+                                      debris_subscribers])
+        buffers = {}
+        start = time.perf_counter()
+        for i, kind in enumerate(kinds):
+            sock = open_stream(port, PATHS[kind])
+            buffers[sock] = [b'', int(kind), 0, 0]  # pending bytes, path, events, bytes
+            selector.register(sock, selectors.EVENT_READ)
+        print(f'opened {subscribers} connections in {time.perf_counter() - start:.1f} s')
+
+        latencies = []
+        measure_from = time.time() + WARMUP_SECONDS
+        deadline = measure_from + seconds
+        while time.time() < deadline:
+            for key, _ in selector.select(timeout=0.5):
+                state = buffers[key.fileobj]
+                try:
+                    data = key.fileobj.recv(1 << 20)
+                except BlockingIOError:
+                    continue
+                received = time.time()
+                measuring = received >= measure_from
+                state[3] += len(data) if measuring else 0
+                pending = state[0] + data
+                cut = pending.rfind(b'\n\n') + 2
+                for match in _EVENT.finditer(pending[:cut]):
+                    if measuring:
+                        state[2] += 1
+                        latencies.append(received - float(match.group(3)))
+                state[0] = pending[cut:]
+
+        stats = json.load(urllib.request.urlopen(f'http://127.0.0.1:{port}/api/stream/stats'))
+        print(f"server: {stats['subscribers']} subscribers, {stats['distinct_subscriptions']} distinct subscriptions, "
+              f"{rss_mb(server.pid):.0f} MB RSS")
+        print(f"last tick: compute {stats['last_tick_ms']:.1f} ms, fan-out {stats['last_fanout_ms']:.1f} ms, "
+              f"{stats['last_payload_bytes'] / 1e6:.2f} MB; overflows {stats['overflows']}")
+        print(f"{'subscription':<50} {'clients':>7} {'events/s':>9} {'kB/s':>8}")
+        for kind, path in enumerate(PATHS):
+            states = [s for s in buffers.values() if s[1] == kind]
+            if states:
+                print(f'{path:<50} {len(states):>7} {sum(s[2] for s in states) / len(states) / seconds:>9.2f} '
+                      f'{sum(s[3] for s in states) / len(states) / seconds / 1e3:>8.1f}')
+        lat = np.array(latencies) * 1000.0
+        print(f'{len(lat)} events, tick-to-client latency ms: p50 {np.percentile(lat, 50):.1f} '
+              f'p95 {np.percentile(lat, 95):.1f} p99 {np.percentile(lat, 99):.1f} max {lat.max():.1f}')
+        for sock in buffers:
+            sock.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve()
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, float(sys.argv[2]) if len(sys.argv) > 2 else 20.0,
+             int(sys.argv[3]) if len(sys.argv) > 3 else 0)
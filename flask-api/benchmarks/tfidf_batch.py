@@ -0,0 +1,46 @@
+"""Throughput of the TF-IDF retrieval engine against batch size
+
+    python -m benchmarks.tfidf_batch
+"""
+import random
+import tempfile
+import time
+
+from benchmarks.knowledge_base import build_corpus
+from services.ml_model import SpaceKnowledgeBot
+
+TOPICS = 2000
+QUERIES = 2048
+BATCH_SIZES = [1, 8, 64, 512]
+
+
+def run(seed: int = 5):
+    with tempfile.TemporaryDirectory() as directory:
+        build_corpus(directory, TOPICS, seed)
+        start = time.perf_counter()
+        bot = SpaceKnowledgeBot(directory, engine='tfidf')
+        build_seconds = time.perf_counter() - start
+
+        rng = random.Random(seed)
+        vocabulary = [kw for kws in bot.knowledge_base.keywords().values() for kw in kws]
+        queries = [
+            ' '.join(['tell', 'me', 'about'] + rng.sample(vocabulary, rng.randint(1, 4)))
+            for _ in range(QUERIES)
+        ]
+
+        results = []
+        for batch_size in BATCH_SIZES:
+            start = time.perf_counter()
+            for i in range(0, QUERIES, batch_size):
+                bot.retriever.query_batch(queries[i:i + batch_size], k=5)
+            elapsed = time.perf_counter() - start
+            results.append((batch_size, QUERIES / elapsed))
+    return len(bot.retriever.rows), build_seconds, results
+
+
+if __name__ == '__main__':
+    rows, build_seconds, results = run()
+    print(f'{rows} responses vectorized in {build_seconds:.2f}s')
+    print(f"{'batch':>6} {'queries/s':>10}")
+    for batch_size, throughput in results:
+        print(f'{batch_size:>6} {throughput:>10.0f}')
@@ -0,0 +1,26 @@
+"""Wall time of the RK4 ascent integrator against step count
+
+    python -m benchmarks.trajectory
+"""
+import time
+
+from services.trajectory import simulate_ascent
+
+STEP_COUNTS = [10_000, 100_000, 1_000_000]
+DURATION = 300.0
+
+
+def run(steps: int, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        simulate_ascent(dt=DURATION / steps, duration=DURATION)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    print(f"{'steps':>10} {'seconds':>9} {'us/step':>8}")
+    for steps in STEP_COUNTS:
+        seconds = run(steps)
+        print(f'{steps:>10} {seconds:>9.3f} {seconds / steps * 1e6:>8.2f}')
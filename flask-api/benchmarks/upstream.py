@@ -0,0 +1,164 @@
+"""Upstream client against a local stub server: coalescing, pooling, staleness, circuit breaking
+
+    python -m benchmarks.upstream [callers]
+
+The stub answers every GET with a small JSON document after STUB_LATENCY
+seconds and counts the requests it receives; ``/fail`` answers 503. Each
+scenario uses a fresh client so their counters do not mix.
+"""
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from services.nasa_api import UpstreamClient, UpstreamError
+
+STUB_LATENCY = 0.05
+SEQUENTIAL_REQUESTS = 300
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_served = 0
+    connections = 0
+    latency = STUB_LATENCY
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; don't let Nagle hold the body back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        StubHandler.connections += 1
+
+    def do_GET(self):
+        StubHandler.requests_served += 1
+        time.sleep(self.latency)
+        if self.path.startswith('/fail'):
+            body, status = b'{"error": "unavailable"}', 503
+        else:
+            body, status = json.dumps({'path': self.path, 'served_at': time.time()}).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def reset_stub(latency: float = STUB_LATENCY) -> None:
+    StubHandler.requests_served = StubHandler.connections = 0
+    StubHandler.latency = latency
+
+
+def burst(client: UpstreamClient, callers: int, path: str = '/iss-now.json'):
+    """``callers`` threads released at once on the same resource; per-caller latency"""
+    barrier = threading.Barrier(callers)
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+
+    def call():
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            client.get_json(path)
+        except UpstreamError:
+            with lock:
+                failures[0] += 1
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies) * 1000.0, failures[0]
+
+
+def coalescing(base_url: str, callers: int) -> None:
+    reset_stub()
+    client = UpstreamClient(base_url, ttl=60.0)
+    latencies, failures = burst(client, callers)
+    print(f'{callers} simultaneous callers, cold cache: {StubHandler.requests_served} upstream request(s), '
+          f'{client.coalesced} coalesced, {failures} failures, '
+          f'p50 {np.percentile(latencies, 50):.1f} ms, max {latencies.max():.1f} ms')
+
+
+def pooling(base_url: str) -> None:
+    """Uncached sequential fetches through the pooled session vs a new connection each time"""
+    for label, fetch in [
+        ('requests.get per call', lambda i: requests.get(f'{base_url}/item/{i}', timeout=5).json()),
+        ('pooled UpstreamClient', lambda i, client=UpstreamClient(base_url, ttl=0.0, stale_ttl=0.0, rate=1e6,
+                                                                   burst=1000): client.get_json(f'/item/{i}')),
+    ]:
+        reset_stub(latency=0.0)
+        start = time.perf_counter()
+        for i in range(SEQUENTIAL_REQUESTS):
+            fetch(i)
+        elapsed = time.perf_counter() - start
+        print(f'  {label:>24}: {SEQUENTIAL_REQUESTS / elapsed:7.0f} req/s, '
+              f'{StubHandler.connections} TCP connection(s)')
+
+
+def stale_while_revalidate(base_url: str, callers: int) -> None:
+    reset_stub(latency=0.2)
+    client = UpstreamClient(base_url, ttl=0.5, stale_ttl=60.0)
+    client.get_json('/iss-now.json')
+    time.sleep(0.6)  # entry is now stale
+    served = StubHandler.requests_served
+    latencies, _ = burst(client, callers)
+    time.sleep(0.3)  # let the background refresh land
+    print(f'{callers} callers on a stale entry (upstream takes 200 ms): p50 {np.percentile(latencies, 50):.2f} ms, '
+          f'max {latencies.max():.2f} ms, {StubHandler.requests_served - served} background refresh(es)')
+
+
+def circuit_breaker(base_url: str) -> None:
+    reset_stub(latency=0.0)
+    client = UpstreamClient(base_url, ttl=0.0, stale_ttl=0.0, failure_threshold=5, reset_timeout=1.0, rate=1e6,
+                            burst=1000)
+    start = time.perf_counter()
+    failures = 0
+    for _ in range(200):
+        try:
+            client.get_json('/fail')
+        except UpstreamError:
+            failures += 1
+    elapsed = time.perf_counter() - start
+    print(f'200 calls to a failing upstream: {failures} failed in {elapsed * 1000:.0f} ms, '
+          f'{StubHandler.requests_served} reached it, circuit {client.breaker.state}')
+
+
+def rate_limit(base_url: str) -> None:
+    reset_stub(latency=0.0)
+    client = UpstreamClient(base_url, ttl=60.0, rate=20.0, burst=5, rate_wait=0.0)
+    rejected = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 2.0:
+        try:
+            client.get_json(f'/item/{time.perf_counter()}')
+        except UpstreamError:
+            rejected += 1
+    print(f'2 s of distinct uncached keys at 20 req/s, burst 5: {StubHandler.requests_served} upstream requests, '
+          f'{rejected} rejected locally')
+
+
+if __name__ == '__main__':
+    callers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+
+    coalescing(url, callers)
+    print(f'{SEQUENTIAL_REQUESTS} sequential uncached requests, no stub latency:')
+    pooling(url)
+    stale_while_revalidate(url, callers)
+    circuit_breaker(url)
+    rate_limit(url)
+    server.shutdown()
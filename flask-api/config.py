@@ -0,0 +1,79 @@
+import os
+
+from services.conversation_log import DEFAULT_LOG_DIR
+from services.debris import DEFAULT_DEBRIS_COUNT, DEFAULT_DEBRIS_SEED, DEFAULT_SCREENING_BUCKET
+from services.ephemeris import DEFAULT_END, DEFAULT_EPHEMERIS_DIR, DEFAULT_START
+from services.nasa_api import CELESTRAK_URL, OPEN_NOTIFY_URL, SWPC_URL
+from services.result_cache import DEFAULT_CACHE_DIR
+from services.satellite_catalog import DEFAULT_TLE_DIR
+from services.sessions import DEFAULT_SESSION_PATH
+from services.space_weather import DEFAULT_INTERVAL, DEFAULT_RETENTION_HOURS
+
+
+class Config:
+    """Default settings for ``create_app``, read from the environment
+
+    Anything passed to ``create_app(config)`` overrides these.
+    """
+    # AI chat ('keyword' or 'tfidf' retrieval engine)
+    CHAT_ENGINE = os.environ.get('CHAT_ENGINE', 'keyword')
+    CHAT_CACHE_SIZE = int(os.environ.get('CHAT_CACHE_SIZE', 1024))
+    CHAT_CACHE_TTL = float(os.environ.get('CHAT_CACHE_TTL', 300))
+    CHAT_SEED = int(os.environ.get('CHAT_SEED', '0')) if os.environ.get('CHAT_SEED', '0') else None
+    # POST /api/ai/knowledge/reload needs this bearer token; empty turns the endpoint off
+    KNOWLEDGE_RELOAD_TOKEN = os.environ.get('KNOWLEDGE_RELOAD_TOKEN', '')
+    # Each worker reloads the knowledge base when its files change, checked at most this often (0 never checks)
+    KNOWLEDGE_CHECK_INTERVAL = float(os.environ.get('KNOWLEDGE_CHECK_INTERVAL', 5))
+    # Micro-batching of concurrent chat requests, enabled by a positive window
+    CHAT_BATCH_WINDOW_MS = float(os.environ.get('CHAT_BATCH_WINDOW_MS', 0))
+    CHAT_BATCH_SIZE = int(os.environ.get('CHAT_BATCH_SIZE', 64))
+    # Seconds a request waits for its batch before answering 503
+    CHAT_BATCH_TIMEOUT = float(os.environ.get('CHAT_BATCH_TIMEOUT', 10))
+    CHAT_MAX_BATCH_MESSAGES = int(os.environ.get('CHAT_MAX_BATCH_MESSAGES', 256))
+    # Per-user context for follow-up questions: 'memory' (per worker), 'sqlite' (shared file) or 'off'
+    CHAT_SESSIONS = os.environ.get('CHAT_SESSIONS', 'memory')
+    CHAT_SESSION_TTL = float(os.environ.get('CHAT_SESSION_TTL', 1800))
+    CHAT_SESSION_MAX_BYTES = int(os.environ.get('CHAT_SESSION_MAX_BYTES', 64 << 20))
+    CHAT_SESSION_PATH = DEFAULT_SESSION_PATH
+    CHAT_SESSION_MAX_ENTRIES = int(os.environ.get('CHAT_SESSION_MAX_ENTRIES', 1_000_000))
+    # Conversation log: 'jsonl', 'sqlite' or 'off'; written in batches by a background thread
+    CONVERSATION_LOG = os.environ.get('CONVERSATION_LOG', 'jsonl')
+    CONVERSATION_LOG_DIR = DEFAULT_LOG_DIR
+    CONVERSATION_LOG_QUEUE_SIZE = int(os.environ.get('CONVERSATION_LOG_QUEUE_SIZE', 100_000))
+    CONVERSATION_LOG_BATCH_SIZE = int(os.environ.get('CONVERSATION_LOG_BATCH_SIZE', 1000))
+    CONVERSATION_LOG_FLUSH_MS = float(os.environ.get('CONVERSATION_LOG_FLUSH_MS', 500))
+    # 'drop' new records when the queue is full, or 'block' the request briefly first
+    CONVERSATION_LOG_OVERFLOW = os.environ.get('CONVERSATION_LOG_OVERFLOW', 'drop')
+    CONVERSATION_LOG_MAX_BYTES = int(os.environ.get('CONVERSATION_LOG_MAX_BYTES', 64 << 20))
+    CONVERSATION_LOG_MAX_FILES = int(os.environ.get('CONVERSATION_LOG_MAX_FILES', 20))
+    CONVERSATION_LOG_FSYNC = os.environ.get('CONVERSATION_LOG_FSYNC', '1') == '1'
+
+    # Tracking
+    TLE_DIR = DEFAULT_TLE_DIR
+    DEBRIS_CATALOG_SIZE = DEFAULT_DEBRIS_COUNT
+    DEBRIS_SEED = DEFAULT_DEBRIS_SEED
+    # Conjunction screenings go through the simulation result cache, per epoch bucket (0 screens at the exact epoch)
+    DEBRIS_SCREENING_BUCKET = DEFAULT_SCREENING_BUCKET
+    # Upstream feeds; point these at a stub server for testing
+    OPEN_NOTIFY_URL = OPEN_NOTIFY_URL
+    CELESTRAK_URL = CELESTRAK_URL
+    SWPC_URL = SWPC_URL
+
+    # Simulation
+    EPHEMERIS_DIR = DEFAULT_EPHEMERIS_DIR
+    EPHEMERIS_START = DEFAULT_START
+    EPHEMERIS_END = DEFAULT_END
+    # 'synthetic' or 'swpc' (NOAA products via SWPC_URL)
+    SPACE_WEATHER_SOURCE = os.environ.get('SPACE_WEATHER_SOURCE', 'synthetic')
+    SPACE_WEATHER_RETENTION_HOURS = DEFAULT_RETENTION_HOURS
+    SPACE_WEATHER_INTERVAL = DEFAULT_INTERVAL
+    # Results of the deterministic engines: an in-process LRU (0 turns it off) in front of a shared on-disk
+    # store (an empty SIMULATION_CACHE_DIR turns it off) that only keeps results slower than MIN_DISK_MS
+    SIMULATION_CACHE_BYTES = int(os.environ.get('SIMULATION_CACHE_BYTES', 128 << 20))
+    SIMULATION_CACHE_DIR = DEFAULT_CACHE_DIR
+    SIMULATION_CACHE_DISK_BYTES = int(os.environ.get('SIMULATION_CACHE_DISK_BYTES', 1 << 30))
+    SIMULATION_CACHE_MIN_DISK_MS = float(os.environ.get('SIMULATION_CACHE_MIN_DISK_MS', 5))
+
+    # Instrumentation: request/stage histograms at /metrics, and the on-demand sampling profiler
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '0') == '1'
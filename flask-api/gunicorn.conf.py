@@ -0,0 +1,34 @@
+"""Production server settings, read by gunicorn from the working directory
+
+    gunicorn                                  # threaded WSGI workers (gthread)
+    GUNICORN_WORKER_CLASS=asgi gunicorn       # ASGI workers serving asgi:application
+    GUNICORN_WORKER_CLASS=sync gunicorn       # one request per worker at a time
+
+The app is preloaded: create_app runs once in the master, which builds the
+knowledge base index, catalogs and ephemeris before forking, and the
+workers share those pages copy-on-write. Set WEB_CONCURRENCY for the worker
+count and GUNICORN_THREADS (gthread) or ASGI_THREADS (asgi) for the
+requests each worker runs at once. Long-lived telemetry streams each hold
+one of those threads.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+wsgi_app = 'asgi:application' if worker_class == 'asgi' else 'wsgi:app'
+if worker_class == 'gthread':
+    # Only set for gthread: gunicorn turns sync workers with threads > 1 into gthread
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+preload_app = True
+timeout = 60
+keepalive = 5
+
+
+def when_ready(server):
+    # Everything built during preload moves to a generation the collector
+    # never scans, so collections in the workers don't write to (and copy)
+    # those pages
+    gc.freeze()
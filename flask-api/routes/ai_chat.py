@@ -2,12 +2,85 @@ from flask import Blueprint, request, jsonify
 import json
 import random
 import datetime
+import hmac
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
 from services.ml_model import SpaceKnowledgeBot
+from services.batching import MicroBatcher, SchedulerOverloaded
+from services.conversation_log import SINKS, ConversationLog
+from services.sessions import MemorySessionStore, SqliteSessionStore
+from routes.metrics import route_latency, stage_latency
 
 ai_chat_bp = Blueprint('ai_chat', __name__)
 
-# Initialize the space knowledge bot
-space_bot = SpaceKnowledgeBot()
+# Built by init_chat from the app config
+space_bot = None
+scheduler = None
+chat_log = None
+MAX_BATCH_MESSAGES = 256
+BATCH_TIMEOUT = 10.0
+RELOAD_TOKEN = ''
+
+def init_chat(app):
+    """Build the knowledge bot and its session store, the conversation log, and the micro-batching scheduler
+
+    Called by ``create_app``, so with a preloading server the index is
+    built once in the parent and shared with every worker.
+    """
+    global space_bot, scheduler, chat_log, MAX_BATCH_MESSAGES, BATCH_TIMEOUT, RELOAD_TOKEN
+    config = app.config
+    if config['CHAT_SESSIONS'] == 'memory':
+        sessions = MemorySessionStore(ttl=config['CHAT_SESSION_TTL'], max_bytes=config['CHAT_SESSION_MAX_BYTES'])
+    elif config['CHAT_SESSIONS'] == 'sqlite':
+        sessions = SqliteSessionStore(config['CHAT_SESSION_PATH'], ttl=config['CHAT_SESSION_TTL'],
+                                      max_entries=config['CHAT_SESSION_MAX_ENTRIES'])
+    elif config['CHAT_SESSIONS'] == 'off':
+        sessions = None
+    else:
+        raise ValueError("CHAT_SESSIONS must be 'memory', 'sqlite' or 'off'")
+    space_bot = SpaceKnowledgeBot(
+        engine=config['CHAT_ENGINE'],
+        cache_size=config['CHAT_CACHE_SIZE'],
+        cache_ttl=config['CHAT_CACHE_TTL'],
+        seed=config['CHAT_SEED'],
+        sessions=sessions,
+        reload_interval=config['KNOWLEDGE_CHECK_INTERVAL']
+    )
+    scheduler = MicroBatcher(
+        space_bot.get_responses,
+        max_batch_size=config['CHAT_BATCH_SIZE'],
+        max_wait_ms=config['CHAT_BATCH_WINDOW_MS']
+    ) if config['CHAT_BATCH_WINDOW_MS'] > 0 else None
+    MAX_BATCH_MESSAGES = config['CHAT_MAX_BATCH_MESSAGES']
+    BATCH_TIMEOUT = config['CHAT_BATCH_TIMEOUT']
+    RELOAD_TOKEN = config['KNOWLEDGE_RELOAD_TOKEN']
+    log_format = config['CONVERSATION_LOG']
+    if log_format != 'off' and log_format not in SINKS:
+        raise ValueError(f"CONVERSATION_LOG must be 'off' or one of: {', '.join(SINKS)}")
+    chat_log = ConversationLog(
+        SINKS[log_format](config['CONVERSATION_LOG_DIR'], max_bytes=config['CONVERSATION_LOG_MAX_BYTES'],
+                          max_files=config['CONVERSATION_LOG_MAX_FILES'], fsync=config['CONVERSATION_LOG_FSYNC']),
+        max_queue=config['CONVERSATION_LOG_QUEUE_SIZE'],
+        batch_size=config['CONVERSATION_LOG_BATCH_SIZE'],
+        flush_interval=config['CONVERSATION_LOG_FLUSH_MS'] / 1000.0,
+        overflow=config['CONVERSATION_LOG_OVERFLOW']
+    ) if log_format != 'off' else None
+
+def _answer(messages):
+    """Score messages directly or through the micro-batching scheduler
+
+    A scheduler that has not answered within BATCH_TIMEOUT seconds is treated
+    as overloaded, so the request gets a 503 instead of holding its worker.
+    """
+    space_bot.reload_if_changed()
+    if scheduler is None:
+        return space_bot.get_responses(messages)
+    futures = scheduler.submit_many(messages)
+    deadline = time.monotonic() + BATCH_TIMEOUT
+    try:
+        return [future.result(timeout=max(deadline - time.monotonic(), 0.0)) for future in futures]
+    except FutureTimeout:
+        raise SchedulerOverloaded(f'No answer from the batch scheduler within {BATCH_TIMEOUT:g} s')
 
 @ai_chat_bp.route('/chat', methods=['POST'])
 def chat():
@@ -31,9 +104,12 @@ def chat():
             }), 400
         
         # Get response from the AI bot
-        bot_response = space_bot.get_response(user_message)
+        bot_response = _answer([user_message])[0]
+        # Follow-ups ("what about its moons?") are resolved from the sender's recent context
+        if isinstance(data.get('user_id'), str) and space_bot.sessions is not None:
+            bot_response = space_bot.continue_session(user_id, user_message, bot_response)
         
-        # Log the conversation (in production, save to database)
+        # Queued for the background writer; never waits on disk
         conversation_log = {
             'user_id': user_id,
             'user_message': user_message,
@@ -41,6 +117,8 @@ def chat():
             'confidence': bot_response['confidence'],
             'timestamp': datetime.datetime.now().isoformat()
         }
+        if chat_log is not None:
+            chat_log.log(conversation_log)
         
         return jsonify({
             'response': bot_response['message'],
@@ -51,6 +129,88 @@ def chat():
             'status': 'success'
         })
         
+    except SchedulerOverloaded as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'error': f'Internal server error: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@ai_chat_bp.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer an array of messages, returning results in request order"""
+    try:
+        data = request.get_json(silent=True)
+        
+        if not isinstance(data, dict) or not isinstance(data.get('messages'), list):
+            return jsonify({
+                'error': 'Missing messages array in request body',
+                'status': 'error'
+            }), 400
+        
+        if len(data['messages']) > MAX_BATCH_MESSAGES:
+            return jsonify({
+                'error': f'At most {MAX_BATCH_MESSAGES} messages per batch',
+                'status': 'error'
+            }), 400
+        
+        # Accept plain strings or {"message": ..., "user_id": ...} objects
+        messages = [
+            item.get('message') if isinstance(item, dict) else item
+            for item in data['messages']
+        ]
+        user_ids = [
+            item.get('user_id') if isinstance(item, dict) else None
+            for item in data['messages']
+        ]
+        valid = [
+            i for i, message in enumerate(messages)
+            if isinstance(message, str) and message.strip()
+        ]
+        
+        answers = _answer([messages[i].strip() for i in valid])
+        
+        results = [{
+            'error': 'Empty or invalid message',
+            'status': 'error'
+        } for _ in messages]
+        timestamp = datetime.datetime.now().isoformat()
+        for i, bot_response in zip(valid, answers):
+            # In request order, so a follow-up later in the batch sees the earlier message
+            if isinstance(user_ids[i], str) and space_bot.sessions is not None:
+                bot_response = space_bot.continue_session(user_ids[i], messages[i].strip(), bot_response)
+            results[i] = {
+                'response': bot_response['message'],
+                'confidence': bot_response['confidence'],
+                'suggestions': bot_response.get('suggestions', []),
+                'sources': bot_response.get('sources', []),
+                'status': 'success'
+            }
+            if chat_log is not None:
+                chat_log.log({
+                    'user_id': user_ids[i] if isinstance(user_ids[i], str) else 'anonymous',
+                    'user_message': messages[i].strip(),
+                    'bot_response': bot_response['message'],
+                    'confidence': bot_response['confidence'],
+                    'timestamp': timestamp
+                })
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'timestamp': timestamp,
+            'status': 'success'
+        })
+        
+    except SchedulerOverloaded as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 503
     except Exception as e:
         return jsonify({
             'error': f'Internal server error: {str(e)}',
@@ -84,42 +244,54 @@ def get_suggestions():
 @ai_chat_bp.route('/topics', methods=['GET'])
 def get_topics():
     """Get available knowledge topics"""
-    topics = {
-        'space_basics': {
-            'name': 'Space Basics',
-            'description': 'Fundamental concepts about space and space travel',
-            'examples': ['gravity', 'vacuum of space', 'orbital mechanics']
-        },
-        'astronauts': {
-            'name': 'Astronaut Life',
-            'description': 'Daily life, training, and experiences of astronauts',
-            'examples': ['astronaut training', 'living in microgravity', 'spacewalks']
-        },
-        'spacecraft': {
-            'name': 'Spacecraft & Technology',
-            'description': 'Rockets, space stations, and space technology',
-            'examples': ['rocket engines', 'ISS modules', 'space suits']
-        },
-        'missions': {
-            'name': 'Space Missions',
-            'description': 'Past, present, and future space missions',
-            'examples': ['Apollo missions', 'Mars rovers', 'Voyager probes']
-        },
-        'planets': {
-            'name': 'Planetary Science',
-            'description': 'Information about planets and celestial bodies',
-            'examples': ['Mars exploration', 'Jupiter\'s moons', 'Saturn\'s rings']
-        },
-        'history': {
-            'name': 'Space History',
-            'description': 'Historical milestones in space exploration',
-            'examples': ['first satellite', 'moon landing', 'space race']
-        }
-    }
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = request.args.get('limit')
+        limit = max(int(limit), 0) if limit is not None else None
+    except ValueError:
+        return jsonify({
+            'error': 'offset and limit must be integers',
+            'status': 'error'
+        }), 400
+    
+    topics = space_bot.knowledge_base.metadata(offset, limit)
     
     return jsonify({
         'topics': topics,
         'count': len(topics),
+        'total_available': len(space_bot.knowledge_base),
+        'status': 'success'
+    })
+
+@ai_chat_bp.route('/knowledge/reload', methods=['POST'])
+def reload_knowledge():
+    """Re-read the knowledge base shards and invalidate cached answers in this worker
+
+    Needs ``Authorization: Bearer <KNOWLEDGE_RELOAD_TOKEN>``. The other
+    workers pick up changed files on their own within KNOWLEDGE_CHECK_INTERVAL.
+    """
+    if not RELOAD_TOKEN:
+        return jsonify({
+            'error': 'Knowledge base reload is disabled; set KNOWLEDGE_RELOAD_TOKEN to enable it',
+            'status': 'error'
+        }), 404
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode('utf-8'), RELOAD_TOKEN.encode('utf-8')):
+        return jsonify({
+            'error': 'A valid bearer token is required',
+            'status': 'error'
+        }), 401
+    try:
+        space_bot.reload()
+    except (OSError, ValueError) as e:
+        return jsonify({
+            'error': f'Knowledge base reload failed: {str(e)}',
+            'status': 'error'
+        }), 500
+    
+    return jsonify({
+        'topics': len(space_bot.knowledge_base),
+        'timestamp': datetime.datetime.now().isoformat(),
         'status': 'success'
     })
 
@@ -130,5 +302,15 @@ def health_check():
         'status': 'healthy',
         'service': 'AI Chat Service',
         'model_status': 'loaded',
+        'engine': space_bot.engine,
+        'batching': scheduler.stats() if scheduler is not None else {'enabled': False},
+        'response_cache': (space_bot.response_cache.stats() if space_bot.response_cache is not None
+                           else {'enabled': False}),
+        'knowledge_base': {'topics': len(space_bot.knowledge_base), 'reloads': space_bot.reloads,
+                           'reload_errors': space_bot.reload_errors},
+        'sessions': space_bot.sessions.stats() if space_bot.sessions is not None else {'enabled': False},
+        'conversation_log': chat_log.stats() if chat_log is not None else {'enabled': False},
+        'latency_seconds': route_latency('/api/ai'),
+        'stage_seconds': stage_latency('chat'),
         'timestamp': datetime.datetime.now().isoformat()
     }) 
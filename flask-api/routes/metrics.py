@@ -0,0 +1,244 @@
+from flask import Blueprint, Response, jsonify, request
+import time
+from services.nasa_api import CircuitBreaker
+from utils.helpers import float_arg
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, SamplingProfiler, registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Set by init_metrics from the app config
+profiler = None
+
+MAX_PROFILE_SECONDS = 300.0
+REQUEST_DURATION = 'http_request_duration_seconds'
+ENVIRON_KEY = 'metrics.request'
+CIRCUIT_STATES = (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN)
+
+# (route, method) -> histogram and (route, method, status) -> counter, to skip label sorting per request
+_durations = {}
+_requests = {}
+
+
+def init_metrics(app):
+    """Time every request, export service counters at /metrics, and set up the opt-in profiler
+
+    Requests are timed by wrapping ``app.wsgi_app`` rather than with
+    before/after_request hooks, which Flask dispatches at a noticeably higher
+    per-request cost. With ``METRICS_ENABLED`` off nothing is wrapped and the
+    stage timers inside the engines become no-ops; /metrics then only reports
+    the counters the services keep anyway.
+    """
+    global profiler
+    registry.enabled = app.config['METRICS_ENABLED']
+    profiler = SamplingProfiler() if app.config['PROFILER_ENABLED'] else None
+    registry.add_collector('services', _service_metrics)
+    if registry.enabled:
+        app.request_class = _recorded(app.request_class)
+        app.wsgi_app = _timed(app.wsgi_app)
+
+
+def _recorded(request_class):
+    """Request class that leaves itself in the environ, so the WSGI wrapper can read the matched URL rule"""
+    class RecordedRequest(request_class):
+        def __init__(self, environ, *args, **kwargs):
+            super().__init__(environ, *args, **kwargs)
+            environ[ENVIRON_KEY] = self
+
+    return RecordedRequest
+
+
+def _timed(wsgi_app):
+    """WSGI wrapper recording each request; streamed bodies count until the response starts"""
+    def timed_app(environ, start_response):
+        started = time.perf_counter()
+        statuses = []
+
+        def capture_status(status, headers, exc_info=None):
+            statuses.append(status)
+            return start_response(status, headers, exc_info)
+
+        try:
+            return wsgi_app(environ, capture_status)
+        finally:
+            _record_request(environ, statuses[-1][:3] if statuses else '500', time.perf_counter() - started)
+    return timed_app
+
+
+def _record_request(environ, status, elapsed):
+    # The URL rule, not the path, so /api/nasa/passes?norad=... shares one series and 404s share another
+    request = environ.pop(ENVIRON_KEY, None)  # dropping it breaks the environ <-> request cycle
+    rule = request.url_rule if request is not None else None
+    route = rule.rule if rule is not None else 'unmatched'
+    method = environ.get('REQUEST_METHOD', 'GET')
+    key = (route, method)
+    histogram = _durations.get(key)
+    if histogram is None:
+        histogram = _durations[key] = registry.histogram(
+            REQUEST_DURATION, 'Time to handle a request, by URL rule', route=route, method=method)
+    histogram.observe(elapsed)
+    key += (status,)
+    counter = _requests.get(key)
+    if counter is None:
+        counter = _requests[key] = registry.counter(
+            'http_requests_total', 'Requests handled, by URL rule and status', route=route, method=method,
+            status=status)
+    counter.inc()
+
+
+def route_latency(prefix):
+    """p50/p95/p99 per route under ``prefix``, keyed ``"METHOD /rule"``, for health endpoints"""
+    latency = {}
+    for labels, summary in registry.summaries(REQUEST_DURATION).items():
+        labels = dict(labels)
+        if labels['route'].startswith(prefix):
+            latency[f"{labels['method']} {labels['route']}"] = summary
+    return dict(sorted(latency.items()))
+
+
+def stage_latency(*components):
+    """Summary per engine stage of ``components``, keyed ``"component.stage"``"""
+    latency = {}
+    for labels, summary in registry.summaries('stage_duration_seconds').items():
+        labels = dict(labels)
+        if labels['component'] in components:
+            latency[f"{labels['component']}.{labels['stage']}"] = summary
+    return dict(sorted(latency.items()))
+
+
+def _counter_families(prefix, help_prefix, label, sources, fields):
+    """One family per stats field across several ``stats()`` dicts, labelled by source"""
+    families = []
+    for field, kind, help in fields:
+        suffix = '_total' if kind == 'counter' else ''
+        samples = [({label: name}, stats.get(field)) for name, stats in sources.items()]
+        families.append((f'{prefix}_{field}{suffix}', kind, f'{help_prefix} {help}', samples))
+    return families
+
+
+def _service_metrics():
+    """Caches, batcher, conversation log, telemetry hub, upstreams and simulation state, read at scrape time"""
+    import routes.ai_chat as chat
+    import routes.simulation as simulation
+    import routes.tracking as tracking
+    from routes.telemetry import telemetry_hub
+
+    caches = {}
+    if chat.space_bot is not None and chat.space_bot.response_cache is not None:
+        caches['chat'] = chat.space_bot.response_cache.stats()
+    if chat.space_bot is not None and chat.space_bot.sessions is not None:
+        caches['sessions'] = chat.space_bot.sessions.stats()
+    if tracking.pass_predictor is not None:
+        caches['passes'] = tracking.pass_predictor.cache.stats()
+    if simulation.result_cache is not None:
+        caches['simulation'] = simulation.result_cache.stats()
+    yield from _counter_families('cache', 'In-process cache', 'cache', caches, [
+        ('hits', 'counter', 'lookups answered from the cache'),
+        ('misses', 'counter', 'lookups that had to compute'),
+        ('evictions', 'counter', 'entries evicted for space'),
+        ('entries', 'gauge', 'entries held'),
+        ('bytes', 'gauge', 'approximate bytes held'),
+    ])
+
+    if chat.scheduler is not None:
+        batcher = chat.scheduler.stats()
+        yield 'chat_batches_total', 'counter', 'Micro-batches scored', [({}, batcher['batches'])]
+        yield 'chat_batched_messages_total', 'counter', 'Messages scored through micro-batches', [
+            ({}, batcher['items'])]
+        yield 'chat_batch_queue_depth', 'gauge', 'Messages waiting for the next micro-batch', [
+            ({}, batcher['queue_depth'])]
+
+    if chat.chat_log is not None:
+        log = chat.chat_log.stats()
+        yield 'conversation_log_written_total', 'counter', 'Conversation records persisted', [({}, log['written'])]
+        yield 'conversation_log_dropped_total', 'counter', 'Conversation records dropped on a full queue', [
+            ({}, log['dropped'])]
+        yield 'conversation_log_failed_total', 'counter', 'Conversation records lost to write errors', [
+            ({}, log['failed'])]
+        yield 'conversation_log_queue_depth', 'gauge', 'Conversation records waiting to be written', [
+            ({}, log['queue_depth'])]
+
+    hub = telemetry_hub.stats()
+    yield 'telemetry_subscribers', 'gauge', 'Open telemetry streams', [({}, hub['subscribers'])]
+    yield 'telemetry_queued_messages', 'gauge', 'Messages waiting in subscriber queues', [({}, hub['queued_messages'])]
+    yield 'telemetry_source_errors_total', 'counter', 'Telemetry source failures', [({}, hub['source_errors'])]
+    yield 'telemetry_last_tick_seconds', 'gauge', 'Duration of the last telemetry tick', [
+        ({}, hub['last_tick_ms'] / 1000.0)]
+
+    if tracking.nasa_data is not None:
+        upstreams = tracking.nasa_data.stats()
+        yield from _counter_families('upstream', 'Upstream client', 'service', upstreams, [
+            ('hits', 'counter', 'fresh cache hits'),
+            ('stale_hits', 'counter', 'stale entries served'),
+            ('misses', 'counter', 'cache misses'),
+            ('coalesced', 'counter', 'callers that joined an in-flight fetch'),
+            ('upstream_requests', 'counter', 'requests sent upstream'),
+            ('upstream_errors', 'counter', 'failed upstream requests'),
+            ('rejected', 'counter', 'requests refused by the rate limiter or open circuit'),
+        ])
+        yield 'upstream_circuit_state', 'gauge', 'Circuit breaker state, 1 for the current one', [
+            ({'service': name, 'state': state}, int(stats['circuit'] == state))
+            for name, stats in upstreams.items() for state in CIRCUIT_STATES
+        ]
+
+    if simulation.result_cache is not None:
+        results = simulation.result_cache.stats()
+        yield 'simulation_cache_disk_hits_total', 'counter', 'Simulation results read back from the disk tier', [
+            ({}, results['disk_hits'])]
+        yield 'simulation_cache_coalesced_total', 'counter', 'Requests that waited for an identical computation', [
+            ({}, results['coalesced'])]
+
+    if simulation.space_weather_feed is not None:
+        feed = simulation.space_weather_feed.stats()
+        yield 'space_weather_samples_ingested_total', 'counter', 'Space-weather samples stored', [
+            ({}, feed['samples_ingested'])]
+        yield 'space_weather_polls_total', 'counter', 'Space-weather source polls', [({}, feed['polls'])]
+        yield 'space_weather_poll_errors_total', 'counter', 'Failed space-weather polls', [({}, feed['errors'])]
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus text exposition of every registered metric"""
+    return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _profiler_disabled():
+    return jsonify({
+        'error': 'Profiler is disabled; set PROFILER_ENABLED=1 to enable it',
+        'status': 'error'
+    }), 404
+
+
+@metrics_bp.route('/metrics/profile', methods=['POST'])
+def start_profile():
+    """Start sampling stacks in this worker for ``seconds`` at ``interval_ms``"""
+    if profiler is None:
+        return _profiler_disabled()
+    try:
+        seconds = float_arg(request.args, 'seconds', 30.0, 0.1, MAX_PROFILE_SECONDS)
+        interval_ms = float_arg(request.args, 'interval_ms', 5.0, 1.0, 1000.0)
+        profiler.start(interval_ms / 1000.0, seconds)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 409
+    return jsonify({**profiler.stats(), 'seconds': seconds, 'status': 'success'})
+
+
+@metrics_bp.route('/metrics/profile', methods=['GET'])
+def get_profile():
+    """Collapsed stacks of the current or last profile (flamegraph.pl / speedscope input)"""
+    if profiler is None:
+        return _profiler_disabled()
+    response = Response(profiler.collapsed(), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(profiler.samples)
+    response.headers['X-Profile-Running'] = str(profiler.running).lower()
+    return response
+
+
+@metrics_bp.route('/metrics/profile', methods=['DELETE'])
+def stop_profile():
+    """Stop sampling early; the collected stacks stay available"""
+    if profiler is None:
+        return _profiler_disabled()
+    profiler.stop()
+    return jsonify({**profiler.stats(), 'status': 'success'})
@@ -1,80 +1,446 @@
-from flask import Blueprint, jsonify
-import random
+from flask import Blueprint, Response, jsonify, request
+from dataclasses import asdict
 import math
 import datetime
+import numpy as np
+from services.trajectory import ENGINE_VERSION as TRAJECTORY_VERSION
+from services.trajectory import TrajectoryResult, Vehicle, ascent_blocks, ascent_steps, simulate_ascent
+from services.monte_carlo import ENGINE_VERSION as MONTE_CARLO_VERSION
+from services.monte_carlo import MonteCarloResult, run_monte_carlo
+from services.ephemeris import SUN_RADIUS_KM, Ephemeris
+from services.lambert import ENGINE_VERSION as PORKCHOP_VERSION
+from services.lambert import porkchop
+from services.space_weather import (DAY, METRICS, SpaceWeatherFeed, SpaceWeatherStore, geomagnetic_activity,
+                                    swpc_source, synthetic_source, xray_class)
+from services.orbits import ENGINE_VERSION as ORBITS_VERSION
+from services.orbits import EARTH_RADIUS_KM, elements_from_state, orbital_period, propagate
+from services.result_cache import ResultCache, cache_key, etag
+from routes.metrics import route_latency, stage_latency
+from routes.telemetry import telemetry_hub
+from utils.columnar import columnar_response, negotiate, vary_on_accept
+from utils.helpers import datetime_arg, float_arg, int_arg
+from utils.streaming import STREAM_FORMATS, stream_response
 
 simulation_bp = Blueprint('simulation', __name__)
 
+# Opened by init_simulation from the app config
+ephemeris = None
+space_weather_feed = None
+result_cache = None
+
+MAX_TRAJECTORY_STEPS = 2_000_000
+MAX_OUTPUT_POINTS = 10_000
+MAX_MONTE_CARLO_RUNS = 100_000
+MAX_MONTE_CARLO_WORK = 5e8  # runs x steps
+MAX_MONTE_CARLO_SAMPLES = 1e7  # runs x sampled points: three float64 buffers, 240 MB
+MAX_STREAM_POINTS = 5_000_000
+MAX_BINARY_POINTS = 1_000_000
+STREAM_BLOCK_POINTS = 8192
+DEFAULT_SERIES_POINTS = 500
+MAX_SERIES_POINTS = 5000
+MAX_ALERT_EVENTS_LISTED = 20
+DEFAULT_PORKCHOP_SAMPLES = 100
+MAX_PORKCHOP_SAMPLES = 1000  # per axis
+# The 2026 Earth-Mars opportunity
+DEFAULT_PORKCHOP_WINDOWS = {
+    'departure': (datetime.datetime(2026, 9, 1, tzinfo=datetime.timezone.utc),
+                  datetime.datetime(2027, 2, 1, tzinfo=datetime.timezone.utc)),
+    'arrival': (datetime.datetime(2027, 6, 1, tzinfo=datetime.timezone.utc),
+                datetime.datetime(2028, 3, 1, tzinfo=datetime.timezone.utc)),
+}
+PORKCHOP_FIELDS = (('c3', 3), ('v_infinity_arrival', 4), ('delta_v', 4))
+
+TRAJECTORY_FIELDS = (('time', 3), ('altitude', 2), ('velocity', 2), ('fuel_remaining', 2), ('mass', 1))
+ORBIT_FIELDS = (('time_step', None), ('time', 3), ('x', 2), ('y', 2), ('z', 2),
+                ('vx', 4), ('vy', 4), ('vz', 4), ('velocity', 4), ('altitude', 2))
+
+def _output_args(args):
+    """(output format, stream format or None) from ``Accept``/``format=`` and ``stream=ndjson|json``"""
+    output = negotiate(request)
+    stream = args.get('stream')
+    if stream is None:
+        return output, None
+    if stream not in STREAM_FORMATS:
+        raise ValueError(f"'stream' must be one of: {', '.join(STREAM_FORMATS)}")
+    if output != 'json':
+        raise ValueError("'stream' only applies to JSON output")
+    return output, stream
+
+def _point_limit(output):
+    return MAX_OUTPUT_POINTS if output == 'json' else MAX_BINARY_POINTS
+
+def init_simulation(app):
+    """Memory-map the ephemeris tables, load the space-weather history and set up the result cache
+
+    The ephemeris is rebuilt first if it is missing or stale. The space-weather
+    store is backfilled here and kept current by a feed thread that each
+    worker starts on its first space-weather request or telemetry tick. Its
+    latest values and alerts are streamed on the ``space_weather`` channel.
+    """
+    global ephemeris, space_weather_feed, result_cache
+    config = app.config
+    if config['SIMULATION_CACHE_BYTES'] > 0 or config['SIMULATION_CACHE_DIR']:
+        result_cache = ResultCache(config['SIMULATION_CACHE_BYTES'], config['SIMULATION_CACHE_DIR'],
+                                   config['SIMULATION_CACHE_DISK_BYTES'],
+                                   config['SIMULATION_CACHE_MIN_DISK_MS'] / 1000.0)
+    else:
+        result_cache = None
+    ephemeris = Ephemeris.open(app.config['EPHEMERIS_DIR'], app.config['EPHEMERIS_START'],
+                               app.config['EPHEMERIS_END'])
+    source_name = app.config['SPACE_WEATHER_SOURCE']
+    if source_name == 'swpc':
+        source = swpc_source(app.extensions['nasa_data'])
+    elif source_name == 'synthetic':
+        source = synthetic_source
+    else:
+        raise ValueError(f"SPACE_WEATHER_SOURCE must be 'synthetic' or 'swpc', not {source_name!r}")
+    space_weather_feed = SpaceWeatherFeed(SpaceWeatherStore(app.config['SPACE_WEATHER_RETENTION_HOURS']), source,
+                                          app.config['SPACE_WEATHER_INTERVAL'])
+    space_weather_feed.backfill()
+    telemetry_hub.add_source('space_weather', _space_weather_telemetry)
+
+def _space_weather_telemetry(now):
+    """Newest value of every metric, current conditions, and one record per active alert (``alert:<name>``)
+
+    An alert that clears drops out of the frame, so subscribers see it in
+    the hub's ``removed`` list.
+    """
+    space_weather_feed.ensure_running()
+    store = space_weather_feed.store
+    latest = store.latest()
+    records = {metric: {'value': value, 'unit': METRICS[metric][0], 'time': _iso(t)}
+               for metric, (t, value) in latest.items()}
+    kp, xray = latest.get('kp_index', (None, None))[1], latest.get('xray_flux', (None, None))[1]
+    records['conditions'] = {
+        'geomagnetic_activity': geomagnetic_activity(kp) if kp is not None else None,
+        'x_ray_class': xray_class(xray) if xray is not None else None
+    }
+    active, _ = store.alerts()
+    for alert in active:
+        records[f"alert:{alert['alert']}"] = {'value': alert['value'], 'message': alert['message'],
+                                             'time': _iso(alert['time'])}
+    return records
+
+def _cached(key, compute):
+    """``compute()`` (arrays, extras) through the result cache when one is configured"""
+    return result_cache.get(key, compute) if result_cache is not None else compute()
+
+def _not_modified(tag):
+    """A 304 if the client's If-None-Match already holds the representation tagged ``tag``, else None"""
+    if not request.if_none_match.contains_weak(tag):
+        return None
+    response = Response(status=304)
+    response.set_etag(tag)
+    return response
+
+def _tagged(response, tag):
+    response.set_etag(tag)
+    return response
+
+def _vehicle_from_args(args):
+    """Vehicle specs from query parameters, defaulting to the reference vehicle"""
+    defaults = Vehicle()
+    return Vehicle(
+        dry_mass=float_arg(args, 'dry_mass', defaults.dry_mass, 1, 1e7),
+        propellant_mass=float_arg(args, 'propellant_mass', defaults.propellant_mass, 0, 1e8),
+        thrust=float_arg(args, 'thrust', defaults.thrust, 0, 1e9),
+        isp=float_arg(args, 'isp', defaults.isp, 1, 1e4),
+        drag_coefficient=float_arg(args, 'drag_coefficient', defaults.drag_coefficient, 0, 10),
+        reference_area=float_arg(args, 'reference_area', defaults.reference_area, 0, 1e3)
+    )
+
+def _trajectory(key, vehicle, dt, duration):
+    """The full ascent, computed or from the result cache"""
+    def compute():
+        result = simulate_ascent(vehicle, dt=dt, duration=duration)
+        return {'time': result.time, 'altitude': result.altitude, 'velocity': result.velocity,
+                'mass': result.mass}, {'dt': result.dt}
+
+    arrays, extras = _cached(key, compute)
+    return TrajectoryResult(arrays['time'], arrays['altitude'], arrays['velocity'], arrays['mass'], vehicle,
+                            extras['dt'])
+
+def _trajectory_rows(vehicle, dt, duration, stride, summary):
+    """Every ``stride``-th step (and the last) of an ascent, block by block
+
+    ``summary`` is filled in with the same figures as
+    ``TrajectoryResult.summary()``, taken over every step, once the run ends.
+    """
+    steps, step_dt = ascent_steps(vehicle, dt, duration)
+    max_altitude = max_velocity = -math.inf
+    burnout_time = None
+    produced = 0
+    for time, altitude, velocity, mass in ascent_blocks(vehicle, dt, duration, STREAM_BLOCK_POINTS):
+        max_altitude = max(max_altitude, float(altitude.max()))
+        max_velocity = max(max_velocity, float(velocity.max()))
+        if burnout_time is None:
+            burnt = np.nonzero(mass <= vehicle.dry_mass)[0]
+            if len(burnt):
+                burnout_time = float(time[burnt[0]])
+        keep = np.arange(-produced % stride, len(time), stride)
+        produced += len(time)
+        if produced == steps + 1 and (not len(keep) or keep[-1] != len(time) - 1):
+            keep = np.append(keep, len(time) - 1)
+        fuel = ((mass[keep] - vehicle.dry_mass) / vehicle.propellant_mass * 100.0 if vehicle.propellant_mass
+                else np.zeros(len(keep)))
+        yield {'time': time[keep], 'altitude': altitude[keep], 'velocity': velocity[keep],
+               'fuel_remaining': fuel, 'mass': mass[keep]}
+    summary.update({
+        'steps': steps,
+        'dt': step_dt,
+        'max_altitude': max_altitude,
+        'max_velocity': max_velocity,
+        'burnout_time': burnout_time,
+    })
+
 @simulation_bp.route('/rocket-trajectory', methods=['GET'])
+@vary_on_accept
 def rocket_trajectory():
-    """Simulate rocket trajectory data"""
+    """Simulate a rocket ascent with an RK4 integrator"""
     try:
-        # Simulate rocket trajectory points
-        trajectory = []
-        time_points = list(range(0, 301, 5))  # 0 to 300 seconds, every 5 seconds
+        args = request.args
+        vehicle = _vehicle_from_args(args)
+        dt = float_arg(args, 'dt', 0.1, 1e-4, 10)
+        duration = float_arg(args, 'duration', 300.0, 1, 86400)
+        output, stream = _output_args(args)
+        if stream is None:
+            points = int_arg(args, 'points', 61, 2, _point_limit(output))
+        else:
+            stride = int_arg(args, 'stride', 1, 1, MAX_TRAJECTORY_STEPS)
+        if duration / dt > MAX_TRAJECTORY_STEPS:
+            raise ValueError(f'duration / dt must not exceed {MAX_TRAJECTORY_STEPS} steps')
+        vehicle.validate()
+        key = cache_key('trajectory', TRAJECTORY_VERSION, {'vehicle': asdict(vehicle), 'dt': dt, 'duration': duration})
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    
+    metadata = {
+        'duration_seconds': duration,
+        'simulation_type': 'rk4_vertical_ascent',
+        'vehicle': asdict(vehicle)
+    }
+    if stream is not None:
+        summary = {}
+        return stream_response(
+            stream, 'trajectory', _trajectory_rows(vehicle, dt, duration, stride, summary), TRAJECTORY_FIELDS,
+            head={'status': 'success'}, tail=lambda: {'metadata': {**metadata, 'stride': stride, **summary}})
+    
+    tag = etag(key, output, points)
+    not_modified = _not_modified(tag)
+    if not_modified is not None:
+        return not_modified
+    try:
+        result = _trajectory(key, vehicle, dt, duration)
         
-        for t in time_points:
-            # Simple trajectory physics simulation
-            altitude = (t * 150) - (0.5 * 9.81 * (t/10)**2) + random.uniform(-100, 100)
-            altitude = max(0, altitude)  # Can't go below ground
-            
-            velocity = 150 - (9.81 * t/10) + random.uniform(-20, 20)
-            
-            trajectory.append({
-                'time': t,
-                'altitude': round(altitude, 2),
-                'velocity': round(velocity, 2),
-                'fuel_remaining': max(0, 100 - (t/3))
-            })
+        idx = result.sample_indices(points)
+        if output != 'json':
+            return _tagged(columnar_response(output, {
+                'time': result.time[idx],
+                'altitude': result.altitude[idx].astype(np.float32),
+                'velocity': result.velocity[idx].astype(np.float32),
+                'fuel_remaining': result.fuel_remaining[idx].astype(np.float32),
+                'mass': result.mass[idx].astype(np.float32)
+            }, {'status': 'success', 'metadata': {**metadata, **result.summary()}}), tag)
         
-        return jsonify({
+        columns = zip(
+            result.time[idx].round(3).tolist(),
+            result.altitude[idx].round(2).tolist(),
+            result.velocity[idx].round(2).tolist(),
+            result.fuel_remaining[idx].round(2).tolist(),
+            result.mass[idx].round(1).tolist()
+        )
+        trajectory = [
+            {'time': t, 'altitude': h, 'velocity': v, 'fuel_remaining': fuel, 'mass': m}
+            for t, h, v, fuel, m in columns
+        ]
+        
+        return _tagged(jsonify({
             'status': 'success',
             'trajectory': trajectory,
+            'metadata': {**metadata, **result.summary()}
+        }), tag)
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Simulation error: {str(e)}',
+            'status': 'error'
+        }), 500
+
+@simulation_bp.route('/monte-carlo', methods=['GET'])
+def monte_carlo():
+    """Launch dispersion analysis summarized as percentile envelopes over time"""
+    try:
+        args = request.args
+        vehicle = _vehicle_from_args(args)
+        runs = int_arg(args, 'runs', 1000, 1, MAX_MONTE_CARLO_RUNS)
+        seed = int_arg(args, 'seed', 0, 0, 2**32 - 1)
+        dt = float_arg(args, 'dt', 0.1, 1e-3, 10)
+        duration = float_arg(args, 'duration', 300.0, 1, 3600)
+        points = int_arg(args, 'points', 61, 2, 1000)
+        thrust_sigma = float_arg(args, 'thrust_sigma', 0.02, 0, 0.5)
+        mass_sigma = float_arg(args, 'mass_sigma', 0.01, 0, 0.5)
+        drag_sigma = float_arg(args, 'drag_sigma', 0.1, 0, 1)
+        try:
+            percentiles = [float(p) for p in args.get('percentiles', '5,50,95').split(',')]
+        except ValueError:
+            raise ValueError("'percentiles' must be a comma-separated list of numbers") from None
+        if not percentiles or any(not 0 <= p <= 100 for p in percentiles):
+            raise ValueError("'percentiles' must be between 0 and 100")
+        if runs * duration / dt > MAX_MONTE_CARLO_WORK:
+            raise ValueError(f'runs * duration / dt must not exceed {MAX_MONTE_CARLO_WORK:.0e}')
+        if runs * min(points, round(duration / dt) + 1) > MAX_MONTE_CARLO_SAMPLES:
+            raise ValueError(f'runs * points must not exceed {MAX_MONTE_CARLO_SAMPLES:.0e}')
+        key = cache_key('monte_carlo', MONTE_CARLO_VERSION, {
+            'vehicle': asdict(vehicle), 'runs': runs, 'seed': seed, 'dt': dt, 'duration': duration, 'points': points,
+            'percentiles': percentiles, 'sigmas': [thrust_sigma, mass_sigma, drag_sigma]})
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    
+    tag = etag(key)
+    not_modified = _not_modified(tag)
+    if not_modified is not None:
+        return not_modified
+    
+    def compute():
+        result = run_monte_carlo(
+            vehicle, runs=runs, seed=seed, dt=dt, duration=duration, points=points,
+            percentiles=percentiles, thrust_sigma=thrust_sigma, mass_sigma=mass_sigma,
+            drag_sigma=drag_sigma
+        )
+        arrays = {'time': result.time, 'apogee': result.apogee}
+        arrays.update((f'envelope.{name}', values) for name, values in result.envelopes.items())
+        return arrays, {'percentiles': result.percentiles, 'runs': result.runs, 'seed': result.seed}
+    
+    try:
+        arrays, extras = _cached(key, compute)
+        envelopes = {name[len('envelope.'):]: values for name, values in arrays.items()
+                     if name.startswith('envelope.')}
+        result = MonteCarloResult(arrays['time'], extras['percentiles'], envelopes, arrays['apogee'],
+                                  extras['runs'], extras['seed'])
+        
+        return _tagged(jsonify({
+            'status': 'success',
+            'dispersion': result.to_dict(),
             'metadata': {
-                'duration_seconds': 300,
-                'max_altitude': max([point['altitude'] for point in trajectory]),
-                'simulation_type': 'basic_rocket_trajectory'
+                'duration_seconds': duration,
+                'dt': dt,
+                'simulation_type': 'monte_carlo_rk4_vertical_ascent',
+                'sigmas': {
+                    'thrust': thrust_sigma,
+                    'mass': mass_sigma,
+                    'drag_coefficient': drag_sigma
+                },
+                'vehicle': asdict(vehicle)
             }
-        })
+        }), tag)
         
     except Exception as e:
         return jsonify({
-            'error': f'Simulation error: {str(e)}',
+            'error': f'Monte Carlo simulation error: {str(e)}',
             'status': 'error'
         }), 500
 
+def _orbit_block(elements, span, samples, start, stop):
+    """Samples ``start:stop`` of ``samples`` evenly spaced over ``span`` seconds, as output columns"""
+    step = np.arange(start, stop)
+    times = step * (span / (samples - 1))
+    times[step == samples - 1] = span
+    positions, velocities = propagate(elements, times)
+    r = positions[0]
+    v = velocities[0]
+    return {
+        'time_step': step, 'time': times,
+        'x': r[:, 0], 'y': r[:, 1], 'z': r[:, 2],
+        'vx': v[:, 0], 'vy': v[:, 1], 'vz': v[:, 2],
+        'velocity': np.linalg.norm(v, axis=1),
+        'altitude': np.linalg.norm(r, axis=1) - EARTH_RADIUS_KM
+    }
+
 @simulation_bp.route('/orbital-mechanics', methods=['GET'])
+@vary_on_accept
 def orbital_mechanics():
-    """Simulate orbital mechanics data"""
+    """Propagate a Keplerian orbit from classical elements or an ECI state vector"""
     try:
-        # Generate orbital data points
-        orbital_data = []
-        time_steps = 100
-        
-        for i in range(time_steps):
-            angle = (i * 360 / time_steps) * (math.pi / 180)  # Convert to radians
-            radius = 6800 + random.uniform(-50, 50)  # ISS orbital radius ~408km above Earth
-            
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            
-            orbital_data.append({
-                'time_step': i,
-                'x': round(x, 2),
-                'y': round(y, 2),
-                'velocity': round(7.66 + random.uniform(-0.1, 0.1), 2),  # ISS orbital velocity
-                'altitude': round(radius - 6371, 2)  # Earth radius ~6371km
-            })
-        
+        args = request.args
+        state_keys = ('x', 'y', 'z', 'vx', 'vy', 'vz')
+        if any(key in args for key in state_keys):
+            if not all(key in args for key in state_keys):
+                raise ValueError('A state vector needs all of x, y, z, vx, vy, vz')
+            state = [float_arg(args, key, 0.0) for key in state_keys]
+            elements = elements_from_state(state[:3], state[3:])
+        else:
+            altitude = float_arg(args, 'altitude', 408.0, 100, 1e6)
+            elements = {
+                'a': float_arg(args, 'a', EARTH_RADIUS_KM + altitude, EARTH_RADIUS_KM, 1e7),
+                'e': float_arg(args, 'e', 0.0005, 0, 0.99),
+                'i': math.radians(float_arg(args, 'inclination', 51.6, 0, 180)),
+                'raan': math.radians(float_arg(args, 'raan', 0.0, -360, 360)),
+                'argp': math.radians(float_arg(args, 'argp', 0.0, -360, 360)),
+                'mean_anomaly': math.radians(float_arg(args, 'mean_anomaly', 0.0, -360, 360))
+            }
+        elements = {name: float(np.atleast_1d(value)[0]) for name, value in elements.items()}
+        period = float(orbital_period(elements['a']))
+        output, stream = _output_args(args)
+        samples = int_arg(args, 'samples', 100, 2, _point_limit(output) if stream is None else MAX_STREAM_POINTS)
+        span = float_arg(args, 'span', period, 1, 365 * 86400.0)
+        key = cache_key('orbits', ORBITS_VERSION, {'elements': elements, 'span': span, 'samples': samples})
+    except ValueError as e:
         return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    
+    metadata = {
+        'orbital_period_minutes': round(period / 60.0, 2),
+        'span_seconds': span,
+        'elements': {
+            'a': elements['a'],
+            'e': elements['e'],
+            'inclination': math.degrees(elements['i']),
+            'raan': math.degrees(elements['raan']),
+            'argp': math.degrees(elements['argp']),
+            'mean_anomaly': math.degrees(elements['mean_anomaly'])
+        },
+        'simulation_type': 'keplerian_two_body',
+        'frame': 'ECI',
+        'units': {'position': 'km', 'velocity': 'km/s', 'time': 's'},
+        'reference_body': 'Earth'
+    }
+    if stream is not None:
+        blocks = (_orbit_block(elements, span, samples, start, min(start + STREAM_BLOCK_POINTS, samples))
+                  for start in range(0, samples, STREAM_BLOCK_POINTS))
+        return stream_response(stream, 'orbital_data', blocks, ORBIT_FIELDS,
+                               head={'status': 'success'}, tail=lambda: {'metadata': metadata})
+    
+    tag = etag(key, output)
+    not_modified = _not_modified(tag)
+    if not_modified is not None:
+        return not_modified
+    try:
+        block, _ = _cached(key, lambda: (_orbit_block(elements, span, samples, 0, samples), {}))
+        if output != 'json':
+            # time_step is implicit in the row order
+            columns = {name: block[name] if name == 'time' else block[name].astype(np.float32)
+                       for name, _ in ORBIT_FIELDS[1:]}
+            return _tagged(columnar_response(output, columns, {'status': 'success', 'metadata': metadata}), tag)
+        columns = zip(*(block[name].round(decimals).tolist() for name, decimals in ORBIT_FIELDS[1:]))
+        orbital_data = [
+            {'time_step': i, 'time': t, 'x': x, 'y': y, 'z': z, 'vx': vx, 'vy': vy, 'vz': vz,
+             'velocity': speed_i, 'altitude': alt}
+            for i, (t, x, y, z, vx, vy, vz, speed_i, alt) in enumerate(columns)
+        ]
+        
+        return _tagged(jsonify({
             'status': 'success',
             'orbital_data': orbital_data,
-            'metadata': {
-                'orbital_period_minutes': 93,
-                'simulation_type': 'circular_orbit',
-                'reference_body': 'Earth'
-            }
-        })
+            'metadata': metadata
+        }), tag)
         
     except Exception as e:
         return jsonify({
@@ -82,37 +448,255 @@ def orbital_mechanics():
             'status': 'error'
         }), 500
 
+@simulation_bp.route('/ephemeris', methods=['GET'])
+@vary_on_accept
+def ephemeris_positions():
+    """Planet and moon positions interpolated from the precomputed ephemeris tables"""
+    try:
+        args = request.args
+        output = negotiate(request)
+        names = [name.strip().lower() for name in (args.get('bodies') or '').split(',') if name.strip()]
+        names = names or list(ephemeris.bodies)
+        center = (args.get('center') or 'sun').strip().lower()
+        start_arg = 'epoch' if 'end' not in args else 'start'
+        start = datetime_arg(args, start_arg)
+        if 'end' in args:
+            end = datetime_arg(args, 'end')
+            samples = int_arg(args, 'samples', 100, 2, _point_limit(output))
+            if end <= start:
+                raise ValueError("'end' must be after 'start'")
+            times = np.linspace(start.timestamp(), end.timestamp(), samples)
+        else:
+            times = np.array([start.timestamp()])
+
+        def compute():
+            arrays = {}
+            for name in names:
+                arrays[f'{name}.position'], arrays[f'{name}.velocity'] = ephemeris.state(name, times, center)
+            return arrays, {}
+
+        # Epochs defaulting to now differ on every request, so only explicit ones are worth caching
+        tag = None
+        if args.get(start_arg):
+            manifest = ephemeris.manifest
+            key = cache_key('ephemeris', manifest['version'], {
+                'bodies': names, 'center': center, 'times': [times[0], times[-1], len(times)],
+                'table': [manifest['source'], manifest['start'], manifest['end']]})
+            tag = etag(key, output)
+            not_modified = _not_modified(tag)
+            if not_modified is not None:
+                return not_modified
+            arrays, _ = _cached(key, compute)
+        else:
+            arrays, _ = compute()
+        states = {name: (arrays[f'{name}.position'], arrays[f'{name}.velocity']) for name in names}
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        return jsonify({
+            'error': f'Ephemeris error: {str(e)}',
+            'status': 'error'
+        }), 500
+
+    metadata = {
+        'center': center,
+        'frame': ephemeris.manifest['frame'],
+        'units': {'position': 'km', 'velocity': 'km/s'},
+        'source': ephemeris.manifest['source'],
+        'coverage': [datetime.datetime.fromtimestamp(t, datetime.timezone.utc).isoformat()
+                     for t in (ephemeris.start, ephemeris.end)],
+        'memory_mapped': ephemeris.mapped
+    }
+    if output != 'json':
+        columns = {'time': times}
+        for name, (position, velocity) in states.items():
+            for axis, column in zip('xyz', position.T):
+                columns[f'{name}.{axis}'] = column
+            for axis, column in zip('xyz', velocity.T):
+                columns[f'{name}.v{axis}'] = column
+        response = columnar_response(output, columns, {'status': 'success', 'metadata': metadata})
+        return _tagged(response, tag) if tag else response
+
+    bodies = {}
+    for name, (position, velocity) in states.items():
+        body = ephemeris.bodies.get(name, {'parent': None, 'radius_km': SUN_RADIUS_KM})
+        entry = {'parent': body['parent'], 'radius_km': body['radius_km']}
+        if len(times) == 1:
+            entry['position'] = position[0].round(3).tolist()
+            entry['velocity'] = velocity[0].round(6).tolist()
+        else:
+            entry['positions'] = position.round(3).tolist()
+            entry['velocities'] = velocity.round(6).tolist()
+        bodies[name] = entry
+    epochs = [datetime.datetime.fromtimestamp(t, datetime.timezone.utc).isoformat() for t in times.tolist()]
+    response = jsonify({
+        'status': 'success',
+        **({'epoch': epochs[0]} if len(times) == 1 else {'epochs': epochs}),
+        'bodies': bodies,
+        'metadata': metadata
+    })
+    return _tagged(response, tag) if tag else response
+
+def _nullable(rows):
+    """NaN cells as None, since JSON has no NaN"""
+    return [[None if value != value else value for value in row] for row in rows]
+
+@simulation_bp.route('/porkchop', methods=['GET'])
+@vary_on_accept
+def porkchop_plot():
+    """Transfer cost between two planets over a departure x arrival date grid, from Lambert solutions"""
+    try:
+        args = request.args
+        output = negotiate(request)
+        departure_body = (args.get('from') or 'earth').strip().lower()
+        arrival_body = (args.get('to') or 'mars').strip().lower()
+        windows = {}
+        for axis, (default_start, default_end) in DEFAULT_PORKCHOP_WINDOWS.items():
+            start = datetime_arg(args, f'{axis}_start', default_start)
+            end = datetime_arg(args, f'{axis}_end', default_end)
+            if end <= start:
+                raise ValueError(f"'{axis}_end' must be after '{axis}_start'")
+            samples = int_arg(args, f'{axis}_samples', DEFAULT_PORKCHOP_SAMPLES, 2, MAX_PORKCHOP_SAMPLES)
+            windows[axis] = np.linspace(start.timestamp(), end.timestamp(), samples)
+        departure_times, arrival_times = windows['departure'], windows['arrival']
+        if len(departure_times) * len(arrival_times) > _point_limit(output):
+            raise ValueError(f'departure_samples * arrival_samples must not exceed {_point_limit(output)} '
+                             f'for {output} output')
+        departure_altitude = float_arg(args, 'departure_altitude', 200.0, 0, 1e6)
+        arrival_altitude = float_arg(args, 'arrival_altitude', 400.0, 0, 1e6)
+        manifest = ephemeris.manifest
+        key = cache_key('porkchop', PORKCHOP_VERSION, {
+            'from': departure_body, 'to': arrival_body, 'altitudes': [departure_altitude, arrival_altitude],
+            'departure': [departure_times[0], departure_times[-1], len(departure_times)],
+            'arrival': [arrival_times[0], arrival_times[-1], len(arrival_times)],
+            'table': [manifest['version'], manifest['source'], manifest['start'], manifest['end']]})
+        tag = etag(key, output)
+        not_modified = _not_modified(tag)
+        if not_modified is not None:
+            return not_modified
+
+        def compute():
+            result = porkchop(ephemeris, departure_body, arrival_body, departure_times, arrival_times,
+                              departure_altitude, arrival_altitude)
+            return {name: getattr(result, name) for name, _ in PORKCHOP_FIELDS}, {'best': result.best()}
+
+        grids, extras = _cached(key, compute)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        return jsonify({
+            'error': f'Porkchop error: {str(e)}',
+            'status': 'error'
+        }), 500
+
+    best = extras['best']
+    if best is not None:
+        best = {**best, 'departure_time': _iso(best['departure_time']), 'arrival_time': _iso(best['arrival_time'])}
+    metadata = {
+        'from': departure_body,
+        'to': arrival_body,
+        'departure_altitude_km': departure_altitude,
+        'arrival_altitude_km': arrival_altitude,
+        'layout': 'rows are departure epochs, columns arrival epochs; null where no transfer was found',
+        'units': {'c3': 'km^2/s^2', 'v_infinity_arrival': 'km/s', 'delta_v': 'km/s'},
+        'delta_v': 'burn from a circular parking orbit plus capture into a circular orbit',
+        'solver': 'lambert_universal_variables',
+        'source': ephemeris.manifest['source']
+    }
+    if output != 'json':
+        columns = {name: grids[name].astype(np.float32).reshape(-1) for name, _ in PORKCHOP_FIELDS}
+        header = {
+            'status': 'success',
+            'shape': [len(departure_times), len(arrival_times)],
+            **{f'{axis}_epochs': {'start': _iso(times[0]), 'end': _iso(times[-1]), 'samples': len(times)}
+               for axis, times in windows.items()},
+            'best': best,
+            'metadata': metadata
+        }
+        return _tagged(columnar_response(output, columns, header), tag)
+
+    return _tagged(jsonify({
+        'status': 'success',
+        'departure_epochs': [_iso(t) for t in departure_times.tolist()],
+        'arrival_epochs': [_iso(t) for t in arrival_times.tolist()],
+        **{name: _nullable(grids[name].round(decimals).tolist()) for name, decimals in PORKCHOP_FIELDS},
+        'best': best,
+        'metadata': metadata
+    }), tag)
+
+def _iso(unix_seconds):
+    return datetime.datetime.fromtimestamp(unix_seconds, datetime.timezone.utc).isoformat()
+
+def _with_iso_time(event):
+    return {**event, 'time': _iso(event['time'])}
+
 @simulation_bp.route('/space-weather', methods=['GET'])
 def space_weather():
-    """Simulate space weather conditions"""
+    """Current space weather, downsampled history, rolling aggregates and alerts"""
     try:
+        args = request.args
+        end = datetime_arg(args, 'to')
+        start = datetime_arg(args, 'from', end - datetime.timedelta(seconds=DAY))
+        if start >= end:
+            raise ValueError("'from' must be before 'to'")
+        points = int_arg(args, 'points', DEFAULT_SERIES_POINTS, 3, MAX_SERIES_POINTS)
+        method = args.get('method') or 'lttb'
+        metrics = [m.strip() for m in args.get('metrics', '').split(',') if m.strip()] or list(METRICS)
+        unknown = [m for m in metrics if m not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metric '{unknown[0]}'; expected one of: {', '.join(METRICS)}")
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    try:
+        space_weather_feed.ensure_running()
+        store = space_weather_feed.store
+        series = {}
+        for metric in metrics:
+            times, values, in_range = store.query(metric, start.timestamp(), end.timestamp(), points, method)
+            series[metric] = {'unit': METRICS[metric][0], 'samples': in_range,
+                              'time': times.tolist(), 'value': values.tolist()}
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    try:
+        latest = store.latest()
+
+        def current(metric, decimals):
+            return round(latest[metric][1], decimals) if metric in latest else None
+
+        kp, xray = current('kp_index', 2), latest.get('xray_flux', (None, None))[1]
         weather_data = {
-            'solar_wind_speed': round(random.uniform(300, 800), 1),
-            'proton_density': round(random.uniform(1, 15), 2),
-            'magnetic_field_strength': round(random.uniform(2, 25), 1),
-            'kp_index': random.randint(0, 9),
-            'solar_flux': round(random.uniform(70, 300), 1),
-            'x_ray_class': random.choice(['A', 'B', 'C', 'M', 'X']),
-            'geomagnetic_activity': random.choice(['quiet', 'unsettled', 'active', 'minor storm', 'major storm']),
-            'timestamp': datetime.datetime.now().isoformat(),
-            'forecast': {
-                'next_24h': random.choice(['stable', 'increasing', 'decreasing']),
-                'solar_storm_probability': round(random.uniform(0, 100), 1)
-            }
+            'solar_wind_speed': current('solar_wind_speed', 1),
+            'proton_density': current('proton_density', 2),
+            'magnetic_field_strength': current('magnetic_field_strength', 1),
+            'bz': current('bz', 1),
+            'kp_index': kp,
+            'solar_flux': current('solar_flux', 1),
+            'xray_flux': xray,
+            'x_ray_class': xray_class(xray) if xray is not None else None,
+            'geomagnetic_activity': geomagnetic_activity(kp) if kp is not None else None,
+            'timestamp': _iso(max(t for t, _ in latest.values())) if latest else None
         }
-        
+        rolling = store.rolling()
+        active, events = store.alerts()
+
         return jsonify({
             'status': 'success',
             'space_weather': weather_data,
-            'alerts': [
-                'Solar wind speed elevated',
-                'Moderate geomagnetic activity expected'
-            ] if weather_data['kp_index'] > 4 else []
+            'alerts': [alert['message'] for alert in active],
+            'active_alerts': [_with_iso_time(alert) for alert in active],
+            'alert_events': [_with_iso_time(event) for event in events[:MAX_ALERT_EVENTS_LISTED]],
+            # Windows trail each metric's newest sample
+            'rolling': {metric: rolling[metric] for metric in metrics},
+            'series': series,
+            'range': {'from': start.isoformat(), 'to': end.isoformat(), 'points': points, 'method': method},
+            'feed': space_weather_feed.stats()
         })
-        
+
     except Exception as e:
         return jsonify({
-            'error': f'Space weather simulation error: {str(e)}',
+            'error': f'Space weather error: {str(e)}',
             'status': 'error'
         }), 500
 
@@ -124,8 +708,15 @@ def simulation_health():
         'service': 'Space Simulation Service',
         'available_simulations': [
             'rocket-trajectory',
+            'monte-carlo',
             'orbital-mechanics', 
-            'space-weather'
+            'ephemeris',
+            'space-weather',
+            'porkchop'
         ],
+        'result_cache': result_cache.stats() if result_cache is not None else {'enabled': False},
+        'latency_seconds': route_latency('/api/simulation'),
+        'stage_seconds': stage_latency('trajectory', 'monte_carlo', 'orbits', 'ephemeris', 'space_weather',
+                                       'lambert'),
         'timestamp': datetime.datetime.now().isoformat()
     })
@@ -0,0 +1,108 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import json
+import os
+from services.telemetry import HubFull, TelemetryHub
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket upgrade is optional; SSE always works
+    Sock = None
+
+telemetry_bp = Blueprint('telemetry', __name__)
+
+# Sources are registered by the app, which owns the catalogs
+telemetry_hub = TelemetryHub()
+HEARTBEAT_SECONDS = float(os.environ.get('TELEMETRY_HEARTBEAT', 15))
+
+def _subscription_args(args):
+    """``channels=satellites,debris`` and/or ``objects=satellites:25544,...``"""
+    channels = [c for c in (args.get('channels') or '').split(',') if c.strip()]
+    objects = []
+    for item in (args.get('objects') or '').split(','):
+        if not item.strip():
+            continue
+        channel, sep, object_id = item.strip().partition(':')
+        if not sep or not object_id:
+            raise ValueError("'objects' entries must look like channel:id")
+        objects.append((channel, object_id))
+    return channels, objects
+
+def _sse(subscription):
+    try:
+        # Ask EventSource to reconnect quickly if the connection drops
+        yield 'retry: 2000\n\n'
+        while True:
+            message = subscription.get(timeout=HEARTBEAT_SECONDS)
+            if message is None:
+                if subscription.closed:
+                    return
+                yield ': keepalive\n\n'
+                continue
+            kind, seq, payload = message
+            yield f'id: {seq}\nevent: {kind}\ndata: {payload}\n\n'
+    finally:
+        subscription.close()
+
+@telemetry_bp.route('/telemetry')
+def telemetry_stream():
+    """Server-sent events: a snapshot, then field-level deltas every tick"""
+    try:
+        subscription = telemetry_hub.subscribe(*_subscription_args(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except HubFull as e:
+        response = jsonify({'error': str(e), 'status': 'error'})
+        # EventSource reconnects on its own; this hints when a slot may be free
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    response = Response(stream_with_context(_sse(subscription)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+@telemetry_bp.route('/stats')
+def telemetry_stats():
+    """Hub and subscriber queue metrics"""
+    return jsonify({**telemetry_hub.stats(), 'websocket': Sock is not None})
+
+def init_websocket(app):
+    """Serve the same stream at /api/stream/ws when flask-sock is installed
+
+    Frames are the JSON payloads from the SSE stream. The client may send
+    ``{"channels": [...], "objects": ["channel:id", ...]}`` at any time to
+    replace its subscription.
+    """
+    if Sock is None:
+        return False
+    sock = Sock(app)
+
+    @sock.route('/api/stream/ws')
+    def telemetry_socket(ws):
+        try:
+            subscription = telemetry_hub.subscribe(*_subscription_args(request.args))
+        except (ValueError, HubFull) as e:
+            ws.send(json.dumps({'error': str(e), 'status': 'error'}))
+            return
+        try:
+            while True:
+                incoming = ws.receive(timeout=0)
+                if incoming:
+                    try:
+                        wanted = json.loads(incoming)
+                        replacement = telemetry_hub.subscribe(*_subscription_args({
+                            'channels': ','.join(wanted.get('channels', [])),
+                            'objects': ','.join(wanted.get('objects', [])),
+                        }), replace=subscription)
+                    except (ValueError, AttributeError) as e:
+                        ws.send(json.dumps({'error': str(e), 'status': 'error'}))
+                    else:
+                        subscription.close()
+                        subscription = replacement
+                message = subscription.get(timeout=1.0)
+                if message is not None:
+                    ws.send(message[2])
+        finally:
+            subscription.close()
+
+    return True
@@ -0,0 +1,466 @@
+from flask import Blueprint, request, jsonify
+import datetime
+import math
+import numpy as np
+import routes.simulation as simulation
+from routes.telemetry import telemetry_hub
+from services.passes import PassPredictor, Site, pass_to_dict
+from services.nasa_api import NasaDataClient
+from services.debris import ENGINE_VERSION as SCREENING_VERSION
+from services.debris import RISK_LEVELS, SIZE_CLASSES, Conjunctions, DebrisCatalog, screen_conjunctions
+from services.result_cache import cache_key
+from services.satellite_catalog import SatelliteCatalog
+from utils.columnar import columnar_response, negotiate, vary_on_accept
+from utils.helpers import datetime_arg, float_arg, int_arg
+
+tracking_bp = Blueprint('tracking', __name__)
+
+MAX_SATELLITES_PER_PAGE = 1000
+MAX_SATELLITES_PER_BINARY_PAGE = 100_000
+
+ISS_CATALOG_NUMBER = 25544
+DEFAULT_SITE = (29.5593, -95.0900)  # Johnson Space Center
+MAX_PASS_SITES = 100
+MAX_PASS_OBJECTS = 1000
+
+MAX_SCREENING_SAMPLES = 2880
+MAX_CONJUNCTIONS_LISTED = 100
+SCREENING_BUCKET = 60.0
+
+# Built by init_tracking from the app config
+satellite_catalog = None
+pass_predictor = None
+debris_catalog = None
+debris_source = None
+nasa_data = None
+
+
+def init_tracking(app):
+    """Load the catalogs, set up the upstream feed client, and feed the catalogs to the telemetry hub
+
+    Called by ``create_app``; with a preloading server the catalogs are
+    built once in the parent and shared copy-on-write by the workers.
+    """
+    global satellite_catalog, pass_predictor, debris_catalog, debris_source, nasa_data, SCREENING_BUCKET
+    satellite_catalog = SatelliteCatalog(app.config['TLE_DIR'])
+    pass_predictor = PassPredictor(satellite_catalog)
+    debris_catalog = DebrisCatalog.synthetic(app.config['DEBRIS_CATALOG_SIZE'], app.config['DEBRIS_SEED'])
+    debris_source = ['synthetic', app.config['DEBRIS_CATALOG_SIZE'], app.config['DEBRIS_SEED']]
+    SCREENING_BUCKET = app.config['DEBRIS_SCREENING_BUCKET']
+    nasa_data = NasaDataClient(app.config['OPEN_NOTIFY_URL'], app.config['CELESTRAK_URL'], app.config['SWPC_URL'])
+    app.extensions['nasa_data'] = nasa_data
+    telemetry_hub.add_source('satellites', _satellite_telemetry)
+    telemetry_hub.add_source('debris', _debris_telemetry)
+
+
+def _position_records(ids, state):
+    """Telemetry records keyed by object id; rounding keeps unchanged fields out of deltas"""
+    return {
+        object_id: {'latitude': round(lat, 4), 'longitude': round(lon, 4), 'altitude': round(alt, 2),
+                    'velocity': round(speed, 3)}
+        for object_id, lat, lon, alt, speed in zip(ids, state['latitude'].tolist(), state['longitude'].tolist(),
+                                                   state['altitude'].tolist(), state['speed'].tolist())
+    }
+
+
+def _satellite_telemetry(now):
+    state = satellite_catalog.propagate(datetime.datetime.fromtimestamp(now, datetime.timezone.utc))
+    records = _position_records([str(n) for n in satellite_catalog.satnum.tolist()], state)
+    for record, name, code in zip(records.values(), satellite_catalog.names.tolist(),
+                                  satellite_catalog.type_codes.tolist()):
+        record['name'] = name
+        record['type'] = satellite_catalog.types[code]
+    return records
+
+
+def _debris_telemetry(now):
+    state = debris_catalog.objects.propagate(datetime.datetime.fromtimestamp(now, datetime.timezone.utc))
+    return _position_records(debris_catalog.objects.names.tolist(), state)
+
+
+def _catalog_rows(raw):
+    """Catalog rows for comma-separated NORAD numbers"""
+    try:
+        wanted = [int(v) for v in raw.split(',') if v.strip()]
+    except ValueError:
+        raise ValueError("'objects' must be comma-separated catalog numbers") from None
+    rows = []
+    for number in wanted:
+        match = np.flatnonzero(satellite_catalog.satnum == number)
+        if not len(match):
+            raise ValueError(f'No satellite with catalog number {number}')
+        rows.append(int(match[0]))
+    return rows
+
+
+def _parse_sites(raw, min_elevation):
+    """``lat,lon[,alt_km];...`` into Site tuples"""
+    sites = []
+    for part in raw.split(';'):
+        if not part.strip():
+            continue
+        try:
+            values = [float(v) for v in part.split(',')]
+        except ValueError:
+            values = []
+        if len(values) not in (2, 3) or not (-90 <= values[0] <= 90 and -180 <= values[1] <= 360):
+            raise ValueError("'sites' must be 'lat,lon[,alt_km]' entries separated by ';'")
+        sites.append(Site(*values[:2], values[2] if len(values) == 3 else 0.0, min_elevation))
+    if not sites or len(sites) > MAX_PASS_SITES:
+        raise ValueError(f"'sites' must list between 1 and {MAX_PASS_SITES} sites")
+    return sites
+
+
+@tracking_bp.route('/api/nasa/iss')
+def get_iss_data():
+    """ISS position from its element set, with the next pass over an observer"""
+    try:
+        args = request.args
+        epoch = datetime_arg(args, 'epoch')
+        site = Site(float_arg(args, 'lat', DEFAULT_SITE[0], -90.0, 90.0),
+                    float_arg(args, 'lon', DEFAULT_SITE[1], -180.0, 360.0),
+                    float_arg(args, 'alt', 0.0, -1.0, 10.0),
+                    float_arg(args, 'min_elevation', 10.0, 0.0, 90.0))
+        rows = _catalog_rows(str(ISS_CATALOG_NUMBER))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    try:
+        state = satellite_catalog.propagate(epoch, np.array(rows))
+        upcoming = pass_predictor.predict(rows, [site], epoch, days=2)
+        return jsonify({
+            'position': {
+                'latitude': round(float(state['latitude'][0]), 4),
+                'longitude': round(float(state['longitude'][0]), 4),
+                'altitude': round(float(state['altitude'][0]), 2)
+            },
+            'velocity': round(float(state['speed'][0]) * 3600.0, 2),  # km/h
+            'timestamp': epoch.isoformat(),
+            'crew_count': 7,
+            'next_pass': pass_to_dict(upcoming[0]) if upcoming else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+
+@tracking_bp.route('/api/nasa/passes')
+def get_passes():
+    """Rise, culmination and set times of catalog objects over ground sites"""
+    try:
+        args = request.args
+        start = datetime_arg(args, 'start')
+        days = float_arg(args, 'days', 1.0, 0.01, 7.0)
+        min_elevation = float_arg(args, 'min_elevation', 10.0, 0.0, 90.0)
+        sites = _parse_sites(args.get('sites') or '{},{}'.format(*DEFAULT_SITE), min_elevation)
+        if args.get('type'):
+            rows = satellite_catalog.select(args['type']).tolist()
+        else:
+            rows = _catalog_rows(args.get('objects') or str(ISS_CATALOG_NUMBER))
+        if len(rows) > MAX_PASS_OBJECTS:
+            raise ValueError(f'At most {MAX_PASS_OBJECTS} objects can be predicted at once')
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    try:
+        passes = pass_predictor.predict(rows, sites, start, days)
+        return jsonify({
+            'passes': [
+                {
+                    'id': str(satellite_catalog.satnum[p.object_row]),
+                    'name': str(satellite_catalog.names[p.object_row]),
+                    'site': p.site,
+                    **pass_to_dict(p)
+                }
+                for p in passes
+            ],
+            'total_count': len(passes),
+            'sites': [site._asdict() for site in sites],
+            'start': start.isoformat(),
+            'days': days,
+            'cache': pass_predictor.cache.stats(),
+            'timestamp': datetime.datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+@tracking_bp.route('/api/nasa/upstream')
+def get_upstream_stats():
+    """Cache, coalescing and circuit breaker counters of the upstream feed clients"""
+    return jsonify({'upstreams': nasa_data.stats(), 'timestamp': datetime.datetime.now().isoformat()})
+
+@tracking_bp.route('/api/nasa/satellites')
+@vary_on_accept
+def get_satellite_data():
+    """Satellite positions propagated from the TLE catalog"""
+    try:
+        args = request.args
+        output = negotiate(request)
+        epoch = datetime_arg(args, 'epoch')
+        min_alt = float_arg(args, 'min_alt', -math.inf)
+        max_alt = float_arg(args, 'max_alt', math.inf)
+        page = int_arg(args, 'page', 1, 1)
+        per_page = int_arg(args, 'per_page', 100, 1,
+                           MAX_SATELLITES_PER_PAGE if output == 'json' else MAX_SATELLITES_PER_BINARY_PAGE)
+        index = satellite_catalog.select(args.get('type') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    try:
+        state = satellite_catalog.propagate(epoch, index)
+        in_band = (state['altitude'] >= min_alt) & (state['altitude'] <= max_alt)
+        matches = np.flatnonzero(in_band)
+        rows = matches[(page - 1) * per_page:page * per_page]
+        catalog_rows = index[rows]
+        page_info = {
+            'total_count': len(matches),
+            'page': page,
+            'per_page': per_page,
+            'pages': -(-len(matches) // per_page),
+            'types': satellite_catalog.types,
+            'epoch': epoch.isoformat(),
+            'timestamp': datetime.datetime.now().isoformat()
+        }
+
+        if output != 'json':
+            # Names ride in the header; type is an index into 'types'
+            return columnar_response(output, {
+                'id': satellite_catalog.satnum[catalog_rows],
+                'type': satellite_catalog.type_codes[catalog_rows],
+                'latitude': state['latitude'][rows].astype(np.float32),
+                'longitude': state['longitude'][rows].astype(np.float32),
+                'altitude': state['altitude'][rows].astype(np.float32),
+                'velocity': state['speed'][rows].astype(np.float32),
+            }, {'names': satellite_catalog.names[catalog_rows].tolist(), **page_info})
+
+        satellite_data = [
+            {
+                'id': str(satnum),
+                'name': name,
+                'type': satellite_catalog.types[code],
+                'position': {
+                    'latitude': round(lat, 4),
+                    'longitude': round(lon, 4),
+                    'altitude': round(alt, 2)
+                },
+                'velocity': round(speed, 3),  # km/s
+                'status': 'operational'
+            }
+            for satnum, name, code, lat, lon, alt, speed in zip(
+                satellite_catalog.satnum[catalog_rows].tolist(),
+                satellite_catalog.names[catalog_rows].tolist(),
+                satellite_catalog.type_codes[catalog_rows].tolist(),
+                state['latitude'][rows].tolist(),
+                state['longitude'][rows].tolist(),
+                state['altitude'][rows].tolist(),
+                state['speed'][rows].tolist(),
+            )
+        ]
+
+        return jsonify({'satellites': satellite_data, **page_info})
+    except Exception as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+def _parse_bbox(raw):
+    """``x_min,y_min,z_min,x_max,y_max,z_max`` in ECI km, or None"""
+    if not raw:
+        return None
+    try:
+        values = [float(v) for v in raw.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != 6:
+        raise ValueError("'bbox' must be six comma-separated numbers: x_min,y_min,z_min,x_max,y_max,z_max")
+    return np.array(values[:3]), np.array(values[3:])
+
+
+def _timestamp(unix_seconds):
+    return datetime.datetime.fromtimestamp(unix_seconds, datetime.timezone.utc).isoformat()
+
+
+def _screen(start, window, step, threshold, asset_index):
+    """Conjunctions from ``start``, through the simulation result cache when one is configured
+
+    A miss screens the whole catalog (about half a second for 10k objects);
+    concurrent requests for the same screening wait for that run, and the
+    disk tier shares it with the other workers.
+    """
+    assets = None if asset_index is None else [satellite_catalog.satnum[asset_index].tolist(),
+                                               satellite_catalog.epoch[asset_index].tolist()]
+    key = cache_key('conjunctions', SCREENING_VERSION, {
+        'start': start, 'window': window, 'step': step, 'threshold': threshold,
+        'debris': debris_source, 'assets': assets})
+
+    def compute():
+        if asset_index is None:
+            found = screen_conjunctions(debris_catalog.objects, start, window, step, threshold)
+        else:
+            found = screen_conjunctions(debris_catalog.objects, start, window, step, threshold,
+                                        assets=satellite_catalog, asset_index=asset_index)
+        return {'primary': found.primary, 'secondary': found.secondary, 'tca': found.tca,
+                'miss_distance': found.miss_distance, 'relative_speed': found.relative_speed}, {}
+
+    cache = simulation.result_cache
+    arrays, _ = cache.get(key, compute) if cache is not None else compute()
+    return Conjunctions(**arrays)
+
+
+@tracking_bp.route('/api/space/debris')
+def get_debris_data():
+    """Debris positions with risk levels from conjunction screening"""
+    try:
+        args = request.args
+        epoch = datetime_arg(args, 'epoch')
+        window = float_arg(args, 'window', 600.0, 0.0, 86400.0)
+        step = float_arg(args, 'step', 30.0, 1.0, 300.0)
+        threshold = float_arg(args, 'threshold', 10.0, 0.1, 50.0)
+        min_alt = float_arg(args, 'min_alt', -math.inf)
+        max_alt = float_arg(args, 'max_alt', math.inf)
+        box = _parse_bbox(args.get('bbox'))
+        page = int_arg(args, 'page', 1, 1)
+        per_page = int_arg(args, 'per_page', 100, 1, MAX_SATELLITES_PER_PAGE)
+        if window / step > MAX_SCREENING_SAMPLES:
+            raise ValueError(f'window/step must not exceed {MAX_SCREENING_SAMPLES} samples')
+        asset_index = None
+        if args.get('asset'):
+            asset_index = np.flatnonzero(satellite_catalog.satnum == int_arg(args, 'asset', 0))
+            if not len(asset_index):
+                raise ValueError(f"No satellite with catalog number {args['asset']}")
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+    try:
+        snapshot = debris_catalog.snapshot(epoch)
+        region = debris_catalog.region(snapshot, box, min_alt, max_alt)
+        start = epoch.timestamp()
+        if SCREENING_BUCKET > 0:
+            start = math.floor(start / SCREENING_BUCKET) * SCREENING_BUCKET
+        conjunctions = _screen(start, window, step, threshold, asset_index)
+        if asset_index is None:
+            # Both sides of an all-vs-all conjunction are debris
+            involved = np.concatenate([conjunctions.primary, conjunctions.secondary])
+            partners = np.concatenate([conjunctions.secondary, conjunctions.primary])
+            pair_row = np.tile(np.arange(len(conjunctions)), 2)
+            partner_names = debris_catalog.objects.names
+        else:
+            involved = conjunctions.secondary
+            partners = asset_index[conjunctions.primary]
+            pair_row = np.arange(len(conjunctions))
+            partner_names = satellite_catalog.names
+
+        # Each object's closest approach decides its risk level
+        risk = np.zeros(len(debris_catalog), dtype=np.int8)
+        closest = np.full(len(debris_catalog), -1)
+        closest_partner = np.full(len(debris_catalog), -1)
+        by_miss = np.argsort(conjunctions.miss_distance[pair_row], kind='stable')
+        objects, first = np.unique(involved[by_miss], return_index=True)
+        closest[objects] = pair_row[by_miss[first]]
+        closest_partner[objects] = partners[by_miss[first]]
+        risk[objects] = conjunctions.risk[closest[objects]]
+
+        rows = region[(page - 1) * per_page:page * per_page]
+        debris_objects = []
+        for row, lat, lon, alt, speed in zip(rows.tolist(), snapshot['latitude'][rows].tolist(),
+                                             snapshot['longitude'][rows].tolist(),
+                                             snapshot['altitude'][rows].tolist(),
+                                             np.linalg.norm(snapshot['velocity'][rows], axis=1).tolist()):
+            entry = {
+                'id': str(debris_catalog.objects.names[row]),
+                'position': {
+                    'latitude': round(lat, 4),
+                    'longitude': round(lon, 4),
+                    'altitude': round(alt, 2)
+                },
+                'size': SIZE_CLASSES[debris_catalog.size_codes[row]],
+                'risk_level': RISK_LEVELS[risk[row]],
+                'velocity': round(speed, 2),
+                'tracking_confidence': round(float(debris_catalog.tracking_confidence[row]), 2)
+            }
+            k = closest[row]
+            if k >= 0:
+                entry['closest_approach'] = {
+                    'object': str(partner_names[closest_partner[row]]),
+                    'miss_distance': round(float(conjunctions.miss_distance[k]), 3),
+                    'tca': _timestamp(conjunctions.tca[k])
+                }
+            debris_objects.append(entry)
+
+        primary_names = debris_catalog.objects.names if asset_index is None else satellite_catalog.names[asset_index]
+        conjunction_list = [
+            {
+                'primary': str(primary_names[i]),
+                'secondary': str(debris_catalog.objects.names[j]),
+                'tca': _timestamp(tca),
+                'miss_distance': round(miss, 3),  # km
+                'relative_speed': round(speed, 3),  # km/s
+                'risk_level': RISK_LEVELS[code]
+            }
+            for i, j, tca, miss, speed, code in zip(
+                conjunctions.primary[:MAX_CONJUNCTIONS_LISTED].tolist(),
+                conjunctions.secondary[:MAX_CONJUNCTIONS_LISTED].tolist(),
+                conjunctions.tca[:MAX_CONJUNCTIONS_LISTED].tolist(),
+                conjunctions.miss_distance[:MAX_CONJUNCTIONS_LISTED].tolist(),
+                conjunctions.relative_speed[:MAX_CONJUNCTIONS_LISTED].tolist(),
+                conjunctions.risk[:MAX_CONJUNCTIONS_LISTED].tolist(),
+            )
+        ]
+
+        return jsonify({
+            'debris': debris_objects,
+            'total_tracked': len(region),
+            'high_risk_count': int(np.count_nonzero(risk[region] == 2)),
+            'page': page,
+            'per_page': per_page,
+            'conjunctions': conjunction_list,
+            'conjunction_count': len(conjunctions),
+            'screening': {
+                'start': _timestamp(start),
+                'window': window,
+                'step': step,
+                'threshold': threshold,
+                'asset': args.get('asset') or None
+            },
+            'epoch': epoch.isoformat(),
+            'timestamp': datetime.datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+@tracking_bp.route('/api/astronauts/current')
+def get_current_astronauts():
+    """Current astronauts in space"""
+    astronauts = [
+        {
+            'name': 'Frank Rubio',
+            'nationality': 'USA',
+            'agency': 'NASA',
+            'mission': 'ISS Expedition 68-69',
+            'launch_date': '2022-09-21',
+            'days_in_space': (datetime.datetime.now() - datetime.datetime(2022, 9, 21)).days,
+            'role': 'Flight Engineer'
+        },
+        {
+            'name': 'Sergey Prokopyev',
+            'nationality': 'Russia',
+            'agency': 'Roscosmos',
+            'mission': 'ISS Expedition 68-69',
+            'launch_date': '2022-09-21',
+            'days_in_space': (datetime.datetime.now() - datetime.datetime(2022, 9, 21)).days,
+            'role': 'Commander'
+        },
+        {
+            'name': 'Dmitri Petelin',
+            'nationality': 'Russia',
+            'agency': 'Roscosmos',
+            'mission': 'ISS Expedition 68-69',
+            'launch_date': '2022-09-21',
+            'days_in_space': (datetime.datetime.now() - datetime.datetime(2022, 9, 21)).days,
+            'role': 'Flight Engineer'
+        }
+    ]
+    
+    return jsonify({
+        'astronauts': astronauts,
+        'total_count': len(astronauts),
+        'average_days_in_space': sum(a['days_in_space'] for a in astronauts) // len(astronauts),
+        'timestamp': datetime.datetime.now().isoformat()
+    })
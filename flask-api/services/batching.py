@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class SchedulerOverloaded(RuntimeError):
+    """Raised when the micro-batching queue is full"""
+
+
+class MicroBatcher:
+    """Collects concurrent requests for a short window and processes them as one batch
+
+    A batch is flushed as soon as ``max_batch_size`` items are waiting or the
+    oldest waiting item is ``max_wait_ms`` old, whichever comes first. The
+    handler receives the list of items and must return results in the same
+    order. The worker thread is started lazily so that a scheduler created
+    before a fork (gunicorn preload) gets its own thread in every worker.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0, max_queue: int = 10000):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.batch_size_histogram: Dict[int, int] = {}
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: Sequence[Any]) -> List[Future]:
+        """Enqueue items together; they may share a batch with other callers"""
+        futures = [Future() for _ in items]
+        now = time.monotonic()
+        with self._cond:
+            if len(self._queue) + len(items) > self.max_queue:
+                raise SchedulerOverloaded(f'Batch queue is full ({self.max_queue} items)')
+            self._ensure_worker()
+            self._queue.extend((item, future, now) for item, future in zip(items, futures))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return futures
+
+    def _next_batch(self) -> list:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            futures = [future for _, future, _ in batch]
+            try:
+                results = self.handler([item for item, _, _ in batch])
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            size = len(batch)
+            self.batches += 1
+            self.items += size
+            self.total_wait += sum(started - enqueued for _, _, enqueued in batch)
+            bucket = 1 << (size - 1).bit_length()
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch size metrics for tuning the batching window"""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': len(self._queue),
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'avg_queue_wait_ms': round(self.total_wait / self.items * 1000.0, 3) if self.items else 0.0,
+            # Keys are the power-of-two upper bound of the batch size bucket
+            'batch_size_histogram': {str(k): v for k, v in sorted(self.batch_size_histogram.items())},
+        }
@@ -0,0 +1,340 @@
+import abc
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+DEFAULT_LOG_DIR = os.environ.get('CONVERSATION_LOG_DIR',
+                                 os.path.join(os.path.dirname(__file__), '..', 'data', 'conversations'))
+SEGMENT_PREFIX = 'conversations-'
+OVERFLOW_POLICIES = ('drop', 'block')
+# Columns of the SQLite table; any other record fields go into ``data`` as JSON
+SQLITE_FIELDS = ('timestamp', 'user_id', 'user_message', 'bot_response', 'confidence')
+# Shared encoder: json.dumps with non-default options builds a new one per call
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class SegmentSink(abc.ABC):
+    """Append-only segment files in ``directory``, one writer process per segment
+
+    Segments are named ``conversations-<UTC time>-<pid>-<seq><suffix>`` so
+    that names sort by creation time and preforked workers never share a
+    file. A new segment starts once the current one reaches ``max_bytes``;
+    beyond ``max_files`` segments the oldest are deleted. If another process
+    prunes the segment being written, the next batch starts a new one.
+    """
+
+    suffix = ''
+
+    def __init__(self, directory: str = DEFAULT_LOG_DIR, max_bytes: int = 64 << 20, max_files: int = 20,
+                 fsync: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.fsync = fsync
+        self.path: Optional[str] = None
+        self.size = 0
+        self.rotations = 0
+        self._sequence = 0
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        """Persist ``records`` as one group commit"""
+        if self.path is None or not os.path.exists(self.path):
+            self._start_segment()
+        self.size += self._append(records)
+        if self.size >= self.max_bytes:
+            self.close()
+            self.rotations += 1
+
+    def _start_segment(self) -> None:
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+        name = f'{SEGMENT_PREFIX}{stamp}-{os.getpid()}-{self._sequence:04d}{self.suffix}'
+        self.path = os.path.join(self.directory, name)
+        self.size = 0
+        self._open(self.path)
+        self._prune()
+
+    def segments(self) -> List[str]:
+        """Segment paths of this sink's format, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(self.directory, name) for name in names
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(self.suffix))
+
+    def _prune(self) -> None:
+        segments = self.segments()
+        for path in segments[:max(0, len(segments) - self.max_files)]:
+            if path != self.path:
+                for stale in (path, path + '-wal', path + '-shm'):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+
+    @abc.abstractmethod
+    def _open(self, path: str) -> None:
+        """Open a new segment file at ``path``"""
+
+    @abc.abstractmethod
+    def _append(self, records: List[Dict[str, Any]]) -> int:
+        """Write and commit ``records``; returns the bytes added"""
+
+    @abc.abstractmethod
+    def _close(self) -> None:
+        """Close the current segment file, if one is open"""
+
+    def close(self) -> None:
+        """Close the current segment; the next write starts a new one"""
+        self._close()
+        self.path = None
+
+
+class JsonlSink(SegmentSink):
+    """One JSON object per line; each batch is a single write() followed by fsync"""
+
+    suffix = '.jsonl'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._file = None
+
+    def _open(self, path: str) -> None:
+        self._file = open(path, 'ab')
+
+    def _append(self, records: List[Dict[str, Any]]) -> int:
+        data = ''.join(_encoder.encode(record) + '\n' for record in records).encode('utf-8')
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        return len(data)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SqliteSink(SegmentSink):
+    """A WAL-mode SQLite database per segment; each batch is one transaction
+
+    The connection is opened and used by the writer thread; ``close`` may
+    come from another thread once the writer is idle. Without ``fsync``
+    commits skip the WAL sync (synchronous=OFF).
+    """
+
+    suffix = '.sqlite3'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _open(self, path: str) -> None:
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(f"PRAGMA synchronous={'NORMAL' if self.fsync else 'OFF'}")
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS conversations (id INTEGER PRIMARY KEY, timestamp TEXT, user_id TEXT, '
+            'user_message TEXT, bot_response TEXT, confidence REAL, data TEXT)')
+
+    def _append(self, records: List[Dict[str, Any]]) -> int:
+        rows = []
+        size = 0
+        for record in records:
+            extra = {key: value for key, value in record.items() if key not in SQLITE_FIELDS}
+            row = tuple(record.get(field) for field in SQLITE_FIELDS) + (_encoder.encode(extra) if extra else None,)
+            size += sum(len(str(value)) for value in row if value is not None)
+            rows.append(row)
+        with self._connection:  # one transaction per batch
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'INSERT INTO conversations (timestamp, user_id, user_message, bot_response, confidence, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return size
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+SINKS = {'jsonl': JsonlSink, 'sqlite': SqliteSink}
+
+
+class ConversationLog:
+    """Bounded in-memory queue drained into a sink by a background writer thread
+
+    ``log`` only appends to a deque, so a chat request never waits on disk.
+    The writer takes up to ``batch_size`` records at a time and writes them
+    as one group commit once ``batch_size`` are waiting or the oldest has
+    waited ``flush_interval`` seconds. When ``max_queue`` records are
+    waiting, the ``drop`` policy discards new records and ``block`` waits up
+    to ``block_timeout`` for room before discarding; either way the request
+    carries on and ``dropped`` counts the loss. A failed write drops that
+    batch and is counted in ``write_errors``. Like ``MicroBatcher``, the
+    thread starts lazily in each process, and ``log`` starts it again if it
+    has died.
+    """
+
+    def __init__(self, sink: SegmentSink, max_queue: int = 100_000, batch_size: int = 1000,
+                 flush_interval: float = 0.5, overflow: str = 'drop', block_timeout: float = 0.05):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy must be one of: {', '.join(OVERFLOW_POLICIES)}")
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._oldest = 0.0
+        self._blocked = 0
+        self._flushes = 0
+
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed = 0
+        self.write_errors = 0
+        self.worker_restarts = 0
+        self.last_error: Optional[str] = None
+        self.max_queue_depth = 0
+        self.total_write_seconds = 0.0
+        atexit.register(self.close)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            if self._thread.is_alive():
+                return
+            # The writer died; without a new one every queued record would be lost silently
+            self.worker_restarts += 1
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='conversation-log', daemon=True)
+        self._thread.start()
+
+    def log(self, record: Dict[str, Any]) -> bool:
+        """Queue ``record`` for writing; False if it was dropped because the queue is full"""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == 'drop' or not self._wait_for_room():
+                    self.dropped += 1
+                    return False
+            self._ensure_worker()
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append(record)
+            self.queued += 1
+            if len(self._queue) > self.max_queue_depth:
+                self.max_queue_depth = len(self._queue)
+            # Wake the writer to start the flush timer, or because a full batch is ready
+            if len(self._queue) == 1 or len(self._queue) == self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _wait_for_room(self) -> bool:
+        """Called holding the lock; True once the queue has room, False after block_timeout"""
+        self._blocked += 1
+        try:
+            return self._cond.wait_for(lambda: len(self._queue) < self.max_queue, self.block_timeout)
+        finally:
+            self._blocked -= 1
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            while True:
+                if self._queue and (len(self._queue) >= self.batch_size or self._flushes):
+                    break
+                if self._queue:
+                    remaining = self._oldest + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            size = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(size)]
+            # Records left behind keep the old deadline, which can only flush them early
+            if self._blocked:
+                self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            try:
+                self.sink.write(batch)
+            except Exception as e:  # a sink error must not kill the writer
+                failed, error = len(batch), f'{type(e).__name__}: {e}'
+            except BaseException as e:
+                # The thread is going down; account for the batch so flush() is not left waiting on it
+                with self._cond:
+                    self.failed += len(batch)
+                    self.write_errors += 1
+                    self.last_error = f'{type(e).__name__}: {e}'
+                    self._cond.notify_all()
+                raise
+            else:
+                failed, error = 0, None
+            with self._cond:
+                self.total_write_seconds += time.perf_counter() - started
+                self.batches += 1
+                self.written += len(batch) - failed
+                if failed:
+                    self.failed += failed
+                    self.write_errors += 1
+                    self.last_error = error
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write out everything queued so far; False if ``timeout`` ran out first"""
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                return not self._queue
+            self._ensure_worker()
+            target = self.queued
+            # Partial batches go out now instead of waiting for flush_interval
+            self._flushes += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self.written + self.failed >= target, timeout)
+            finally:
+                self._flushes -= 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush and close the sink; used at exit"""
+        self.flush(timeout)
+        self.sink.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sink': type(self.sink).__name__,
+            'segment': os.path.basename(self.sink.path) if self.sink.path else None,
+            'overflow': self.overflow,
+            'queue_depth': len(self._queue),
+            'max_queue_depth': self.max_queue_depth,
+            'queued': self.queued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'avg_batch_size': round(self.written / self.batches, 2) if self.batches else 0.0,
+            'avg_write_ms': round(self.total_write_seconds / self.batches * 1000.0, 3) if self.batches else 0.0,
+            'write_errors': self.write_errors,
+            'worker_restarts': self.worker_restarts,
+            'last_error': self.last_error,
+            'rotations': self.sink.rotations,
+        }
@@ -0,0 +1,194 @@
+import datetime
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.orbits import eci_to_ecef, geodetic_from_ecef, gmst
+from services.satellite_catalog import ELEMENTS, MU_WGS72, RE_WGS72, SatelliteCatalog
+from services.spatial_index import SpatialGrid
+from utils.metrics import registry
+
+DEFAULT_DEBRIS_COUNT = int(os.environ.get('DEBRIS_CATALOG_SIZE', 10000))
+DEFAULT_DEBRIS_SEED = int(os.environ.get('DEBRIS_SEED', 0))
+# Screenings start at the epoch rounded down to this many seconds, so nearby requests share one run
+DEFAULT_SCREENING_BUCKET = float(os.environ.get('DEBRIS_SCREENING_BUCKET', 60))
+# Bump whenever screening results change, so cached screenings (services.result_cache) are recomputed
+ENGINE_VERSION = 1
+
+SIZE_CLASSES = ('small', 'medium', 'large')
+RISK_LEVELS = ('low', 'medium', 'high')
+HIGH_RISK_KM = 1.0
+MEDIUM_RISK_KM = 5.0
+SCREENING_DISTANCE_KM = 10.0
+
+# Upper bound on the closing speed of two Earth orbiters (head-on LEO), km/s
+MAX_RELATIVE_SPEED = 16.0
+
+SCREENING_STAGES = {name: registry.stage('conjunctions', name) for name in ('sample', 'refine')}
+
+# Inclinations (degrees) that debris clouds from past breakups concentrate around
+_DEBRIS_INCLINATIONS = np.array([98.0, 82.0, 74.0, 65.0, 86.4, 71.0, 52.0, 99.2])
+
+
+def risk_codes(miss_distance: np.ndarray) -> np.ndarray:
+    """Index into ``RISK_LEVELS`` for miss distances in km"""
+    return np.where(miss_distance < HIGH_RISK_KM, 2, np.where(miss_distance < MEDIUM_RISK_KM, 1, 0))
+
+
+class Conjunctions:
+    """Close approaches found by a screening run, one array element per pair
+
+    ``primary``/``secondary`` index the screened catalogs (the same catalog for
+    all-vs-all runs, with primary < secondary); ``tca`` is in Unix seconds.
+    """
+
+    def __init__(self, primary: np.ndarray, secondary: np.ndarray, tca: np.ndarray,
+                 miss_distance: np.ndarray, relative_speed: np.ndarray):
+        order = np.argsort(miss_distance, kind='stable')
+        self.primary = primary[order]
+        self.secondary = secondary[order]
+        self.tca = tca[order]
+        self.miss_distance = miss_distance[order]
+        self.relative_speed = relative_speed[order]
+
+    def __len__(self) -> int:
+        return len(self.primary)
+
+    @property
+    def risk(self) -> np.ndarray:
+        return risk_codes(self.miss_distance)
+
+
+def _closest_approach(r: np.ndarray, v: np.ndarray, half_window: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Time offset and distance of closest approach for straight-line relative motion"""
+    speed2 = np.sum(v * v, axis=1)
+    tau = np.divide(-np.sum(r * v, axis=1), speed2, out=np.zeros_like(speed2), where=speed2 > 0)
+    tau = np.clip(tau, -half_window, half_window)
+    return tau, np.linalg.norm(r + v * tau[:, None], axis=1)
+
+
+def screen_conjunctions(objects: SatelliteCatalog, start: float, duration: float = 600.0, step: float = 30.0,
+                        threshold: float = SCREENING_DISTANCE_KM, assets: Optional[SatelliteCatalog] = None,
+                        asset_index: Optional[np.ndarray] = None) -> Conjunctions:
+    """Close approaches closer than ``threshold`` km between ``start`` and ``start + duration``
+
+    All-vs-all within ``objects``, or with ``assets`` given, every asset (or
+    ``asset_index`` rows of it) against ``objects``. The catalog is sampled
+    every ``step`` seconds and a fresh ``SpatialGrid`` is built per sample;
+    only pairs that could come within ``threshold`` before the next sample
+    (given ``MAX_RELATIVE_SPEED``) are examined, and each is refined once by
+    re-propagating both objects to the estimated time of closest approach.
+    """
+    if not (step > 0 and duration >= 0 and threshold > 0):
+        raise ValueError('step and threshold must be positive and duration non-negative')
+    half = step / 2.0
+    radius = threshold + MAX_RELATIVE_SPEED * half
+    found: List[Tuple[np.ndarray, ...]] = []
+
+    with SCREENING_STAGES['sample'].time():
+        for t in start + np.arange(int(duration // step) + 1) * step:
+            position, velocity = objects.state_at(t)
+            grid = SpatialGrid(position, radius)
+            if assets is None:
+                i, j = grid.pairs_within(radius)
+                r, v = position[j] - position[i], velocity[j] - velocity[i]
+            else:
+                asset_position, asset_velocity = assets.state_at(t, asset_index)
+                i, j = grid.neighbors(asset_position, radius)
+                r, v = position[j] - asset_position[i], velocity[j] - asset_velocity[i]
+            tau, miss = _closest_approach(r, v, half)
+            # Loose cut before refinement: the straight-line estimate is only approximate
+            near = miss <= 2.0 * threshold
+            found.append((i[near], j[near], t + tau[near], miss[near]))
+
+    with SCREENING_STAGES['refine'].time():
+        i, j, tca, miss = (np.concatenate(column) for column in zip(*found))
+        # A pair can be picked up from neighbouring samples; keep its closest estimate
+        order = np.lexsort((miss, j, i))
+        i, j, tca = i[order], j[order], tca[order]
+        first = np.ones(len(i), dtype=bool)
+        first[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1])
+        i, j, tca = i[first], j[first], tca[first]
+
+        primary_catalog, primary_rows = (objects, i) if assets is None else (
+            assets, i if asset_index is None else np.asarray(asset_index)[i])
+        p_position, p_velocity = primary_catalog.state_at(tca, primary_rows)
+        s_position, s_velocity = objects.state_at(tca, j)
+        v = s_velocity - p_velocity
+        tau, miss = _closest_approach(s_position - p_position, v, half)
+        keep = miss <= threshold
+    return Conjunctions(i[keep], j[keep], tca[keep] + tau[keep], miss[keep],
+                        np.linalg.norm(v[keep], axis=1))
+
+
+class DebrisCatalog:
+    """Tracked debris: orbital elements plus size class and tracking confidence per object
+
+    Until a debris element feed is wired in, the population is synthetic but
+    reproducible: mostly near-circular LEO fragments clustered around the
+    inclinations of past breakup events.
+    """
+
+    def __init__(self, objects: SatelliteCatalog, size_codes: np.ndarray, tracking_confidence: np.ndarray):
+        self.objects = objects
+        self.size_codes = np.asarray(size_codes, dtype=np.int8)
+        self.tracking_confidence = np.asarray(tracking_confidence, dtype=np.float32)
+
+    @classmethod
+    def synthetic(cls, count: int = DEFAULT_DEBRIS_COUNT, seed: int = DEFAULT_DEBRIS_SEED,
+                  epoch: Optional[datetime.datetime] = None) -> 'DebrisCatalog':
+        rng = np.random.default_rng(seed)
+        epoch = epoch or datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc)
+        altitude = rng.uniform(300.0, 1200.0, count)
+        eccentricity = rng.exponential(0.004, count).clip(0.0, 0.05)
+        semi_major = (RE_WGS72 + altitude) / (1.0 - eccentricity)
+        clustered = rng.random(count) < 0.7
+        inclination = np.where(clustered, rng.choice(_DEBRIS_INCLINATIONS, count) + rng.normal(0, 0.3, count),
+                               rng.uniform(0.0, 110.0, count))
+
+        elements = np.empty((count, len(ELEMENTS)))
+        elements[:, 0] = epoch.timestamp() - rng.uniform(0.0, 3 * 86400.0, count)
+        elements[:, 1] = np.radians(inclination)
+        elements[:, 2] = rng.uniform(0.0, 2 * np.pi, count)
+        elements[:, 3] = eccentricity
+        elements[:, 4] = rng.uniform(0.0, 2 * np.pi, count)
+        elements[:, 5] = rng.uniform(0.0, 2 * np.pi, count)
+        elements[:, 6] = np.sqrt(MU_WGS72 / semi_major ** 3)
+        elements[:, 7] = 0.0
+
+        objects = SatelliteCatalog.from_arrays(
+            np.arange(90000, 90000 + count), [f'DEBRIS-{i + 1:05d}' for i in range(count)],
+            np.zeros(count, dtype=int), ['Debris'], elements)
+        size_codes = rng.choice(len(SIZE_CLASSES), count, p=[0.75, 0.2, 0.05])
+        # Larger fragments have stronger radar returns and better orbit fits
+        confidence = np.clip(0.7 + 0.1 * size_codes + rng.uniform(0.0, 0.15, count), 0.7, 1.0)
+        return cls(objects, size_codes, confidence)
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def snapshot(self, when: datetime.datetime) -> Dict[str, Any]:
+        """ECI state, geodetic position and a spatial grid of the whole catalog at ``when``"""
+        when_unix = when.timestamp()
+        position, velocity = self.objects.state_at(when_unix)
+        latitude, longitude, altitude = geodetic_from_ecef(eci_to_ecef(position, gmst(when_unix)))
+        return {
+            'position': position,
+            'velocity': velocity,
+            'latitude': latitude,
+            'longitude': longitude,
+            'altitude': altitude,
+            'grid': SpatialGrid(position, 500.0),
+        }
+
+    @staticmethod
+    def region(snapshot: Dict[str, Any], box: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+               min_alt: float = -np.inf, max_alt: float = np.inf) -> np.ndarray:
+        """Sorted indices inside an ECI bounding box (km) and an altitude shell"""
+        if box is None:
+            index = np.arange(len(snapshot['altitude']))
+        else:
+            index = snapshot['grid'].query_box(*box)
+        altitude = snapshot['altitude'][index]
+        return index[(altitude >= min_alt) & (altitude <= max_alt)]
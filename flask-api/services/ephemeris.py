@@ -0,0 +1,320 @@
+import datetime
+import json
+import os
+import tempfile
+import warnings
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from services.orbits import eci_state
+from utils.metrics import registry
+
+DEFAULT_EPHEMERIS_DIR = os.environ.get('EPHEMERIS_DIR', os.path.join(os.path.dirname(__file__), '..', 'data', 'ephemeris'))
+DEFAULT_START = os.environ.get('EPHEMERIS_START', '2000-01-01')
+DEFAULT_END = os.environ.get('EPHEMERIS_END', '2050-01-01')
+
+# Bump whenever the generator changes so tables on disk are rebuilt
+MODEL_VERSION = 1
+MANIFEST = 'manifest.json'
+STATES = 'states.npy'
+
+AU_KM = 149_597_870.7
+DAY = 86400.0
+JULIAN_CENTURY = 36525.0 * DAY
+J2000_UNIX = 946_728_000.0  # 2000-01-01T12:00:00
+OBLIQUITY_J2000 = np.radians(23.4392911)
+EARTH_MOON_MASS_RATIO = 81.30056
+SUN_RADIUS_KM = 695_700.0
+
+INTERPOLATE_STAGE = registry.stage('ephemeris', 'interpolate')
+
+
+class Body(NamedTuple):
+    """One table: states of ``name`` relative to ``parent`` every ``step`` seconds"""
+    name: str
+    parent: str
+    radius_km: float
+    step: float
+
+
+# Mean elements at J2000 and their rates per Julian century:
+# a (km), e, inclination, mean longitude, longitude of periapsis, ascending node (degrees)
+_ElementSet = Tuple[Tuple[float, float], ...]
+
+# Planets and the Earth-Moon barycentre, heliocentric ecliptic J2000 (Standish, valid 1800-2050)
+_PLANETS: Dict[str, _ElementSet] = {
+    'mercury': ((0.38709927, 0.00000037), (0.20563593, 0.00001906), (7.00497902, -0.00594749),
+                (252.25032350, 149472.67411175), (77.45779628, 0.16047689), (48.33076593, -0.12534081)),
+    'venus': ((0.72333566, 0.00000390), (0.00677672, -0.00004107), (3.39467605, -0.00078890),
+              (181.97909950, 58517.81538729), (131.60246718, 0.00268329), (76.67984255, -0.27769418)),
+    'earth-moon': ((1.00000261, 0.00000562), (0.01671123, -0.00004392), (-0.00001531, -0.01294668),
+                   (100.46457166, 35999.37244981), (102.93768193, 0.32327364), (0.0, 0.0)),
+    'mars': ((1.52371034, 0.00001847), (0.09339410, 0.00007882), (1.84969142, -0.00813131),
+             (-4.55343205, 19140.30268499), (-23.94362959, 0.44441088), (49.55953891, -0.29257343)),
+    'jupiter': ((5.20288700, -0.00011607), (0.04838624, -0.00013253), (1.30439695, -0.00183714),
+                (34.39644051, 3034.74612775), (14.72847983, 0.21252668), (100.47390909, 0.20469106)),
+    'saturn': ((9.53667594, -0.00125060), (0.05386179, -0.00050991), (2.48599187, 0.00193609),
+               (49.95424423, 1222.49362201), (92.59887831, -0.41897216), (113.66242448, -0.28867794)),
+    'uranus': ((19.18916464, -0.00196176), (0.04725744, -0.00004397), (0.77263783, -0.00242939),
+               (313.23810451, 428.48202785), (170.95427630, 0.40805281), (74.01692503, 0.04240589)),
+    'neptune': ((30.06992276, 0.00026291), (0.00859048, 0.00005105), (1.77004347, 0.00035372),
+                (-55.12002969, 218.45945325), (44.96476227, -0.32241464), (131.78422574, -0.00508664)),
+    'pluto': ((39.48211675, -0.00031596), (0.24882730, 0.00005170), (17.14001206, 0.00004818),
+              (238.92903833, 145.20780515), (224.06891629, -0.04062942), (110.30393684, -0.01183482)),
+}
+
+# Moon, geocentric ecliptic, with its nodal and apsidal precession (no periodic terms)
+_MOON: _ElementSet = ((384_400.0, 0.0), (0.0549, 0.0), (5.1454, 0.0),
+                      (218.3162, 481267.8813), (83.3533, 4069.0141), (125.0434, -1934.1378))
+
+# Major moons of the giant planets relative to the planet's equator (JPL mean elements at J2000)
+_SATELLITES: Dict[str, Tuple[str, _ElementSet]] = {
+    'io': ('jupiter', ((421_800.0, 0.0), (0.004, 0.0), (0.0, 0.0),
+                       (20.0, 36525.0 / 1.769138 * 360.0), (49.1, 0.0), (0.0, 0.0))),
+    'europa': ('jupiter', ((671_100.0, 0.0), (0.009, 0.0), (0.5, 0.0),
+                           (214.4, 36525.0 / 3.551181 * 360.0), (229.0, 0.0), (184.0, 0.0))),
+    'ganymede': ('jupiter', ((1_070_400.0, 0.0), (0.001, 0.0), (0.2, 0.0),
+                             (221.6, 36525.0 / 7.154553 * 360.0), (256.8, 0.0), (58.5, 0.0))),
+    'callisto': ('jupiter', ((1_882_700.0, 0.0), (0.007, 0.0), (0.3, 0.0),
+                             (80.3, 36525.0 / 16.689018 * 360.0), (352.9, 0.0), (309.1, 0.0))),
+    'titan': ('saturn', ((1_221_900.0, 0.0), (0.029, 0.0), (0.3, 0.0),
+                         (168.6, 36525.0 / 15.945421 * 360.0), (156.9, 0.0), (78.6, 0.0))),
+}
+
+# North poles (right ascension, declination; degrees, ICRF) of the planets whose moons are tabulated
+_POLES = {'jupiter': (268.056595, 64.495303), 'saturn': (40.589, 83.537)}
+
+# Cadence per table: roughly 1/40 of the orbital period (finer for Mercury's eccentric
+# orbit) keeps cubic Hermite interpolation within about a kilometre
+BODIES = (
+    Body('mercury', 'sun', 2_439.7, DAY / 4),
+    Body('venus', 'sun', 6_051.8, DAY),
+    Body('earth', 'sun', 6_371.0, DAY),
+    Body('moon', 'earth', 1_737.4, DAY / 2),
+    Body('mars', 'sun', 3_389.5, DAY),
+    Body('jupiter', 'sun', 69_911.0, DAY),
+    Body('io', 'jupiter', 1_821.6, DAY / 24),
+    Body('europa', 'jupiter', 1_560.8, DAY / 12),
+    Body('ganymede', 'jupiter', 2_634.1, DAY / 6),
+    Body('callisto', 'jupiter', 2_410.3, DAY / 3),
+    Body('saturn', 'sun', 58_232.0, DAY),
+    Body('titan', 'saturn', 2_574.7, DAY / 3),
+    Body('uranus', 'sun', 25_362.0, DAY),
+    Body('neptune', 'sun', 24_622.0, DAY),
+    Body('pluto', 'sun', 1_188.3, DAY),
+)
+
+
+def _mean_element_positions(elements: _ElementSet, times: np.ndarray, a_scale: float = 1.0,
+                            rotation: Optional[np.ndarray] = None) -> np.ndarray:
+    """(n, 3) positions from secularly varying mean elements"""
+    T = (times - J2000_UNIX) / JULIAN_CENTURY
+    a, e, inclination, longitude, periapsis, node = (value + rate * T for value, rate in elements)
+    position, _ = eci_state(a * a_scale, e, np.radians(inclination), np.radians(node),
+                            np.radians(periapsis - node), np.radians(longitude - periapsis), with_velocity=False)
+    return position if rotation is None else position @ rotation.T
+
+
+def _equator_to_ecliptic(right_ascension: float, declination: float) -> np.ndarray:
+    """Rotation from a planet's equatorial frame (x towards its node on the ecliptic) to ecliptic J2000"""
+    ra, dec = np.radians(right_ascension), np.radians(declination)
+    pole = np.array([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)])
+    c, s = np.cos(OBLIQUITY_J2000), np.sin(OBLIQUITY_J2000)
+    x, y, z = pole[0], c * pole[1] + s * pole[2], -s * pole[1] + c * pole[2]
+    inclination, node = np.arccos(z), np.arctan2(x, -y)
+    cos_o, sin_o, cos_i, sin_i = np.cos(node), np.sin(node), np.cos(inclination), np.sin(inclination)
+    return np.array([[cos_o, -sin_o * cos_i, sin_o * sin_i],
+                     [sin_o, cos_o * cos_i, -cos_o * sin_i],
+                     [0.0, sin_i, cos_i]])
+
+
+def _relative_positions(name: str, times: np.ndarray) -> np.ndarray:
+    if name in ('earth', 'moon'):
+        moon = _mean_element_positions(_MOON, times)
+        if name == 'moon':
+            return moon
+        return _mean_element_positions(_PLANETS['earth-moon'], times, AU_KM) - moon / (1.0 + EARTH_MOON_MASS_RATIO)
+    if name in _PLANETS:
+        return _mean_element_positions(_PLANETS[name], times, AU_KM)
+    parent, elements = _SATELLITES[name]
+    return _mean_element_positions(elements, times, rotation=_equator_to_ecliptic(*_POLES[parent]))
+
+
+def generate_states(body: Body, times: np.ndarray) -> np.ndarray:
+    """(n, 6) state of ``body`` relative to its parent at Unix ``times``; km and km/s, ecliptic J2000
+
+    Velocity is the central difference of the position model rather than
+    the osculating Keplerian velocity, so it is the derivative of the
+    tabulated positions (precession included), which Hermite interpolation
+    relies on.
+    """
+    delta = 60.0
+    velocity = (_relative_positions(body.name, times + delta)
+                - _relative_positions(body.name, times - delta)) / (2.0 * delta)
+    return np.hstack([_relative_positions(body.name, times), velocity])
+
+
+def _unix(value) -> float:
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class Ephemeris:
+    """Tabulated states of the planets and major moons, interpolated to any epoch
+
+    Every body has a table of position and velocity relative to its parent
+    at a fixed cadence; all tables live in one ``(rows, 6)`` float64 array,
+    with ``manifest.json`` giving each body's rows. ``open`` memory-maps an
+    existing ``states.npy`` read-only, so starting a worker costs an mmap and
+    every worker on the host shares the same page-cache pages. Tables are
+    generated from mean orbital elements the first time (or when the manifest
+    doesn't match the requested span or model version); states exported from
+    a numerical ephemeris can be dropped in the same format instead.
+
+    Queries use cubic Hermite interpolation on position and velocity, which
+    is continuous in both across table rows.
+    """
+
+    def __init__(self, manifest: Dict[str, Any], states: np.ndarray, directory: Optional[str] = None):
+        self.manifest = manifest
+        self.states = states
+        self.directory = directory
+        self.start = manifest['start']
+        self.end = manifest['end']
+        self.bodies: Dict[str, Dict[str, Any]] = {body['name']: body for body in manifest['bodies']}
+
+    @property
+    def mapped(self) -> bool:
+        return isinstance(self.states, np.memmap)
+
+    @classmethod
+    def build(cls, start=DEFAULT_START, end=DEFAULT_END, bodies: Tuple[Body, ...] = BODIES) -> 'Ephemeris':
+        """Generate tables in memory"""
+        start, end = _unix(start), _unix(end)
+        if end <= start:
+            raise ValueError('Ephemeris end must be after its start')
+        tables, layout, offset = [], [], 0
+        for body in bodies:
+            count = int(np.ceil((end - start) / body.step)) + 1
+            tables.append(generate_states(body, start + np.arange(count) * body.step))
+            layout.append({**body._asdict(), 'offset': offset, 'count': count})
+            offset += count
+        manifest = {
+            'version': MODEL_VERSION,
+            'source': 'mean orbital elements',
+            'frame': 'ecliptic J2000',
+            'units': {'position': 'km', 'velocity': 'km/s', 'time': 'unix seconds'},
+            'start': start,
+            'end': end,
+            'bodies': layout,
+        }
+        return cls(manifest, np.concatenate(tables))
+
+    def save(self, directory: str) -> None:
+        """Write ``states.npy`` then ``manifest.json``, each replaced atomically"""
+        os.makedirs(directory, exist_ok=True)
+        for name, write in ((STATES, lambda f: np.save(f, self.states)),
+                            (MANIFEST, lambda f: f.write(json.dumps(self.manifest, indent=1).encode()))):
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=name + '.')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    write(f)
+                os.chmod(tmp, 0o644)  # mkstemp creates files private to the builder
+                os.replace(tmp, os.path.join(directory, name))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_EPHEMERIS_DIR) -> 'Ephemeris':
+        """Memory-map tables written by ``save``"""
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        states = np.load(os.path.join(directory, STATES), mmap_mode='r')
+        rows = sum(body['count'] for body in manifest['bodies'])
+        if states.shape != (rows, 6):
+            raise ValueError(f'{STATES} does not match {MANIFEST}')
+        return cls(manifest, states, directory)
+
+    @classmethod
+    def open(cls, directory: str = DEFAULT_EPHEMERIS_DIR, start=DEFAULT_START, end=DEFAULT_END) -> 'Ephemeris':
+        """Load the tables in ``directory``, (re)building them first if they are missing or stale
+
+        Build before forking workers (or ahead of deployment) so they all map
+        one file. If the directory isn't writable the tables stay in memory.
+        """
+        start, end = _unix(start), _unix(end)
+        try:
+            ephemeris = cls.load(directory)
+            manifest = ephemeris.manifest
+            if manifest.get('version') == MODEL_VERSION and manifest['start'] <= start and manifest['end'] >= end:
+                return ephemeris
+        except (OSError, ValueError, KeyError):
+            pass
+        ephemeris = cls.build(start, end)
+        try:
+            ephemeris.save(directory)
+        except OSError as e:
+            warnings.warn(f'Ephemeris tables kept in memory; could not write {directory}: {e}')
+            return ephemeris
+        return cls.load(directory)
+
+    def _relative_state(self, body: Dict[str, Any], times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        step = body['step']
+        u = (times - self.start) / step
+        k = np.clip(np.floor(u).astype(np.int64), 0, body['count'] - 2)
+        s = (u - k)[:, None]
+        rows = self.states[body['offset']:body['offset'] + body['count']]
+        p0, p1 = rows[k, :3], rows[k + 1, :3]
+        m0, m1 = rows[k, 3:] * step, rows[k + 1, 3:] * step
+        s2, s3 = s * s, s * s * s
+        position = (2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * m0 + (3 * s2 - 2 * s3) * p1 + (s3 - s2) * m1
+        velocity = ((6 * s2 - 6 * s) * (p0 - p1) + (3 * s2 - 4 * s + 1) * m0 + (3 * s2 - 2 * s) * m1) / step
+        return position, velocity
+
+    def _heliocentric(self, name: str, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if name == 'sun':
+            return np.zeros((len(times), 3)), np.zeros((len(times), 3))
+        body = self.bodies[name]
+        position, velocity = self._relative_state(body, times)
+        if body['parent'] != 'sun':
+            parent_position, parent_velocity = self._heliocentric(body['parent'], times)
+            position += parent_position
+            velocity += parent_velocity
+        return position, velocity
+
+    def state(self, name: str, times, center: str = 'sun') -> Tuple[np.ndarray, np.ndarray]:
+        """(n, 3) position (km) and velocity (km/s) of ``name`` relative to ``center``
+
+        ``times`` are Unix seconds (scalar or array) inside the table span;
+        raises ValueError for unknown bodies or epochs outside it.
+        """
+        for body in (name, center):
+            if body != 'sun' and body not in self.bodies:
+                raise ValueError(f"Unknown body '{body}'; expected one of: sun, {', '.join(self.bodies)}")
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        if times.size and (times.min() < self.start or times.max() > self.end):
+            raise ValueError('Epoch outside the ephemeris span ('
+                             f'{_iso(self.start)} to {_iso(self.end)})')
+        with INTERPOLATE_STAGE.time():
+            position, velocity = self._heliocentric(name, times)
+            if center != 'sun':
+                center_position, center_velocity = self._heliocentric(center, times)
+                position -= center_position
+                velocity -= center_velocity
+        return position, velocity
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Body names, parents and radii"""
+        return [{'name': name, 'parent': body['parent'], 'radius_km': body['radius_km']}
+                for name, body in self.bodies.items()]
+
+
+def _iso(unix_seconds: float) -> str:
+    return datetime.datetime.fromtimestamp(unix_seconds, datetime.timezone.utc).isoformat()
@@ -0,0 +1,149 @@
+import re
+from typing import Dict, List, Tuple
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+class KeywordIndex:
+    """Precompiled keyword index for scoring every topic in one pass over a message
+
+    Keywords from all topics are compiled into a single Aho-Corasick automaton,
+    and each keyword keeps a posting list of the topics that declare it. Scores
+    are identical to ``SpaceKnowledgeBot._calculate_confidence``: the share of
+    words containing a topic keyword plus 0.3 for every keyword found anywhere
+    in the message.
+    """
+
+    EXACT_MATCH_BOOST = 0.3
+
+    def __init__(self, topic_keywords: Dict[str, List[str]]):
+        self.topics: List[str] = list(topic_keywords)
+        self.keywords: List[str] = []
+        self.keyword_topics: Dict[str, Tuple[int, ...]] = {}
+
+        keyword_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        for topic_id, keywords in enumerate(topic_keywords.values()):
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    postings.append([])
+                # Repeated keywords count twice towards the exact boost, as they do in the scan
+                postings[keyword_ids[keyword]].append(topic_id)
+
+        self.keyword_topics = {kw: tuple(postings[i]) for kw, i in keyword_ids.items()}
+        self._postings = [tuple(p) for p in postings]
+        self._word_postings = [tuple(dict.fromkeys(p)) for p in postings]
+        # Keywords with a non-word character can never sit inside a single \w+ token
+        self._word_only = [all(self._is_word_char(ch) for ch in kw) for kw in self.keywords]
+        self._build_automaton()
+
+    _word_char_cache: Dict[str, bool] = {}
+
+    @classmethod
+    def _is_word_char(cls, ch: str) -> bool:
+        """Match ``\\w`` semantics exactly, memoized per character"""
+        cached = cls._word_char_cache.get(ch)
+        if cached is None:
+            cached = cls._word_char_cache[ch] = _WORD_CHAR.match(ch) is not None
+        return cached
+
+    def _build_automaton(self) -> None:
+        """Build the goto/fail/output tables of the Aho-Corasick automaton"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(keyword_id)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                output[next_state].extend(output[fail[next_state]])
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(out) for out in output]
+
+    def find(self, message: str) -> Tuple[str, ...]:
+        """Distinct keywords occurring in a lowercased message, in order of first occurrence"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found: Dict[int, None] = {}
+        state = 0
+        for ch in message:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword_id in output[state]:
+                found[keyword_id] = None
+        return tuple(self.keywords[keyword_id] for keyword_id in found)
+
+    def score(self, message: str) -> List[float]:
+        """Return the confidence of every topic, in topic order, for a lowercased message"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        word_only = self._word_only
+        postings = self._postings
+        word_postings = self._word_postings
+        is_word_char = self._is_word_char
+
+        n_topics = len(self.topics)
+        word_matches = [0] * n_topics
+        last_word = [-1] * n_topics
+        exact_matches = [0] * n_topics
+        seen_keywords = set()
+
+        word_index = -1
+        in_word = False
+        state = 0
+        for ch in message:
+            is_word = is_word_char(ch)
+            if is_word and not in_word:
+                word_index += 1
+            in_word = is_word
+
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            for keyword_id in output[state]:
+                if keyword_id not in seen_keywords:
+                    seen_keywords.add(keyword_id)
+                    for topic_id in postings[keyword_id]:
+                        exact_matches[topic_id] += 1
+                if in_word and word_only[keyword_id]:
+                    for topic_id in word_postings[keyword_id]:
+                        if last_word[topic_id] != word_index:
+                            last_word[topic_id] = word_index
+                            word_matches[topic_id] += 1
+
+        n_words = word_index + 1
+        if not n_words:
+            return [0.0] * n_topics
+
+        boost = self.EXACT_MATCH_BOOST
+        return [
+            min(word_matches[i] / n_words + exact_matches[i] * boost, 1.0)
+            for i in range(n_topics)
+        ]
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.helpers import LRUCache
+
+DEFAULT_KNOWLEDGE_DIR = os.environ.get(
+    'KNOWLEDGE_BASE_DIR',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'seed', 'knowledge')
+)
+DEFAULT_CACHE_BYTES = int(os.environ.get('KNOWLEDGE_CACHE_BYTES', 8 * 1024 * 1024))
+
+_TOPIC_FIELD = re.compile(rb'"topic"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+class KnowledgeBase:
+    """File-backed knowledge base loaded from JSONL shards
+
+    ``topics.jsonl`` holds one ``{"id", "keywords", "shard"}`` line per topic,
+    optionally with the ``offset``/``length`` of its body, and is the only file
+    parsed at startup. Topic bodies (name, description, examples, suggestions
+    and responses) live one per line in the shard files and are read on demand
+    through a byte-bounded LRU cache.
+    """
+
+    INDEX_FILE = 'topics.jsonl'
+
+    def __init__(self, directory: str = DEFAULT_KNOWLEDGE_DIR, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.cache = LRUCache(max_bytes=cache_bytes, sizeof=lambda entry: entry[1])
+        self._keywords: Dict[str, List[str]] = {}
+        self._locations: Dict[str, Tuple[str, int, int]] = {}
+        self._lock = threading.Lock()
+        self.signature: Tuple[Tuple[str, Optional[int], Optional[int]], ...] = ()
+        self.load()
+
+    def load(self) -> None:
+        """(Re)read the keyword index and the byte offset of every topic body"""
+        keywords: Dict[str, List[str]] = {}
+        locations: Dict[str, Tuple[str, int, int]] = {}
+        unindexed_shards = set()
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        # Taken before reading, so an edit made while loading is seen by the next ``changed()``
+        index_stamp = self._stamp(index_path)
+        with open(index_path, encoding='utf-8') as index_file:
+            for line in index_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                keywords[entry['id']] = entry['keywords']
+                if 'offset' in entry and 'length' in entry:
+                    path = os.path.join(self.directory, entry['shard'])
+                    locations[entry['id']] = (path, entry['offset'], entry['length'])
+                else:
+                    unindexed_shards.add(entry['shard'])
+
+        # Hand-edited shards may omit offsets; find them without parsing the bodies
+        for shard in sorted(unindexed_shards):
+            for topic, location in self._scan_shard(shard):
+                locations.setdefault(topic, location)
+
+        missing = [topic for topic in keywords if topic not in locations]
+        if missing:
+            raise ValueError(f"Knowledge base topics without a body: {', '.join(missing[:5])}")
+
+        shards = sorted({path for path, _, _ in locations.values()})
+        with self._lock:
+            self._keywords = keywords
+            self._locations = locations
+            self.signature = (index_stamp,) + tuple(self._stamp(path) for path in shards)
+            self.cache.clear()
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[str, Optional[int], Optional[int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path, None, None
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        """True if the index or a shard was modified, replaced or removed since the last ``load``"""
+        return any(self._stamp(stamp[0]) != stamp for stamp in self.signature)
+
+    def _scan_shard(self, shard: str) -> Iterator[Tuple[str, Tuple[str, int, int]]]:
+        """Record (path, offset, length) per topic without parsing the bodies"""
+        path = os.path.join(self.directory, shard)
+        with open(path, 'rb') as shard_file:
+            offset = 0
+            for line in shard_file:
+                match = _TOPIC_FIELD.search(line)
+                if match:
+                    topic = json.loads(b'"' + match.group(1) + b'"')
+                    yield topic, (path, offset, len(line))
+                offset += len(line)
+
+    def keywords(self) -> Dict[str, List[str]]:
+        """Keywords per topic, in file order"""
+        return self._keywords
+
+    def topic_ids(self) -> List[str]:
+        return list(self._keywords)
+
+    def __contains__(self, topic: str) -> bool:
+        return topic in self._keywords
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def topic(self, topic: str) -> Dict[str, Any]:
+        """Full topic record, read from its shard on a cache miss"""
+        cached = self.cache.get(topic)
+        if cached is not None:
+            return cached[0]
+
+        path, offset, length = self._locations[topic]
+        with open(path, 'rb') as shard_file:
+            shard_file.seek(offset)
+            raw = shard_file.read(length)
+        record = json.loads(raw)
+        record['keywords'] = self._keywords[topic]
+        self.cache.put(topic, (record, length))
+        return record
+
+    def responses(self, topic: str) -> Dict[str, str]:
+        return self.topic(topic)['responses']
+
+    def metadata(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Topic descriptions for the topics listing endpoint"""
+        topic_ids = self.topic_ids()
+        end = len(topic_ids) if limit is None else offset + limit
+        listing = {}
+        for topic in topic_ids[offset:end]:
+            record = self.topic(topic)
+            listing[topic] = {
+                'name': record.get('name', topic.replace('_', ' ').title()),
+                'description': record.get('description', ''),
+                'examples': record.get('examples', []),
+            }
+        return listing
+
+
+def write_shards(directory: str, topics: Dict[str, Dict[str, Any]], topics_per_shard: int = 1000) -> None:
+    """Write topics as an index file plus response shards readable by KnowledgeBase"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, KnowledgeBase.INDEX_FILE), 'w', encoding='utf-8') as index_file:
+        shard_file = None
+        for i, (topic, record) in enumerate(topics.items()):
+            if i % topics_per_shard == 0:
+                if shard_file:
+                    shard_file.close()
+                shard = f'responses-{i // topics_per_shard:03d}.jsonl'
+                shard_file = open(os.path.join(directory, shard), 'wb')
+            body = {key: value for key, value in record.items() if key != 'keywords'}
+            line = (json.dumps({'topic': topic, **body}, ensure_ascii=False) + '\n').encode('utf-8')
+            entry = {'id': topic, 'keywords': record['keywords'], 'shard': shard,
+                     'offset': shard_file.tell(), 'length': len(line)}
+            shard_file.write(line)
+            index_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        if shard_file:
+            shard_file.close()
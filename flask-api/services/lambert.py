@@ -0,0 +1,222 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import registry
+from utils.process_pool import ProcessPool
+
+# Gravitational parameters (km^3/s^2) of the Sun and of every body a transfer can start or end at
+MU_SUN = 1.32712440018e11
+MU = {
+    'mercury': 22_031.78,
+    'venus': 324_858.59,
+    'earth': 398_600.4418,
+    'mars': 42_828.37,
+    'jupiter': 126_686_534.0,
+    'saturn': 37_931_187.0,
+    'uranus': 5_793_939.0,
+    'neptune': 6_836_529.0,
+    'pluto': 871.0,
+}
+# Bump whenever results change, so cached results (services.result_cache) are recomputed
+ENGINE_VERSION = 1
+
+MAX_ITERATIONS = 60
+TOLERANCE = 1e-11  # relative time-of-flight error
+# One full revolution; zero-revolution solutions lie below it
+Z_MAX = 4.0 * np.pi ** 2
+# Hyperbolic bound; transfers faster than this need far more delta-v than any grid would plot
+Z_MIN = -400.0
+SERIES_Z = 1e-3  # below |z|, Stumpff functions from their series
+# Grid rows per block: keeps the solver's temporaries in cache
+BLOCK_CELLS = 16_384
+# Below this many cells the pool start-up and IPC cost more than they save
+MIN_PARALLEL_CELLS = 200_000
+MAX_WORKERS = int(os.environ.get('PORKCHOP_WORKERS', os.cpu_count() or 1))
+SOLVE_STAGE = registry.stage('lambert', 'solve')
+
+_pool = ProcessPool()
+
+
+def _stumpff(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Stumpff functions C(z) and S(z); series near zero, where the closed forms cancel"""
+    c, s = np.empty_like(z), np.empty_like(z)
+    positive, negative = z > SERIES_Z, z < -SERIES_Z
+    small = ~(positive | negative)
+    root = np.sqrt(z[positive])
+    c[positive] = (1.0 - np.cos(root)) / z[positive]
+    s[positive] = (root - np.sin(root)) / root ** 3
+    root = np.sqrt(-z[negative])
+    c[negative] = (np.cosh(root) - 1.0) / -z[negative]
+    s[negative] = (np.sinh(root) - root) / root ** 3
+    zs = z[small]
+    c[small] = 0.5 - zs / 24.0 + zs * zs / 720.0
+    s[small] = 1.0 / 6.0 - zs / 120.0 + zs * zs / 5040.0
+    return c, s
+
+
+def lambert(r1: np.ndarray, r2: np.ndarray, tof: np.ndarray, mu: float = MU_SUN) -> Tuple[np.ndarray, np.ndarray]:
+    """Velocities at both ends of the prograde zero-revolution transfers from ``r1`` to ``r2`` in ``tof`` seconds
+
+    Universal-variable formulation (Bate, Mueller & White; Curtis, Algorithm
+    5.2), solved for every row at once: Newton steps on z, falling back to
+    bisection whenever a step leaves the bracket that each evaluation
+    narrows. ``r1`` and ``r2`` are (n, 3) positions in km, ``tof`` is (n,).
+    Returns (n, 3) velocities in km/s; rows without a solution (non-positive
+    time of flight, transfer angles of exactly 180 degrees, or faster than
+    the Z_MIN hyperbola) are NaN.
+    """
+    r1, r2 = np.atleast_2d(r1).astype(np.float64), np.atleast_2d(r2).astype(np.float64)
+    tof = np.broadcast_to(np.asarray(tof, dtype=np.float64), (len(r1),))
+    r1_norm, r2_norm = np.linalg.norm(r1, axis=1), np.linalg.norm(r2, axis=1)
+    cos_angle = np.clip(np.einsum('ij,ij->i', r1, r2) / (r1_norm * r2_norm), -1.0, 1.0)
+    angle = np.arccos(cos_angle)
+    retrograde = r1[:, 0] * r2[:, 1] - r1[:, 1] * r2[:, 0] < 0.0
+    angle = np.where(retrograde, 2.0 * np.pi - angle, angle)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.sin(angle) * np.sqrt(r1_norm * r2_norm / (1.0 - cos_angle))
+        target = np.sqrt(mu) * tof
+        radii = r1_norm + r2_norm
+
+        z = np.zeros(len(r1))
+        solved = np.zeros(len(r1), dtype=bool)
+        low, high = np.full(len(r1), Z_MIN), np.full(len(r1), Z_MAX)
+        active = np.flatnonzero((tof > 0.0) & np.isfinite(a))
+        with SOLVE_STAGE.time():
+            for _ in range(MAX_ITERATIONS):
+                if not len(active):
+                    break
+                za, aa, ta = z[active], a[active], target[active]
+                c, s = _stumpff(za)
+                sqrt_c = np.sqrt(c)
+                y = radii[active] + aa * (za * s - 1.0) / sqrt_c
+                feasible = y > 0.0
+                y = np.where(feasible, y, 1.0)
+                sqrt_y = np.sqrt(y)
+                chi3 = (y / c) ** 1.5
+                f = np.where(feasible, chi3 * s + aa * sqrt_y - ta, -ta)
+                # dF/dz; its 1/z term tends to -7/240 at z = 0
+                near_zero = np.abs(za) < SERIES_Z
+                term = np.where(near_zero, -7.0 / 240.0, (c - 1.5 * s / c) / (2.0 * np.where(near_zero, 1.0, za)))
+                slope = chi3 * (term + 0.75 * s * s / c) + aa / 8.0 * (3.0 * s / c * sqrt_y + aa * sqrt_c / sqrt_y)
+
+                below = f < 0.0
+                low[active] = np.where(below, za, low[active])
+                high[active] = np.where(below, high[active], za)
+                newton = za - f / slope
+                inside = feasible & (newton > low[active]) & (newton < high[active])
+                step = np.where(inside, newton, 0.5 * (low[active] + high[active]))
+                converged = np.abs(f) <= TOLERANCE * ta
+                z[active] = np.where(converged, za, step)
+                solved[active[converged]] = True
+                active = active[~converged]
+
+        c, s = _stumpff(z)
+        y = radii + a * (z * s - 1.0) / np.sqrt(c)
+        f = 1.0 - y / r1_norm
+        g = a * np.sqrt(y / mu)
+        g_dot = 1.0 - y / r2_norm
+        v1 = (r2 - f[:, None] * r1) / g[:, None]
+        v2 = (g_dot[:, None] * r2 - r1) / g[:, None]
+    v1[~solved] = np.nan
+    v2[~solved] = np.nan
+    return v1, v2
+
+
+def _grid_rows(departure_states: np.ndarray, arrival_states: np.ndarray, departure_times: np.ndarray,
+               arrival_times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Hyperbolic excess speeds (km/s) at departure and arrival for every (departure, arrival) pair
+
+    States are (n, 6) and (m, 6) heliocentric; returns two (n, m) arrays.
+    Runs in pool workers too, so it takes plain arrays only.
+    """
+    n, m = len(departure_states), len(arrival_states)
+    v_departure, v_arrival = np.empty((n, m)), np.empty((n, m))
+    rows = max(1, BLOCK_CELLS // max(m, 1))
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        block = stop - start
+        r1 = np.repeat(departure_states[start:stop, :3], m, axis=0)
+        r2 = np.tile(arrival_states[:, :3], (block, 1))
+        tof = (arrival_times[None, :] - departure_times[start:stop, None]).reshape(-1)
+        v1, v2 = lambert(r1, r2, tof)
+        planet_v1 = np.repeat(departure_states[start:stop, 3:], m, axis=0)
+        planet_v2 = np.tile(arrival_states[:, 3:], (block, 1))
+        v_departure[start:stop] = np.linalg.norm(v1 - planet_v1, axis=1).reshape(block, m)
+        v_arrival[start:stop] = np.linalg.norm(v2 - planet_v2, axis=1).reshape(block, m)
+    return v_departure, v_arrival
+
+
+def burn(v_infinity: np.ndarray, mu: float, radius: float) -> np.ndarray:
+    """Delta-v (km/s) between a circular orbit of ``radius`` km and a hyperbola with excess speed ``v_infinity``"""
+    circular = np.sqrt(mu / radius)
+    return np.sqrt(v_infinity * v_infinity + 2.0 * circular * circular) - circular
+
+
+class PorkchopResult:
+    """Transfer costs over a departure x arrival grid; arrays are (departures, arrivals), NaN where unsolved"""
+
+    def __init__(self, departure_body: str, arrival_body: str, departure_times: np.ndarray,
+                 arrival_times: np.ndarray, c3: np.ndarray, v_infinity_arrival: np.ndarray, delta_v: np.ndarray):
+        self.departure_body = departure_body
+        self.arrival_body = arrival_body
+        self.departure_times = departure_times
+        self.arrival_times = arrival_times
+        self.c3 = c3  # departure energy, km^2/s^2
+        self.v_infinity_arrival = v_infinity_arrival  # km/s
+        self.delta_v = delta_v  # injection from the parking orbit plus capture into the arrival orbit, km/s
+
+    def best(self) -> Optional[Dict[str, Any]]:
+        """The cheapest transfer on the grid by total delta-v"""
+        if not np.isfinite(self.delta_v).any():
+            return None
+        i, j = np.unravel_index(np.nanargmin(self.delta_v), self.delta_v.shape)
+        return {
+            'departure_time': float(self.departure_times[i]),
+            'arrival_time': float(self.arrival_times[j]),
+            'time_of_flight_days': float(self.arrival_times[j] - self.departure_times[i]) / 86400.0,
+            'c3': float(self.c3[i, j]),
+            'v_infinity_arrival': float(self.v_infinity_arrival[i, j]),
+            'delta_v': float(self.delta_v[i, j]),
+        }
+
+
+def porkchop(ephemeris, departure_body: str, arrival_body: str, departure_times: np.ndarray,
+             arrival_times: np.ndarray, departure_altitude: float = 200.0, arrival_altitude: float = 400.0,
+             workers: Optional[int] = None) -> PorkchopResult:
+    """Lambert transfers between two planets for every pair of departure and arrival epochs (Unix seconds)
+
+    Planet states come from ``ephemeris`` (heliocentric) once per epoch, not
+    per cell. Delta-v is the burn from a circular parking orbit at
+    ``departure_altitude`` km plus the capture into a circular orbit at
+    ``arrival_altitude`` km. Large grids are split by departure rows across a
+    process pool; only the states go out and the two speed grids come back.
+    """
+    for name in (departure_body, arrival_body):
+        if name not in MU or ephemeris.bodies.get(name, {}).get('parent') != 'sun':
+            raise ValueError(f"Transfers are between planets; '{name}' is not one of: {', '.join(MU)}")
+    if departure_body == arrival_body:
+        raise ValueError('Departure and arrival bodies must differ')
+    departure_times = np.asarray(departure_times, dtype=np.float64)
+    arrival_times = np.asarray(arrival_times, dtype=np.float64)
+    departure_states = np.hstack(ephemeris.state(departure_body, departure_times))
+    arrival_states = np.hstack(ephemeris.state(arrival_body, arrival_times))
+
+    workers = MAX_WORKERS if workers is None else workers
+    n = len(departure_times)
+    if workers <= 1 or n * len(arrival_times) < MIN_PARALLEL_CELLS or n < 2:
+        v_departure, v_arrival = _grid_rows(departure_states, arrival_states, departure_times, arrival_times)
+    else:
+        bounds = np.linspace(0, n, min(workers, n) + 1).astype(int)
+        parts = _pool.run(_grid_rows, workers, [
+            (departure_states[start:stop], arrival_states, departure_times[start:stop], arrival_times)
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ])
+        v_departure = np.concatenate([part[0] for part in parts])
+        v_arrival = np.concatenate([part[1] for part in parts])
+
+    delta_v = (burn(v_departure, MU[departure_body], ephemeris.bodies[departure_body]['radius_km'] + departure_altitude)
+               + burn(v_arrival, MU[arrival_body], ephemeris.bodies[arrival_body]['radius_km'] + arrival_altitude))
+    return PorkchopResult(departure_body, arrival_body, departure_times, arrival_times, v_departure ** 2, v_arrival,
+                          delta_v)
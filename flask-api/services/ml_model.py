@@ -1,86 +1,367 @@
 import json
+import math
 import random
 import re
-from typing import Dict, List, Any
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.keyword_index import KeywordIndex
+from services.knowledge_base import KnowledgeBase, DEFAULT_KNOWLEDGE_DIR
+from services.sessions import Session
+from utils.helpers import LRUCache
+from utils.metrics import registry
+
+_TOKEN = re.compile(r'\b\w+\b')
+# Words that refer back to something said earlier, as in "what about its moons?"
+ANAPHORS = frozenset({'it', 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'there',
+                      'he', 'him', 'his', 'she', 'her', 'hers', 'that', 'these', 'those'})
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase and tokenize like _calculate_confidence, joining tokens with single spaces"""
+    return ' '.join(_TOKEN.findall(message.lower()))
+
+
+def _hashed_ngrams(text: str, n_features: int) -> Counter:
+    """Hash words and padded character 4-grams of a lowercased text into feature counts"""
+    words = _TOKEN.findall(text)
+    grams = list(words)
+    for word in words:
+        padded = f' {word} '
+        # Character n-grams let "train" match "training" and "moons" match "moon"
+        grams.extend(padded[i:i + 4] for i in range(max(len(padded) - 3, 1)))
+    # crc32 rather than hash() so every worker process agrees on feature ids
+    return Counter(zlib.crc32(gram.encode('utf-8')) % n_features for gram in grams)
+
+
+class TfidfRetriever:
+    """Sparse TF-IDF retrieval over every response in the knowledge base
+
+    Each response (its key, text and the topic keywords) becomes one row of a
+    hashed word + character 4-gram TF-IDF matrix with L2-normalized rows. The matrix is
+    kept column-major, so a query is one sparse matrix-vector product (gather
+    the columns of the query's features, accumulate per row with bincount)
+    followed by top-k selection, and a batch of N queries is the same product
+    against an N-column query matrix.
+    """
+    
+    def __init__(self, documents: Sequence[Tuple[str, str, str]], n_features: int = 2 ** 20):
+        self.n_features = n_features
+        self.rows: List[Tuple[str, str]] = [(topic, key) for topic, key, _ in documents]
+        n_docs = len(documents)
+        
+        doc_features = [_hashed_ngrams(text.lower(), n_features) for _, _, text in documents]
+        entry_rows = np.repeat(np.arange(n_docs), [len(f) for f in doc_features])
+        entry_features = np.fromiter((f for feats in doc_features for f in feats), dtype=np.int64,
+                                     count=len(entry_rows))
+        entry_tf = np.fromiter((c for feats in doc_features for c in feats.values()), dtype=np.float64,
+                               count=len(entry_rows))
+        
+        # Column-major (CSC-style) layout: features sorted, rows grouped per feature
+        order = np.lexsort((entry_rows, entry_features))
+        entry_rows, entry_features, entry_tf = entry_rows[order], entry_features[order], entry_tf[order]
+        self._col_features, col_starts, doc_freq = np.unique(entry_features, return_index=True,
+                                                             return_counts=True)
+        self._col_ptr = np.append(col_starts, len(entry_features))
+        self._idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1.0
+        self._unseen_idf = math.log(1 + n_docs) + 1.0
+        
+        weights = (1.0 + np.log(entry_tf)) * np.repeat(self._idf, doc_freq)
+        norms = np.sqrt(np.bincount(entry_rows, weights=weights ** 2, minlength=n_docs))
+        self._col_rows = entry_rows
+        self._col_values = weights / np.where(norms > 0, norms, 1.0)[entry_rows]
+    
+    def query_vectors(self, queries: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (query id, column index, weight) triplets of the normalized query matrix"""
+        counts = [_hashed_ngrams(query, self.n_features) for query in queries]
+        sizes = [len(features) for features in counts]
+        total = sum(sizes)
+        query_ids = np.repeat(np.arange(len(queries)), sizes)
+        feature_ids = np.fromiter((f for features in counts for f in features), dtype=np.int64, count=total)
+        tf = np.fromiter((c for features in counts for c in features.values()), dtype=np.float64, count=total)
+        
+        columns = np.minimum(np.searchsorted(self._col_features, feature_ids), len(self._col_features) - 1)
+        known = self._col_features[columns] == feature_ids
+        weights = (1.0 + np.log(tf)) * np.where(known, self._idf[columns], self._unseen_idf)
+        norms = np.sqrt(np.bincount(query_ids, weights=weights ** 2, minlength=len(queries)))
+        weights /= np.where(norms > 0, norms, 1.0)[query_ids]
+        return query_ids[known], columns[known], weights[known]
+    
+    def score_vectors(self, n_queries: int, vectors: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+        """Cosine similarity of query vectors (from query_vectors) against every response, shape (N, rows)"""
+        n_rows = len(self.rows)
+        query_ids, columns, weights = vectors
+        starts = self._col_ptr[columns]
+        lengths = self._col_ptr[columns + 1] - starts
+        total = int(lengths.sum())
+        # Expand each matched column into its nonzero entries without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        flat = np.repeat(query_ids, lengths) * n_rows + self._col_rows[offsets]
+        contributions = self._col_values[offsets] * np.repeat(weights, lengths)
+        scores = np.bincount(flat, weights=contributions, minlength=n_queries * n_rows)
+        return scores.reshape(n_queries, n_rows)
+    
+    def score_batch(self, queries: Sequence[str]) -> np.ndarray:
+        """Cosine similarity of every query (lowercased) against every response, shape (N, rows)"""
+        return self.score_vectors(len(queries), self.query_vectors(queries))
+    
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int = 1) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, score) pairs per row of a score matrix, best first"""
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in range(len(scores))]
+        if k == 1:
+            best = scores.argmax(axis=1)
+            return [[(int(row), float(score))] for row, score in zip(best, scores[np.arange(len(best)), best])]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [(int(row), float(score)) for row, score in zip(rows, row_scores)]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+    
+    def query_batch(self, queries: Sequence[str], k: int = 1) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, score) pairs per query, best first"""
+        return self.top_k(self.score_batch(queries), k)
+    
+    def query(self, query: str, k: int = 1) -> List[Tuple[int, float]]:
+        return self.query_batch([query], k)[0]
+
+
+# Per-stage timings of answering a batch, exported as stage_duration_seconds{component="chat"}
+CHAT_STAGES = {name: registry.stage('chat', name) for name in ('cache', 'tokenize', 'score', 'select')}
+
 
 class SpaceKnowledgeBot:
     """AI chatbot for space-related queries with knowledge base"""
     
-    def __init__(self):
-        self.knowledge_base = self._load_knowledge_base()
-        self.confidence_threshold = 0.6
+    ENGINES = ('keyword', 'tfidf')
+    CONFIDENCE_THRESHOLDS = {'keyword': 0.6, 'tfidf': 0.1}
+    # Added to the score of the last topic answered in a session, halving for each older one
+    CONTEXT_BOOSTS = {'keyword': 0.3, 'tfidf': 0.05}
+    
+    def __init__(self, knowledge_dir: Optional[str] = None, engine: str = 'keyword',
+                 cache_size: int = 0, cache_ttl: Optional[float] = None, seed: Optional[int] = None,
+                 sessions=None, reload_interval: float = 0.0):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(self.ENGINES)}")
+        self.engine = engine
+        self.seed = seed
+        self.knowledge_base = self._load_knowledge_base(knowledge_dir)
+        self.confidence_threshold = self.CONFIDENCE_THRESHOLDS[engine]
+        self.keyword_index = KeywordIndex(self.knowledge_base.keywords())
+        self.retriever = self._build_retriever() if engine == 'tfidf' else None
+        # Keyed on the normalized message; answers for a key are computed from that normalized text
+        self.response_cache = LRUCache(max_entries=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        # Per-user context store (services.sessions); None answers every message on its own
+        self.sessions = sessions
+        # Seconds between checks of the knowledge base files for changes; 0 never checks
+        self.reload_interval = reload_interval
+        self._next_check = time.monotonic() + reload_interval
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+        self.reload_errors = 0
         
-    def _load_knowledge_base(self) -> Dict[str, Any]:
-        """Load the space knowledge base"""
-        return {
-            'space_basics': {
-                'keywords': ['gravity', 'vacuum', 'orbit', 'atmosphere', 'pressure', 'temperature', 'radiation'],
-                'responses': {
-                    'gravity': "In space, there's virtually no gravity as we know it on Earth. Astronauts experience microgravity, which makes them appear weightless. This happens because they're in continuous free fall around Earth while the ISS orbits at about 408 km above the surface.",
-                    'vacuum': "Space is a near-perfect vacuum, meaning there's almost no air or matter. This creates unique challenges like the need for pressurized spacecraft and space suits to protect astronauts from the harsh environment.",
-                    'orbit': "An orbit occurs when an object moves around another object in a curved path due to gravitational forces. Spacecraft maintain orbit by balancing their forward velocity with Earth's gravitational pull."
-                }
-            },
-            'astronauts': {
-                'keywords': ['astronaut', 'training', 'sleep', 'eat', 'exercise', 'daily life', 'spacewalk', 'eva'],
-                'responses': {
-                    'training': "Astronaut training is incredibly rigorous and takes years. It includes physical fitness, spacecraft systems training, survival training, underwater EVA practice, and learning to work in microgravity using specialized facilities.",
-                    'sleep': "Astronauts sleep in sleeping bags attached to walls in small crew quarters. They use eye masks and earplugs since the ISS orbits Earth every 90 minutes, experiencing 16 sunrises and sunsets daily.",
-                    'eat': "Space food is specially prepared to prevent crumbs and spills. Astronauts eat rehydrated meals, thermostabilized foods, and fresh fruits when supply missions arrive. They drink through straws from pouches.",
-                    'exercise': "Astronauts exercise 2.5 hours daily using specialized equipment like treadmills with harness systems and resistance devices to prevent muscle atrophy and bone loss in microgravity."
-                }
-            },
-            'spacecraft': {
-                'keywords': ['rocket', 'iss', 'space station', 'shuttle', 'capsule', 'propulsion', 'fuel'],
-                'responses': {
-                    'rocket': "Rockets work by Newton's third law - for every action, there's an equal and opposite reaction. They burn fuel to create hot gases that are expelled downward, pushing the rocket upward. Modern rockets use liquid oxygen and rocket fuel.",
-                    'iss': "The International Space Station is a habitable artificial satellite in low Earth orbit. It's about the size of a football field and travels at 28,000 km/h. It serves as a microgravity research laboratory with crew from multiple countries.",
-                    'propulsion': "Spacecraft use various propulsion methods: chemical rockets for launch and major maneuvers, ion thrusters for long-duration missions, and reaction control systems for precise positioning."
-                }
-            },
-            'missions': {
-                'keywords': ['apollo', 'mars', 'moon', 'landing', 'rover', 'probe', 'exploration', 'mission'],
-                'responses': {
-                    'apollo': "The Apollo program achieved the first human moon landings from 1969-1972. Apollo 11's Neil Armstrong and Buzz Aldrin were the first humans to walk on the moon on July 20, 1969, while Michael Collins orbited above.",
-                    'mars': "Mars exploration includes numerous robotic missions. Current rovers like Perseverance search for signs of ancient life and collect samples. Future crewed missions to Mars are planned for the 2030s.",
-                    'rover': "Mars rovers are robotic vehicles designed to traverse the Martian surface. They carry scientific instruments to analyze soil, rocks, and atmosphere. Rovers like Curiosity and Perseverance have made groundbreaking discoveries."
-                }
-            },
-            'planets': {
-                'keywords': ['mars', 'jupiter', 'saturn', 'venus', 'mercury', 'planet', 'moon', 'rings'],
-                'responses': {
-                    'mars': "Mars is called the Red Planet due to iron oxide on its surface. It has seasons like Earth, polar ice caps, and the largest volcano in the solar system (Olympus Mons). A day on Mars is about 24 hours and 37 minutes.",
-                    'jupiter': "Jupiter is the largest planet in our solar system with over 80 known moons. Its Great Red Spot is a storm larger than Earth that's been raging for centuries. It acts as a 'cosmic vacuum cleaner' protecting inner planets from asteroids.",
-                    'saturn': "Saturn is famous for its spectacular ring system made of ice and rock particles. It's less dense than water and has over 80 moons, including Titan, which has lakes of liquid methane."
-                }
-            },
-            'history': {
-                'keywords': ['sputnik', 'gagarin', 'armstrong', 'space race', 'first', 'history', 'timeline'],
-                'responses': {
-                    'sputnik': "Sputnik 1, launched by the Soviet Union on October 4, 1957, was the first artificial satellite. This beach ball-sized satellite started the Space Age and the Space Race between the US and USSR.",
-                    'gagarin': "Yuri Gagarin became the first human in space on April 12, 1961, aboard Vostok 1. His 108-minute orbital flight around Earth was a major milestone in human space exploration.",
-                    'space race': "The Space Race was a 20th-century competition between the US and Soviet Union to achieve superior spaceflight capabilities. It drove rapid advancement in space technology and culminated in the moon landing."
-                }
-            }
-        }
+    def reload(self) -> None:
+        """Re-read the knowledge base from disk and rebuild everything derived from it"""
+        with self._reload_lock:
+            self._reload()
+
+    def _reload(self) -> None:
+        self.knowledge_base.load()
+        self.keyword_index = KeywordIndex(self.knowledge_base.keywords())
+        if self.engine == 'tfidf':
+            self.retriever = self._build_retriever()
+        if self.response_cache is not None:
+            self.response_cache.clear()
+        self.reloads += 1
+
+    def reload_if_changed(self) -> bool:
+        """Reload if the knowledge base files changed, looking at most every ``reload_interval`` seconds
+
+        Each worker of a multi-process server calls this on its own requests,
+        so an edit to the files reaches all of them without a broadcast. One
+        thread reloads while the others keep answering from the old index; a
+        failed reload (say, of a half-written file) keeps the old index too
+        and is retried at the next check.
+        """
+        if not self.reload_interval or time.monotonic() < self._next_check:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.reload_interval
+            if not self.knowledge_base.changed():
+                return False
+            self._reload()
+            return True
+        except (OSError, ValueError):
+            self.reload_errors += 1
+            return False
+        finally:
+            self._reload_lock.release()
+    
+    def _rng(self, message: str):
+        """Module-level random, or a generator seeded per message in deterministic mode"""
+        if self.seed is None:
+            return random
+        return random.Random(f'{self.seed}:{normalize_message(message)}')
+        
+    def _load_knowledge_base(self, knowledge_dir: Optional[str] = None) -> KnowledgeBase:
+        """Load the space knowledge base index from its on-disk shards"""
+        return KnowledgeBase(knowledge_dir or DEFAULT_KNOWLEDGE_DIR)
+    
+    def _build_retriever(self) -> TfidfRetriever:
+        """Vectorize every response of every topic into one TF-IDF matrix"""
+        documents = []
+        for topic, keywords in self.knowledge_base.keywords().items():
+            for key, text in self.knowledge_base.responses(topic).items():
+                documents.append((topic, key, ' '.join([key, text] + keywords)))
+        return TfidfRetriever(documents)
     
-    def get_response(self, user_message: str) -> Dict[str, Any]:
-        """Generate a response to user message"""
-        user_message_lower = user_message.lower()
+    def get_responses(self, user_messages: Sequence[str]) -> List[Dict[str, Any]]:
+        """Generate responses for a batch of messages, scored together where the engine allows"""
+        # Both paths score the normalized text, so the cache setting never changes an answer
+        if self.response_cache is None:
+            return self._score_messages([normalize_message(message) for message in user_messages])
         
-        # Find matching topics and calculate confidence
+        with CHAT_STAGES['cache'].time():
+            keys = [normalize_message(message) for message in user_messages]
+            responses: List[Optional[Dict[str, Any]]] = [self.response_cache.get(key) for key in keys]
+        misses = list(dict.fromkeys(key for key, response in zip(keys, responses) if response is None))
+        if misses:
+            computed = dict(zip(misses, self._score_messages(misses)))
+            for key, response in computed.items():
+                self.response_cache.put(key, response)
+            responses = [response or computed[key] for key, response in zip(keys, responses)]
+        # Callers get their own copy (lists included) so a cached payload is never mutated
+        return [{**response, 'sources': list(response['sources']), 'suggestions': list(response['suggestions'])}
+                for response in responses]
+    
+    def _score_messages(self, user_messages: Sequence[str]) -> List[Dict[str, Any]]:
+        """Score messages with the configured engine, bypassing the response cache"""
+        with CHAT_STAGES['tokenize'].time():
+            lowered = [message.lower() for message in user_messages]
+            vectors = self.retriever.query_vectors(lowered) if self.retriever is not None else None
+        with CHAT_STAGES['score'].time():
+            if vectors is None:
+                scores = [self.keyword_index.score(message) for message in lowered]
+            else:
+                scores = self.retriever.score_vectors(len(lowered), vectors)
+        with CHAT_STAGES['select'].time():
+            if vectors is None:
+                return [self._keyword_response(message, topic_scores)
+                        for message, topic_scores in zip(user_messages, scores)]
+            return [self._retrieved_response(message, top)
+                    for message, top in zip(user_messages, self.retriever.top_k(scores, 1))]
+    
+    def get_response(self, user_message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate a response to user message, in the context of ``user_id``'s session if given"""
+        response = self.get_responses([user_message])[0]
+        if user_id is not None and self.sessions is not None:
+            response = self.continue_session(user_id, user_message, response)
+        return response
+    
+    def continue_session(self, user_id: str, user_message: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-answer a fallback from the user's recent context, then record the turn in their session
+
+        ``response`` is the stateless answer to ``user_message``. Only
+        fallbacks are re-scored, so a message that stands on its own gets
+        the same (cacheable) answer with or without a session, and only
+        when the message itself adds something to resolve: an anaphor, or
+        a keyword the session has not seen. "what is the capital of
+        france?" after "tell me about mars" keeps its fallback.
+        """
+        session = self.sessions.get(user_id) or Session()
+        mentioned = self.keyword_index.find(user_message.lower())
+        if response['topic'] is None and (session.topics or session.entities) and (
+                any(keyword not in session.entities for keyword in mentioned)
+                or not ANAPHORS.isdisjoint(_TOKEN.findall(user_message.lower()))):
+            contextual = self._answer_in_context(user_message, session)
+            if contextual is not None:
+                response = contextual
+        self.sessions.put(user_id, session.advance(response['topic'], mentioned))
+        return response
+    
+    def _answer_in_context(self, user_message: str, session: Session) -> Optional[Dict[str, Any]]:
+        """Score a follow-up against the session's recent topics; None unless it clears the threshold
+
+        The session's entities are appended to the message only when scoring
+        the topics being boosted, so context never lifts any other topic over
+        the one the message names. The reported confidence is the message's
+        own score plus the boost, and it must reach the engine's threshold.
+        """
+        # "what about its moons?" after "tell me about mars" is ranked as "what about its moons? mars"
+        lowered = user_message.lower()
+        context = ' '.join(session.entities)
+        text = f'{lowered} {context}'
+        boost = self.CONTEXT_BOOSTS[self.engine]
+        boosts = {topic: boost / 2 ** age for age, topic in enumerate(session.topics)}
+        if self.retriever is None:
+            topics = self.keyword_index.topics
+            own = self.keyword_index.score(lowered)
+            combined = self.keyword_index.score(text)
+            ranking = [(combined[i] if topic in boosts else own[i]) + boosts.get(topic, 0.0)
+                       for i, topic in enumerate(topics)]
+            best = max(range(len(topics)), key=ranking.__getitem__)
+            confidence = own[best] + boosts.get(topics[best], 0.0)
+            if confidence < self.confidence_threshold:
+                return None
+            return self._compose_response(user_message, topics[best], min(confidence, 1.0), context=context)
+        row_boosts = np.array([boosts.get(topic, 0.0) for topic, _ in self.retriever.rows])
+        own, combined = self.retriever.score_batch([lowered, text])
+        ranking = np.where(row_boosts > 0, combined, own) + row_boosts
+        best = int(ranking.argmax())
+        confidence = float(own[best] + row_boosts[best])
+        if confidence < self.confidence_threshold:
+            return None
+        topic, key = self.retriever.rows[best]
+        return self._compose_response(user_message, topic, min(confidence, 1.0), key)
+    
+    def _retrieved_response(self, user_message: str, top: List[Tuple[int, float]]) -> Dict[str, Any]:
+        """Answer one message from its best TF-IDF row, or fall back below the threshold"""
+        row, confidence = top[0] if top else (None, 0.0)
+        if row is not None and confidence >= self.confidence_threshold:
+            topic, key = self.retriever.rows[row]
+            return self._compose_response(user_message, topic, confidence, key)
+        return self._compose_response(user_message, None, confidence)
+    
+    def _keyword_response(self, user_message: str, scores: Sequence[float], context: str = '') -> Dict[str, Any]:
+        """Answer one message from its keyword index topic scores"""
         best_match = None
         highest_confidence = 0
         
-        for topic, data in self.knowledge_base.items():
-            confidence = self._calculate_confidence(user_message_lower, data['keywords'])
+        for topic, confidence in zip(self.keyword_index.topics, scores):
             if confidence > highest_confidence:
                 highest_confidence = confidence
-                best_match = (topic, data)
+                best_match = topic
         
         if best_match and highest_confidence >= self.confidence_threshold:
-            topic, data = best_match
-            response = self._generate_specific_response(user_message_lower, data)
+            return self._compose_response(user_message, best_match, highest_confidence, context=context)
+        return self._compose_response(user_message, None, highest_confidence)
+    
+    def _compose_response(self, user_message: str, topic: Optional[str], confidence: float,
+                          response_key: Optional[str] = None, context: str = '') -> Dict[str, Any]:
+        """Build the response payload for a matched topic, or the fallback when topic is None
+
+        ``context`` (session keywords) picks the specific response when the
+        message itself names none.
+        """
+        if topic is not None:
+            data = self.knowledge_base.topic(topic)
+            if response_key is not None:
+                response = data['responses'][response_key]
+            else:
+                response = self._generate_specific_response(user_message.lower(), data, context)
             sources = [f"Space Knowledge Base - {topic.replace('_', ' ').title()}"]
             suggestions = self._generate_suggestions(topic)
         else:
@@ -91,13 +372,14 @@ class SpaceKnowledgeBot:
         
         return {
             'message': response,
-            'confidence': round(highest_confidence, 2),
+            'confidence': round(confidence, 2),
             'sources': sources,
-            'suggestions': suggestions
+            'suggestions': suggestions,
+            'topic': topic
         }
     
     def _calculate_confidence(self, message: str, keywords: List[str]) -> float:
-        """Calculate confidence score based on keyword matches"""
+        """Calculate confidence score based on keyword matches (reference scan for KeywordIndex)"""
         words = re.findall(r'\b\w+\b', message)
         matches = sum(1 for word in words if any(keyword in word for keyword in keywords))
         
@@ -112,22 +394,22 @@ class SpaceKnowledgeBot:
         
         return min(base_confidence + exact_boost, 1.0)
     
-    def _generate_specific_response(self, message: str, data: Dict[str, Any]) -> str:
+    def _generate_specific_response(self, message: str, data: Dict[str, Any], context: str = '') -> str:
         """Generate specific response based on matched topic"""
         responses = data['responses']
         
-        # Find the most relevant specific response
+        # Find the most relevant specific response, from the message first and then its context
         best_key = None
-        for key in responses.keys():
-            if key in message:
-                best_key = key
+        for text in (message, context):
+            best_key = next((key for key in responses.keys() if key in text), None)
+            if best_key:
                 break
         
         if best_key:
             return responses[best_key]
         
         # Return a random response from the topic if no specific match
-        return random.choice(list(responses.values()))
+        return self._rng(message).choice(list(responses.values()))
     
     def _generate_fallback_response(self, message: str) -> str:
         """Generate fallback response for unclear queries"""
@@ -138,44 +420,16 @@ class SpaceKnowledgeBot:
             "That's a great space-related question! I specialize in topics like astronaut training, spacecraft systems, planetary exploration, and the history of space missions. Could you rephrase your question to be more specific?"
         ]
         
-        return random.choice(fallback_responses)
+        return self._rng(message).choice(fallback_responses)
     
     def _generate_suggestions(self, topic: str) -> List[str]:
         """Generate follow-up suggestions based on topic"""
-        suggestions_map = {
-            'space_basics': [
-                "How does gravity work in space?",
-                "Why is space a vacuum?",
-                "How do satellites stay in orbit?"
-            ],
-            'astronauts': [
-                "How do astronauts train for space?",
-                "What is it like to sleep in space?",
-                "How do astronauts exercise in microgravity?"
-            ],
-            'spacecraft': [
-                "How do rockets work?",
-                "Tell me about the International Space Station",
-                "What are different types of spacecraft?"
-            ],
-            'missions': [
-                "Tell me about the Apollo moon missions",
-                "What are the current Mars missions?",
-                "What was the first space mission?"
-            ],
-            'planets': [
-                "What makes Mars special?",
-                "Tell me about Jupiter's moons",
-                "Why does Saturn have rings?"
-            ],
-            'history': [
-                "What was the Space Race?",
-                "Who was the first person in space?",
-                "When was the first satellite launched?"
-            ]
-        }
-        
-        return suggestions_map.get(topic, self._generate_general_suggestions())
+        if topic in self.knowledge_base:
+            suggestions = self.knowledge_base.topic(topic).get('suggestions')
+            if suggestions:
+                # A copy: the record is shared through the knowledge base cache
+                return list(suggestions)
+        return self._generate_general_suggestions()
     
     def _generate_general_suggestions(self) -> List[str]:
         """Generate general suggestions"""
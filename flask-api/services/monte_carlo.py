@@ -0,0 +1,216 @@
+import os
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.trajectory import (
+    EARTH_RADIUS_M, G0, SCALE_HEIGHT_M, SEA_LEVEL_DENSITY, Vehicle
+)
+from utils.metrics import registry
+from utils.process_pool import ProcessPool
+
+# Column order of the per-run parameter matrix
+PARAMETERS = ('dry_mass', 'propellant_mass', 'thrust', 'isp', 'drag_coefficient', 'reference_area')
+OUTPUTS = ('altitude', 'velocity', 'fuel_remaining')
+SERIES_OUTPUTS = 3  # outputs sampled over time; the rest are one value per run
+RUN_OUTPUTS = ('apogee',)
+# Bump whenever results change, so cached results (services.result_cache) are recomputed
+ENGINE_VERSION = 1
+
+# Below this many runs the pool start-up and IPC cost more than they save
+MIN_PARALLEL_RUNS = 2000
+MAX_WORKERS = int(os.environ.get('MONTE_CARLO_WORKERS', os.cpu_count() or 1))
+STAGES = {name: registry.stage('monte_carlo', name) for name in ('sample', 'integrate', 'summarize')}
+
+_pool = ProcessPool()
+
+
+def dispersed_parameters(vehicle: Vehicle, runs: int, seed: int, thrust_sigma: float = 0.02,
+                         mass_sigma: float = 0.01, drag_sigma: float = 0.1) -> np.ndarray:
+    """Draw one perturbed vehicle per row; sigmas are relative standard deviations
+
+    Drawn up front in the parent process, so results for a seed do not depend on
+    how the runs are later split across workers.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.array([getattr(vehicle, name) for name in PARAMETERS], dtype=np.float64)
+    sigma = np.array([mass_sigma, mass_sigma, thrust_sigma, 0.0, drag_sigma, 0.0])
+    factors = 1.0 + rng.standard_normal((runs, len(PARAMETERS))) * sigma
+    return np.maximum(base * factors, 0.0)
+
+
+def integrate_batch(params: np.ndarray, dt: float, steps: int, sample_idx: np.ndarray,
+                    altitude_out: np.ndarray, velocity_out: np.ndarray, fuel_out: np.ndarray,
+                    apogee_out: np.ndarray) -> None:
+    """RK4-integrate every row of params at once, writing only the sampled steps
+
+    Same dynamics as ``simulate_ascent``, with one array element per run.
+    Series outputs have shape (runs, len(sample_idx)); apogee_out has shape
+    (runs,) and tracks the highest altitude over every step.
+    """
+    dry_mass = params[:, 0]
+    propellant = params[:, 1]
+    thrust = params[:, 2]
+    mass_flow = np.divide(thrust, params[:, 3] * G0, out=np.zeros_like(thrust), where=params[:, 3] > 0)
+    drag_factor = 0.5 * params[:, 4] * params[:, 5] * SEA_LEVEL_DENSITY
+    gm = G0 * EARTH_RADIUS_M * EARTH_RADIUS_M
+    fuel_scale = np.divide(100.0, propellant, out=np.zeros_like(propellant), where=propellant > 0)
+
+    def acceleration(h, v, m):
+        drag = drag_factor * np.exp(-h / SCALE_HEIGHT_M) * v * np.abs(v)
+        r = EARTH_RADIUS_M + h
+        return (np.where(m > dry_mass, thrust, 0.0) - drag) / m - gm / (r * r)
+
+    h = np.zeros(len(params))
+    v = np.zeros(len(params))
+    m = dry_mass + propellant
+    half = 0.5 * dt
+    sample = 0
+    apogee_out[:] = 0.0
+
+    def record(i):
+        nonlocal sample
+        while sample < len(sample_idx) and sample_idx[sample] == i:
+            altitude_out[:, sample] = h
+            velocity_out[:, sample] = v
+            fuel_out[:, sample] = (m - dry_mass) * fuel_scale
+            sample += 1
+
+    record(0)
+    for i in range(1, steps + 1):
+        mdot = np.where(m > dry_mass, mass_flow, 0.0)
+        a1 = acceleration(h, v, m)
+        v2 = v + half * a1
+        m2 = m - half * mdot
+        a2 = acceleration(h + half * v, v2, m2)
+        v3 = v + half * a2
+        a3 = acceleration(h + half * v2, v3, m2)
+        v4 = v + dt * a3
+        a4 = acceleration(h + dt * v3, v4, m - dt * mdot)
+
+        h = h + dt / 6.0 * (v + 2.0 * v2 + 2.0 * v3 + v4)
+        v = v + dt / 6.0 * (a1 + 2.0 * a2 + 2.0 * a3 + a4)
+        m = np.maximum(m - dt * mdot, dry_mass)
+        grounded = h < 0.0
+        h[grounded] = 0.0
+        v[grounded] = np.maximum(v[grounded], 0.0)
+        np.maximum(apogee_out, h, out=apogee_out)
+        record(i)
+
+
+def _attach(name: str, shape: Tuple[int, ...]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+
+def _output_shapes(runs: int, n_samples: int):
+    return [(runs, n_samples)] * SERIES_OUTPUTS + [(runs,)] * len(RUN_OUTPUTS)
+
+
+def _run_chunk(params_name: str, output_names: Sequence[str], runs: int, n_samples: int,
+               start: int, stop: int, dt: float, steps: int, sample_idx: np.ndarray) -> int:
+    """Worker entry point: integrate rows [start, stop) straight into shared memory"""
+    blocks, views = [], []
+    try:
+        block, params = _attach(params_name, (runs, len(PARAMETERS)))
+        blocks.append(block)
+        views.append(params[start:stop])
+        for name, shape in zip(output_names, _output_shapes(runs, n_samples)):
+            block, array = _attach(name, shape)
+            blocks.append(block)
+            views.append(array[start:stop])
+        del params, array
+        integrate_batch(views[0], dt, steps, sample_idx, *views[1:])
+    finally:
+        # Views must be released before the buffers can be closed
+        views.clear()
+        for block in blocks:
+            block.close()
+    return stop - start
+
+
+class MonteCarloResult:
+    """Percentile envelopes of a dispersion run; per-run arrays are not kept"""
+
+    def __init__(self, time: np.ndarray, percentiles: Sequence[float], envelopes: Dict[str, np.ndarray],
+                 apogee: np.ndarray, runs: int, seed: int):
+        self.time = time
+        self.percentiles = list(percentiles)
+        self.envelopes = envelopes  # output name -> (len(percentiles), samples)
+        self.apogee = apogee  # apogee percentiles
+        self.runs = runs
+        self.seed = seed
+
+    def to_dict(self, decimals: int = 2) -> Dict[str, Any]:
+        labels = [f'p{p:g}' for p in self.percentiles]
+        return {
+            'time': self.time.round(3).tolist(),
+            'envelopes': {
+                name: dict(zip(labels, values.round(decimals).tolist()))
+                for name, values in self.envelopes.items()
+            },
+            'apogee': dict(zip(labels, self.apogee.round(decimals).tolist())),
+            'runs': self.runs,
+            'seed': self.seed,
+        }
+
+
+def run_monte_carlo(vehicle: Vehicle = Vehicle(), runs: int = 1000, seed: int = 0, dt: float = 0.1,
+                    duration: float = 300.0, points: int = 61, percentiles: Sequence[float] = (5, 50, 95),
+                    thrust_sigma: float = 0.02, mass_sigma: float = 0.01, drag_sigma: float = 0.1,
+                    workers: Optional[int] = None) -> MonteCarloResult:
+    """Dispersion analysis of ``runs`` perturbed ascents, summarized as percentile envelopes
+
+    Large jobs are split across a process pool; workers write their rows into
+    shared-memory buffers so only chunk bounds travel back over IPC.
+    """
+    vehicle.validate()
+    if runs < 1:
+        raise ValueError('runs must be at least 1')
+    steps = max(1, int(round(duration / dt)))
+    dt = duration / steps
+    sample_idx = np.unique(np.linspace(0, steps, max(2, min(points, steps + 1))).round().astype(np.int64))
+    n_samples = len(sample_idx)
+    with STAGES['sample'].time():
+        params = dispersed_parameters(vehicle, runs, seed, thrust_sigma, mass_sigma, drag_sigma)
+
+    workers = MAX_WORKERS if workers is None else workers
+    shapes = _output_shapes(runs, n_samples)
+    blocks = []
+    outputs = []
+    try:
+        with STAGES['integrate'].time():
+            if workers <= 1 or runs < MIN_PARALLEL_RUNS:
+                outputs = [np.empty(shape) for shape in shapes]
+                integrate_batch(params, dt, steps, sample_idx, *outputs)
+            else:
+                params_block = shared_memory.SharedMemory(create=True, size=params.nbytes)
+                blocks.append(params_block)
+                np.ndarray(params.shape, dtype=np.float64, buffer=params_block.buf)[:] = params
+                for shape in shapes:
+                    block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+                    blocks.append(block)
+                    outputs.append(np.ndarray(shape, dtype=np.float64, buffer=block.buf))
+
+                bounds = np.linspace(0, runs, min(workers, runs) + 1).astype(int)
+                _pool.run(_run_chunk, workers, [
+                    (params_block.name, [b.name for b in blocks[1:]], runs, n_samples, int(start), int(stop), dt,
+                     steps, sample_idx)
+                    for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+                ])
+
+        with STAGES['summarize'].time():
+            envelopes = {
+                name: np.percentile(values, percentiles, axis=0)
+                for name, values in zip(OUTPUTS, outputs)
+            }
+            apogee = np.percentile(outputs[SERIES_OUTPUTS], percentiles)
+    finally:
+        # Views must be released before the shared buffers can be closed
+        outputs.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return MonteCarloResult(sample_idx * dt, percentiles, envelopes, apogee, runs, seed)
@@ -1 +1,330 @@
-# NASA API service 
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Mapping, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = float(os.environ.get('UPSTREAM_TIMEOUT', 5.0))
+DEFAULT_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 10))
+USER_AGENT = 'SpaceandTravel/1.0'
+
+OPEN_NOTIFY_URL = os.environ.get('OPEN_NOTIFY_URL', 'http://api.open-notify.org')
+CELESTRAK_URL = os.environ.get('CELESTRAK_URL', 'https://celestrak.org')
+SWPC_URL = os.environ.get('SWPC_URL', 'https://services.swpc.noaa.gov')
+
+
+class UpstreamError(RuntimeError):
+    """An upstream fetch failed and there was no cached copy to fall back on"""
+
+
+class CircuitOpen(UpstreamError):
+    """Raised without contacting the upstream while its circuit breaker is open"""
+
+
+class RateLimited(UpstreamError):
+    """Raised when no request token became available within the wait budget"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests per second with bursts of up to ``burst``"""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """Take one token, waiting up to ``timeout`` seconds; False if none became available"""
+        deadline = self._clock() + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Sleeping exactly ``wait`` can refill to a hair under 1.0; don't spin on rounding error
+                if self._tokens >= 1.0 - 1e-9:
+                    self._tokens = max(self._tokens - 1.0, 0.0)
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+class CircuitBreaker:
+    """Stops calls to an upstream after ``failure_threshold`` consecutive failures
+
+    While open, ``allow()`` refuses every call for ``reset_timeout`` seconds;
+    then a single trial call is let through (half-open). Its success closes
+    the circuit, its failure opens it for another ``reset_timeout``.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fetched_at: float  # time.time() of the upstream response
+    fresh_until: float  # deadlines on the client's clock
+    stale_until: float
+
+
+class UpstreamClient:
+    """Cached, coalescing HTTP client for one upstream service
+
+    Responses are cached for ``ttl`` seconds. For a further ``stale_ttl``
+    seconds an expired entry is still served straight away while a single
+    background fetch refreshes it (stale-while-revalidate); if that fetch
+    fails the old value keeps being served until a refresh succeeds. Callers
+    that miss the cache at the same time share one upstream request: the
+    first one fetches, the rest wait on its result.
+
+    Every upstream request goes through a pooled keep-alive ``Session``, a
+    token bucket (``rate`` requests/s, ``burst``) and a circuit breaker, so a
+    slow or failing upstream costs at most ``failure_threshold`` timeouts
+    before callers fail fast (or get stale data) for ``reset_timeout`` s.
+    Cache ages, the bucket and the breaker all read ``clock``
+    (``time.monotonic``); the bucket waits with ``sleep``.
+    """
+
+    def __init__(self, base_url: str, ttl: float = 60.0, stale_ttl: float = 600.0,
+                 timeout: float = DEFAULT_TIMEOUT, rate: float = 10.0, burst: int = 10,
+                 rate_wait: float = 1.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 pool_size: int = DEFAULT_POOL_SIZE, session: Optional[requests.Session] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.rate_wait = rate_wait
+        self.clock = clock
+        self.limiter = TokenBucket(rate, burst, clock, sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock)
+        self.pool_size = pool_size
+        self._session = session
+        self._session_pid: Optional[int] = os.getpid() if session is not None else None
+        self._cache: Dict[Hashable, CacheEntry] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._refresher: Optional[ThreadPoolExecutor] = None
+        self._refresher_pid: Optional[int] = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_requests = 0
+        self.upstream_errors = 0
+        self.rejected = 0
+
+    @property
+    def session(self) -> requests.Session:
+        # Sessions and their sockets must not be shared across a fork
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def _background(self) -> ThreadPoolExecutor:
+        if self._refresher is None or self._refresher_pid != os.getpid():
+            self._refresher_pid = os.getpid()
+            self._refresher = ThreadPoolExecutor(2, thread_name_prefix='upstream-refresh')
+        return self._refresher
+
+    def get_json(self, path: str, params: Optional[Mapping[str, Any]] = None, ttl: Optional[float] = None) -> Any:
+        """Decoded JSON body of ``GET base_url + path``, cached as described on the class"""
+        return self.get(path, params, ttl, lambda response: response.json())
+
+    def get_text(self, path: str, params: Optional[Mapping[str, Any]] = None, ttl: Optional[float] = None) -> str:
+        return self.get(path, params, ttl, lambda response: response.text)
+
+    def get(self, path: str, params: Optional[Mapping[str, Any]], ttl: Optional[float],
+            parse: Callable[[requests.Response], Any]) -> Any:
+        key = (path, tuple(sorted((params or {}).items())))
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self.hits += 1
+                return entry.value
+            if entry is not None and now < entry.stale_until:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._inflight[key] = Future()
+                    self._background().submit(self._refresh, key, path, params, ttl, parse)
+                return entry.value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if leader:
+            self._refresh(key, path, params, ttl, parse)
+        return future.result()
+
+    def _refresh(self, key, path, params, ttl, parse) -> None:
+        """Fetch ``key`` and settle its in-flight future; an old value is kept if the fetch fails"""
+        try:
+            value = self._fetch(path, params, parse)
+        except Exception as exc:
+            with self._lock:
+                future = self._inflight.pop(key)
+                entry = self._cache.get(key)
+            if entry is not None:
+                # Serve what we have rather than an error
+                future.set_result(entry.value)
+            else:
+                future.set_exception(exc)
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = self.clock()
+        with self._lock:
+            self._cache[key] = CacheEntry(value, time.time(), now + ttl, now + ttl + self.stale_ttl)
+            future = self._inflight.pop(key)
+        future.set_result(value)
+
+    def _fetch(self, path: str, params, parse) -> Any:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpen(f'{self.base_url} is unavailable; retrying after {self.breaker.reset_timeout:g} s')
+        if not self.limiter.acquire(self.rate_wait):
+            self.rejected += 1
+            raise RateLimited(f'Request rate limit for {self.base_url} reached')
+        self.upstream_requests += 1
+        try:
+            response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+            if response.status_code >= 500 or response.status_code == 429:
+                raise UpstreamError(f'{self.base_url}{path} returned HTTP {response.status_code}')
+            response.raise_for_status()
+            value = parse(response)
+        except requests.HTTPError as exc:
+            # A 4xx is our request's fault, not the upstream's health
+            self.breaker.record_success()
+            raise UpstreamError(str(exc)) from exc
+        except (requests.RequestException, UpstreamError, ValueError) as exc:
+            self.upstream_errors += 1
+            self.breaker.record_failure()
+            raise UpstreamError(str(exc)) from exc
+        self.breaker.record_success()
+        return value
+
+    def fetched_at(self, path: str, params: Optional[Mapping[str, Any]] = None) -> Optional[float]:
+        """Unix time the cached copy of a resource was fetched, or None"""
+        entry = self._cache.get((path, tuple(sorted((params or {}).items()))))
+        return entry.fetched_at if entry is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'base_url': self.base_url,
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'upstream_requests': self.upstream_requests,
+            'upstream_errors': self.upstream_errors,
+            'rejected': self.rejected,
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.opened,
+        }
+
+
+class NasaDataClient:
+    """The live feeds the API can draw on, one ``UpstreamClient`` per service
+
+    Base URLs default to the public services and can point at a local stub
+    (see ``benchmarks/upstream.py``). TTLs follow how often each feed changes.
+    """
+
+    def __init__(self, open_notify_url: str = OPEN_NOTIFY_URL, celestrak_url: str = CELESTRAK_URL,
+                 swpc_url: str = SWPC_URL, **options):
+        self.open_notify = UpstreamClient(open_notify_url, ttl=5.0, stale_ttl=60.0, rate=5.0, burst=5, **options)
+        self.celestrak = UpstreamClient(celestrak_url, ttl=2 * 3600.0, stale_ttl=24 * 3600.0, rate=1.0, burst=2,
+                                        **options)
+        self.swpc = UpstreamClient(swpc_url, ttl=60.0, stale_ttl=3600.0, rate=5.0, burst=5, **options)
+
+    def iss_position(self) -> Tuple[float, float, int]:
+        """Latitude, longitude and Unix timestamp of the ISS"""
+        data = self.open_notify.get_json('/iss-now.json')
+        position = data['iss_position']
+        return float(position['latitude']), float(position['longitude']), int(data['timestamp'])
+
+    def people_in_space(self) -> Dict[str, Any]:
+        return self.open_notify.get_json('/astros.json')
+
+    def tle_group(self, group: str) -> str:
+        """CelesTrak element sets for a satellite group, in 3LE text form"""
+        return self.celestrak.get_text('/NORAD/elements/gp.php', {'GROUP': group, 'FORMAT': 'tle'})
+
+    def planetary_k_index(self) -> Any:
+        return self.swpc.get_json('/products/noaa-planetary-k-index.json')
+
+    def solar_wind(self, kind: str = 'plasma') -> Any:
+        """Last day of DSCOVR solar wind data: 'plasma' or 'mag'"""
+        if kind not in ('plasma', 'mag'):
+            raise ValueError("Solar wind kind must be 'plasma' or 'mag'")
+        return self.swpc.get_json(f'/products/solar-wind/{kind}-1-day.json')
+
+    def xray_flux(self) -> Any:
+        """Last day of GOES X-ray flux, both wavelength bands"""
+        return self.swpc.get_json('/json/goes/primary/xrays-1-day.json')
+
+    def solar_flux(self) -> Any:
+        """Latest 10.7 cm radio flux (F10.7)"""
+        return self.swpc.get_json('/products/summary/10cm-flux.json')
+
+    def stats(self) -> Dict[str, Any]:
+        return {'open_notify': self.open_notify.stats(), 'celestrak': self.celestrak.stats(),
+                'swpc': self.swpc.stats()}
@@ -0,0 +1,227 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import registry
+
+MU_EARTH = 398600.4418  # km^3/s^2
+EARTH_RADIUS_KM = 6371.0
+
+# WGS84 ellipsoid, for geodetic coordinates
+WGS84_A_KM = 6378.137
+WGS84_F = 1.0 / 298.257223563
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+
+UNIX_EPOCH_JD = 2440587.5
+
+ELEMENT_NAMES = ('a', 'e', 'i', 'raan', 'argp', 'mean_anomaly')
+# Bump whenever results change, so cached results (services.result_cache) are recomputed
+ENGINE_VERSION = 1
+
+# Upper bound on objects x epochs evaluated at once, to cap temporary arrays
+_CHUNK_ELEMENTS = 1 << 21
+
+PROPAGATE_STAGE = registry.stage('orbits', 'propagate')
+
+
+def solve_kepler(mean_anomaly: np.ndarray, e: np.ndarray, tol: float = 1e-12, max_iter: int = 30) -> np.ndarray:
+    """Eccentric anomaly for elliptical orbits by Newton iteration over whole arrays
+
+    ``e`` broadcasts against ``mean_anomaly``. Iteration stops once every
+    element has converged, so the common near-circular case takes 3-4 passes.
+    """
+    M = np.remainder(mean_anomaly, 2.0 * np.pi)
+    e = np.broadcast_to(e, M.shape)
+    # Starting guess from Danby; converges for every e < 1
+    E = M + 0.85 * e * np.sign(np.sin(M))
+    for _ in range(max_iter):
+        f = E - e * np.sin(E) - M
+        delta = f / (1.0 - e * np.cos(E))
+        E -= delta
+        if np.abs(delta).max(initial=0.0) < tol:
+            break
+    return E
+
+
+def _perifocal_basis(i: np.ndarray, raan: np.ndarray, argp: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit vectors towards periapsis (P) and 90 degrees ahead of it (Q), shape S + (3,)"""
+    cos_o, sin_o = np.cos(raan), np.sin(raan)
+    cos_w, sin_w = np.cos(argp), np.sin(argp)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    P = np.stack([
+        cos_o * cos_w - sin_o * sin_w * cos_i,
+        sin_o * cos_w + cos_o * sin_w * cos_i,
+        sin_w * sin_i,
+    ], axis=-1)
+    Q = np.stack([
+        -cos_o * sin_w - sin_o * cos_w * cos_i,
+        -sin_o * sin_w + cos_o * cos_w * cos_i,
+        cos_w * sin_i,
+    ], axis=-1)
+    return P, Q
+
+
+def eci_state(a, e, i, raan, argp, mean_anomaly, mu: float = MU_EARTH,
+              with_velocity: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """ECI position and velocity for element arrays that broadcast to a common shape S
+
+    Returns arrays of shape S + (3,); angles in radians, ``a`` in km.
+    """
+    a, e, i, raan, argp, mean_anomaly = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (a, e, i, raan, argp, mean_anomaly)))
+    P, Q = _perifocal_basis(i, raan, argp)
+    b = np.sqrt(1.0 - e ** 2)
+    E = solve_kepler(mean_anomaly, e)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    position = (a * (cos_E - e))[..., None] * P + (a * b * sin_E)[..., None] * Q
+    if not with_velocity:
+        return position, None
+    scale = np.sqrt(mu * a) / (a * (1.0 - e * cos_E))
+    velocity = (-scale * sin_E)[..., None] * P + (scale * b * cos_E)[..., None] * Q
+    return position, velocity
+
+
+def _as_elements(elements: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(elements[name], dtype=np.float64))
+                                   for name in ELEMENT_NAMES))
+    parsed = dict(zip(ELEMENT_NAMES, arrays))
+    if np.any(parsed['a'] <= 0) or np.any((parsed['e'] < 0) | (parsed['e'] >= 1)):
+        raise ValueError('Only elliptical orbits are supported (a > 0, 0 <= e < 1)')
+    return parsed
+
+
+def propagate(elements: Dict[str, np.ndarray], times: np.ndarray, mu: float = MU_EARTH,
+              with_velocity: bool = True, dtype=np.float64) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Two-body propagation of n element sets to m epochs
+
+    ``elements`` maps ``a`` (km), ``e``, and the angles ``i``, ``raan``,
+    ``argp``, ``mean_anomaly`` (radians, mean anomaly at t=0) to arrays of
+    length n. ``times`` are seconds from that epoch, shape (m,). Returns ECI
+    positions (km) and velocities (km/s) of shape (n, m, 3); velocities are
+    None when ``with_velocity`` is false.
+    """
+    el = _as_elements(elements)
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    n, m = len(el['a']), len(times)
+
+    positions = np.empty((n, m, 3), dtype=dtype)
+    velocities = np.empty((n, m, 3), dtype=dtype) if with_velocity else None
+
+    mean_motion = np.sqrt(mu / el['a'] ** 3)
+    P, Q = _perifocal_basis(el['i'], el['raan'], el['argp'])
+    semi_minor_factor = np.sqrt(1.0 - el['e'] ** 2)
+
+    with PROPAGATE_STAGE.time():
+        rows = max(1, _CHUNK_ELEMENTS // max(m, 1))
+        for start in range(0, n, rows):
+            sl = slice(start, min(start + rows, n))
+            a = el['a'][sl, None]
+            e = el['e'][sl, None]
+            b = semi_minor_factor[sl, None]
+            M = el['mean_anomaly'][sl, None] + mean_motion[sl, None] * times[None, :]
+            E = solve_kepler(M, e)
+            cos_E, sin_E = np.cos(E), np.sin(E)
+
+            # Perifocal coordinates, then rotate with the P/Q basis
+            x = a * (cos_E - e)
+            y = a * b * sin_E
+            positions[sl] = x[..., None] * P[sl, None, :] + y[..., None] * Q[sl, None, :]
+
+            if with_velocity:
+                scale = np.sqrt(mu * a) / (a * (1.0 - e * cos_E))
+                vx = -scale * sin_E
+                vy = scale * b * cos_E
+                velocities[sl] = vx[..., None] * P[sl, None, :] + vy[..., None] * Q[sl, None, :]
+
+    return positions, velocities
+
+
+def elements_from_state(position: np.ndarray, velocity: np.ndarray, mu: float = MU_EARTH) -> Dict[str, np.ndarray]:
+    """Classical elements from ECI state vectors of shape (n, 3) or (3,)"""
+    r = np.atleast_2d(np.asarray(position, dtype=np.float64))
+    v = np.atleast_2d(np.asarray(velocity, dtype=np.float64))
+    r_norm = np.linalg.norm(r, axis=1)
+    v_norm = np.linalg.norm(v, axis=1)
+
+    h = np.cross(r, v)
+    h_norm = np.linalg.norm(h, axis=1)
+    if np.any(h_norm == 0):
+        raise ValueError('State vector describes a rectilinear orbit')
+    node = np.cross([0.0, 0.0, 1.0], h)
+    node_norm = np.linalg.norm(node, axis=1)
+    e_vec = ((v_norm ** 2 - mu / r_norm)[:, None] * r - np.sum(r * v, axis=1)[:, None] * v) / mu
+    e = np.linalg.norm(e_vec, axis=1)
+    energy = v_norm ** 2 / 2.0 - mu / r_norm
+    if np.any(energy >= 0):
+        raise ValueError('State vector is not on a bound (elliptical) orbit')
+    a = -mu / (2.0 * energy)
+    i = np.arccos(np.clip(h[:, 2] / h_norm, -1.0, 1.0))
+
+    # Equatorial or circular orbits have no node or periapsis; measure from the x axis instead
+    equatorial = node_norm < 1e-11 * h_norm
+    circular = e < 1e-11
+    node_dir = np.where(equatorial[:, None], [1.0, 0.0, 0.0], node / np.where(equatorial, 1.0, node_norm)[:, None])
+    raan = np.where(equatorial, 0.0, np.arctan2(node_dir[:, 1], node_dir[:, 0])) % (2 * np.pi)
+
+    # In-plane reference direction 90 degrees ahead of the node
+    ahead = np.cross(h / h_norm[:, None], node_dir)
+    periapsis_dir = np.where(circular[:, None], node_dir, e_vec / np.where(circular, 1.0, e)[:, None])
+    argp = np.arctan2(np.sum(periapsis_dir * ahead, axis=1), np.sum(periapsis_dir * node_dir, axis=1))
+    argp = np.where(circular, 0.0, argp) % (2 * np.pi)
+
+    # True anomaly from periapsis (or from the node for circular orbits)
+    q_dir = np.cross(h / h_norm[:, None], periapsis_dir)
+    nu = np.arctan2(np.sum(r * q_dir, axis=1), np.sum(r * periapsis_dir, axis=1))
+    E = 2.0 * np.arctan2(np.sqrt(1.0 - e) * np.sin(nu / 2.0), np.sqrt(1.0 + e) * np.cos(nu / 2.0))
+    mean_anomaly = (E - e * np.sin(E)) % (2 * np.pi)
+
+    return {'a': a, 'e': e, 'i': i, 'raan': raan, 'argp': argp, 'mean_anomaly': mean_anomaly}
+
+
+def orbital_period(a: np.ndarray, mu: float = MU_EARTH) -> np.ndarray:
+    """Period in seconds for semi-major axis ``a`` in km"""
+    return 2.0 * np.pi * np.sqrt(np.asarray(a, dtype=np.float64) ** 3 / mu)
+
+
+def gmst(unix_seconds: np.ndarray) -> np.ndarray:
+    """Greenwich mean sidereal angle in radians (IAU 1982), treating UTC as UT1"""
+    jd = np.asarray(unix_seconds, dtype=np.float64) / 86400.0 + UNIX_EPOCH_JD
+    t = (jd - 2451545.0) / 36525.0
+    seconds = 67310.54841 + (876600.0 * 3600.0 + 8640184.812866) * t + 0.093104 * t ** 2 - 6.2e-6 * t ** 3
+    return np.remainder(seconds, 86400.0) / 240.0 * np.pi / 180.0
+
+
+def eci_to_ecef(position: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """Rotate ECI vectors (shape S + (3,)) about z by the sidereal angle ``theta`` (broadcasts to S)"""
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y = position[..., 0], position[..., 1]
+    return np.stack([cos_t * x + sin_t * y, -sin_t * x + cos_t * y, position[..., 2]], axis=-1)
+
+
+def geodetic_from_ecef(position: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """WGS84 latitude and longitude (degrees) and altitude (km) from ECEF km
+
+    Bowring's closed form: one pass, sub-metre for anything from the surface
+    out to geostationary altitude.
+    """
+    x, y, z = position[..., 0], position[..., 1], position[..., 2]
+    p = np.hypot(x, y)
+    b = WGS84_A_KM * (1.0 - WGS84_F)
+    ep2 = WGS84_E2 / (1.0 - WGS84_E2)
+    theta = np.arctan2(z * WGS84_A_KM, p * b)
+    lat = np.arctan2(z + ep2 * b * np.sin(theta) ** 3, p - WGS84_E2 * WGS84_A_KM * np.cos(theta) ** 3)
+    sin_lat = np.sin(lat)
+    alt = p * np.cos(lat) + z * sin_lat - WGS84_A_KM * np.sqrt(1.0 - WGS84_E2 * sin_lat ** 2)
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), alt
+
+
+def ecef_from_geodetic(latitude, longitude, altitude) -> np.ndarray:
+    """ECEF km from WGS84 latitude/longitude (degrees) and altitude (km); shape S + (3,)"""
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    sin_lat = np.sin(lat)
+    n = WGS84_A_KM / np.sqrt(1.0 - WGS84_E2 * sin_lat ** 2)
+    return np.stack([
+        (n + altitude) * np.cos(lat) * np.cos(lon),
+        (n + altitude) * np.cos(lat) * np.sin(lon),
+        (n * (1.0 - WGS84_E2) + altitude) * sin_lat,
+    ], axis=-1)
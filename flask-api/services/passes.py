@@ -0,0 +1,248 @@
+import datetime
+import math
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.orbits import ecef_from_geodetic, eci_to_ecef, gmst
+from services.satellite_catalog import SatelliteCatalog
+from utils.helpers import LRUCache
+from utils.metrics import registry
+
+DAY = 86400.0
+# Passes are bucketed by the UTC day they rise in; look this far past midnight for the set
+LOOKAHEAD = 2 * 3600.0
+COARSE_STEP = 60.0
+REFINE_ITERATIONS = 8
+REFINE_TOLERANCE = 1e-3  # seconds
+PASS_CACHE_ENTRIES = int(os.environ.get('PASS_CACHE_ENTRIES', 100000))
+
+# Upper bound on samples x objects x sites evaluated at once
+_CHUNK_ELEMENTS = 1 << 20
+
+COMPUTE_STAGE = registry.stage('passes', 'compute_day')
+
+
+class Site(NamedTuple):
+    """Ground station; altitude in km above the WGS84 ellipsoid"""
+    latitude: float
+    longitude: float
+    altitude: float = 0.0
+    min_elevation: float = 10.0  # degrees
+
+
+class Pass(NamedTuple):
+    """One visibility window, times in Unix seconds; ``set`` is None if still up after the lookahead"""
+    object_row: int
+    site: int
+    rise: float
+    culmination: float
+    set: Optional[float]
+    max_elevation: float  # degrees
+
+
+class PassPredictor:
+    """Rise, culmination and set times for many (object, site) pairs at once
+
+    For each UTC day, the sine of the elevation of every object above every
+    site is evaluated on a coarse time grid in a handful of array operations.
+    Only the intervals where it crosses the site's elevation mask, or peaks,
+    are refined, all pairs at once: crossings by the Illinois method and
+    culminations by Newton steps on finite differences. Results are memoized
+    per (object, element set, site, day), so polling the same dashboard only
+    computes days it has not seen. Passes shorter than one coarse step can be
+    missed.
+    """
+
+    def __init__(self, catalog: SatelliteCatalog, step: float = COARSE_STEP,
+                 cache_entries: int = PASS_CACHE_ENTRIES):
+        self.catalog = catalog
+        self.step = step
+        self.cache = LRUCache(max_entries=cache_entries)
+
+    def _sin_elevation(self, times: np.ndarray, rows: np.ndarray, site_ecef: np.ndarray,
+                       site_up: np.ndarray) -> np.ndarray:
+        """sin(elevation) for matching arrays of times, catalog rows and site vectors"""
+        position, _ = self.catalog.state_at(times, rows, with_velocity=False)
+        rho = eci_to_ecef(position, gmst(times)) - site_ecef
+        return np.sum(rho * site_up, axis=-1) / np.linalg.norm(rho, axis=-1)
+
+    def _compute_day(self, day: int, rows: np.ndarray, sites: Sequence[Site]) -> Dict[Tuple[int, int], List[Pass]]:
+        """Every pass rising during ``day`` (days since the Unix epoch) for all rows x sites"""
+        site_ecef = ecef_from_geodetic(*np.array([s[:3] for s in sites], dtype=np.float64).T)
+        lat, lon = np.radians([s.latitude for s in sites]), np.radians([s.longitude for s in sites])
+        site_up = np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+        sin_mask = np.sin(np.radians([s.min_elevation for s in sites]))
+
+        times = day * DAY + np.arange(0.0, DAY + LOOKAHEAD + self.step, self.step)
+        n_times, n_rows, n_sites = len(times), len(rows), len(sites)
+        chunk = max(1, _CHUNK_ELEMENTS // max(n_rows * n_sites, 1))
+
+        crossings, peaks = [], []
+        for start in range(0, n_times, chunk):
+            # One extra sample either side so crossings and peaks at chunk edges are seen
+            lo, hi = max(start - 1, 0), min(start + chunk + 1, n_times)
+            t = times[lo:hi]
+            position, _ = self.catalog.state_at(t[:, None], rows, with_velocity=False)
+            ecef = eci_to_ecef(position, gmst(t)[:, None])
+            # Expand |ecef - site| and (ecef - site).up so the (time, object, site) products are matmuls
+            range_sq = (np.sum(ecef ** 2, axis=-1)[..., None] - 2.0 * ecef @ site_ecef.T
+                        + np.sum(site_ecef ** 2, axis=-1))
+            sin_el = (ecef @ site_up.T - np.sum(site_ecef * site_up, axis=-1)) / np.sqrt(range_sq)
+            above = sin_el > sin_mask
+
+            a, b = max(start, 1) - lo, min(start + chunk, n_times) - lo
+            k, o, s = np.nonzero(above[a:b] != above[a - 1:b - 1])
+            k += a
+            crossings.append((k + lo, o, s, above[k, o, s], sin_el[k - 1, o, s], sin_el[k, o, s]))
+
+            b = min(start + chunk, n_times - 1) - lo
+            peak = above[a:b] & (sin_el[a:b] >= sin_el[a - 1:b - 1]) & (sin_el[a:b] > sin_el[a + 1:b + 1])
+            k, o, s = np.nonzero(peak)
+            k += a
+            peaks.append((k + lo, o, s, sin_el[k - 1, o, s], sin_el[k, o, s], sin_el[k + 1, o, s]))
+
+        k, o, s, rising, f_lo, f_hi = (np.concatenate(column) for column in zip(*crossings))
+        event_time = self._refine_crossings(times[k - 1], times[k], f_lo - sin_mask[s], f_hi - sin_mask[s],
+                                            rows[o], site_ecef[s], site_up[s], sin_mask[s])
+        k_peak, o_peak, s_peak, before, at, after = (np.concatenate(column) for column in zip(*peaks))
+        peak_time, peak_sin = self._refine_peaks(times[k_peak], before, at, after, rows[o_peak],
+                                                 site_ecef[s_peak], site_up[s_peak])
+        return self._assemble(day, n_rows, n_sites, o * n_sites + s, event_time, rising,
+                              o_peak * n_sites + s_peak, peak_time, np.degrees(np.arcsin(peak_sin)), rows)
+
+    def _refine_crossings(self, lo, hi, f_lo, f_hi, rows, site_ecef, site_up, sin_mask) -> np.ndarray:
+        """Time the elevation crosses the mask inside each bracket, by the Illinois method
+
+        Regula falsi that halves the weight of an end point retained twice in a
+        row; starting from the coarse samples it converges in a few evaluations.
+        """
+        t = lo - f_lo * (hi - lo) / (f_hi - f_lo)
+        side = np.zeros(len(t), dtype=np.int8)
+        for _ in range(REFINE_ITERATIONS):
+            f = self._sin_elevation(t, rows, site_ecef, site_up) - sin_mask
+            same_as_lo = np.sign(f) == np.sign(f_lo)
+            lo, f_lo = np.where(same_as_lo, t, lo), np.where(same_as_lo, f, f_lo)
+            hi, f_hi = np.where(same_as_lo, hi, t), np.where(same_as_lo, f_hi, f)
+            # Illinois step: damp the end point that was kept on the previous iteration too
+            f_hi = np.where(same_as_lo & (side == 1), f_hi / 2.0, f_hi)
+            f_lo = np.where(~same_as_lo & (side == -1), f_lo / 2.0, f_lo)
+            side = np.where(same_as_lo, 1, -1).astype(np.int8)
+            new_t = lo - f_lo * (hi - lo) / np.where(f_hi == f_lo, 1.0, f_hi - f_lo)
+            converged = np.abs(new_t - t).max(initial=0.0) < REFINE_TOLERANCE
+            t = new_t
+            if converged:
+                break
+        return t
+
+    def _refine_peaks(self, t, before, at, after, rows, site_ecef, site_up) -> Tuple[np.ndarray, np.ndarray]:
+        """Culmination as the root of the elevation rate, by Newton steps on finite differences
+
+        Starts from the vertex of the parabola through the three coarse samples
+        and never leaves the bracket they span.
+        """
+        lo, hi = t - self.step, t + self.step
+        curvature = before - 2.0 * at + after
+        t = t + 0.5 * self.step * (before - after) / np.where(curvature < 0, curvature, -1.0)
+        h = 1.0
+        for _ in range(REFINE_ITERATIONS):
+            f_minus = self._sin_elevation(t - h, rows, site_ecef, site_up)
+            f_mid = self._sin_elevation(t, rows, site_ecef, site_up)
+            f_plus = self._sin_elevation(t + h, rows, site_ecef, site_up)
+            curvature = f_plus - 2.0 * f_mid + f_minus
+            delta = 0.5 * h * (f_minus - f_plus) / np.where(curvature < 0, curvature, -1.0)
+            t = np.clip(t + delta, lo, hi)
+            if np.abs(delta).max(initial=0.0) < REFINE_TOLERANCE:
+                break
+        return t, self._sin_elevation(t, rows, site_ecef, site_up)
+
+    @staticmethod
+    def _assemble(day, n_rows, n_sites, pair, event_time, rising, peak_pair, peak_time, peak_elevation,
+                  rows) -> Dict[Tuple[int, int], List[Pass]]:
+        """Pair each rise with the next set of the same (object, site) and its highest peak"""
+        # Sort everything on one key: (object, site) pair first, then time within the day
+        span = 2.0 * (DAY + LOOKAHEAD)
+        origin = day * DAY - span / 4.0
+        event_key = pair * span + (event_time - origin)
+        order = np.argsort(event_key, kind='stable')
+        pair, event_time, rising, event_key = pair[order], event_time[order], rising[order], event_key[order]
+
+        rises = np.flatnonzero(rising & (event_time >= day * DAY) & (event_time < (day + 1) * DAY))
+        following = np.minimum(rises + 1, len(pair) - 1)
+        has_set = (rises + 1 < len(pair)) & (pair[following] == pair[rises]) & ~rising[following]
+        rise_key = event_key[rises]
+        set_key = np.where(has_set, event_key[following], (pair[rises] + 1) * span)
+
+        # Each peak belongs to the latest rise before it, if it comes before that pass sets
+        peak_key = peak_pair * span + (peak_time - origin)
+        owner = np.searchsorted(rise_key, peak_key, side='right') - 1
+        valid = owner >= 0
+        valid[valid] &= peak_key[valid] <= set_key[owner[valid]]
+        owner, peak_time, peak_elevation = owner[valid], peak_time[valid], peak_elevation[valid]
+        best = np.lexsort((-peak_elevation, owner))
+        owners, first = np.unique(owner[best], return_index=True)
+        culmination = event_time[rises].copy()
+        max_elevation = np.zeros(len(rises))
+        culmination[owners] = peak_time[best[first]]
+        max_elevation[owners] = peak_elevation[best[first]]
+
+        passes: Dict[Tuple[int, int], List[Pass]] = {(o, s): [] for o in range(n_rows) for s in range(n_sites)}
+        set_time = event_time[following]
+        for j, i in enumerate(rises.tolist()):
+            o, s = divmod(int(pair[i]), n_sites)
+            passes[(o, s)].append(Pass(int(rows[o]), s, float(event_time[i]), float(culmination[j]),
+                                       float(set_time[j]) if has_set[j] else None, float(max_elevation[j])))
+        return passes
+
+    def predict(self, rows: Sequence[int], sites: Sequence[Site], start: datetime.datetime,
+                days: float = 1.0) -> List[Pass]:
+        """Passes of catalog ``rows`` over ``sites`` that are up at any point in [start, start + days)
+
+        ``Pass.site`` indexes ``sites``. Results are sorted by rise time.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        begin = start.timestamp()
+        end = begin + days * DAY
+        keys = [(int(self.catalog.satnum[row]), float(self.catalog.epoch[row])) for row in rows]
+
+        found: List[Pass] = []
+        # A pass still up at ``start`` may have risen the day before; its set is known up to LOOKAHEAD past midnight
+        for day in range(int((begin - LOOKAHEAD) // DAY), int(math.ceil(end / DAY))):
+            cached = {}
+            missing_rows, missing_sites = set(), set()
+            for o, key in enumerate(keys):
+                for s, site in enumerate(sites):
+                    value = self.cache.get((key, site, day))
+                    if value is None:
+                        missing_rows.add(o)
+                        missing_sites.add(s)
+                    else:
+                        cached[(o, s)] = value
+            if missing_rows:
+                # One vectorized pass over every object and site that missed
+                row_list, site_list = sorted(missing_rows), sorted(missing_sites)
+                with COMPUTE_STAGE.time():
+                    computed = self._compute_day(day, rows[row_list], [sites[s] for s in site_list])
+                for (o, s), day_passes in computed.items():
+                    o, s = row_list[o], site_list[s]
+                    self.cache.put((keys[o], sites[s], day), day_passes)
+                    cached.setdefault((o, s), day_passes)
+            for (o, s), day_passes in cached.items():
+                found.extend(p._replace(object_row=int(rows[o]), site=s) for p in day_passes
+                             if p.rise < end and (p.set is None or p.set >= begin))
+        found.sort(key=lambda p: p.rise)
+        return found
+
+
+def pass_to_dict(p: Pass) -> Dict[str, Any]:
+    def iso(t):
+        return None if t is None else datetime.datetime.fromtimestamp(t, datetime.timezone.utc).isoformat()
+
+    return {
+        'rise': iso(p.rise),
+        'culmination': iso(p.culmination),
+        'set': iso(p.set),
+        'max_elevation': round(p.max_elevation, 2),
+        'duration': None if p.set is None else round(p.set - p.rise, 1),
+    }
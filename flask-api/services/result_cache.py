@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.helpers import LRUCache
+
+DEFAULT_CACHE_DIR = os.environ.get('SIMULATION_CACHE_DIR',
+                                   os.path.join(os.path.dirname(__file__), '..', 'data', 'simulation-cache'))
+# Array offsets inside a blob are aligned for SIMD-friendly views
+_ALIGNMENT = 64
+
+# Named arrays plus JSON-able extras, e.g. a summary computed alongside them
+Result = Tuple[Dict[str, np.ndarray], Dict[str, Any]]
+
+
+def _canonical(value: Any) -> Any:
+    """Parameters as JSON-stable values: equal inputs always serialize to the same text"""
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return value + 0.0  # folds -0.0 into 0.0
+    return value
+
+
+def _result_bytes(result: Result) -> int:
+    return sum(array.nbytes for array in result[0].values())
+
+
+def cache_key(engine: str, version: int, params: Dict[str, Any]) -> str:
+    """Content address of a result: SHA-256 over the engine, its version and the canonicalized parameters"""
+    text = json.dumps({'engine': engine, 'version': version, 'params': _canonical(params)},
+                      sort_keys=True, separators=(',', ':'), allow_nan=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def etag(key: str, *representation: Any) -> str:
+    """Entity tag of one representation (output format, downsampling...) of the result at ``key``"""
+    text = json.dumps([key, _canonical(list(representation))], separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+class ResultCache:
+    """Two-tier cache of deterministic engine results, keyed by ``cache_key``
+
+    The first tier is an in-process LRU bounded in bytes. The second is a
+    directory shared by every worker on the host. There, each result is one
+    ``<key>.npy`` blob of its arrays, back to back, plus a ``<key>.json``
+    layout. A disk hit memory-maps the blob and returns read-only views of
+    it, so repeated hits share page-cache pages instead of copies.
+
+    Only results that took at least ``min_disk_seconds`` to compute are
+    written to disk. Reading back costs a few hundred microseconds, which is
+    more than the cheapest results take to recompute. Concurrent requests
+    for a key still being computed wait for that computation instead of
+    repeating it. Disk errors are counted, never raised. Above
+    ``max_disk_bytes`` the least recently used entries are removed.
+    """
+
+    def __init__(self, max_bytes: int = 128 << 20, directory: Optional[str] = DEFAULT_CACHE_DIR,
+                 max_disk_bytes: int = 1 << 30, min_disk_seconds: float = 0.005):
+        self.memory = LRUCache(max_bytes=max_bytes, sizeof=_result_bytes) if max_bytes > 0 else None
+        self.directory = directory or None
+        self.max_disk_bytes = max_disk_bytes
+        self.min_disk_seconds = min_disk_seconds
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+
+        self.computed = 0
+        self.compute_seconds = 0.0
+        self.coalesced = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+        self.last_error: Optional[str] = None
+
+    def get(self, key: str, compute: Callable[[], Result]) -> Result:
+        """The result stored at ``key``, calling ``compute`` (once across concurrent callers) on a miss"""
+        if self.memory is not None:
+            result = self.memory.get(key)
+            if result is not None:
+                return result
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            result = self._read(key) if self.directory else None
+            if result is None:
+                started = time.perf_counter()
+                result = compute()
+                elapsed = time.perf_counter() - started
+                # Shared by every later hit, so nobody may write to them; disk hits are read-only maps anyway
+                for array in result[0].values():
+                    array.setflags(write=False)
+                with self._lock:
+                    self.computed += 1
+                    self.compute_seconds += elapsed
+                if self.directory and elapsed >= self.min_disk_seconds:
+                    self._write(key, result)
+            if self.memory is not None:
+                self.memory.put(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        stem = os.path.join(self.directory, key[:2], key)
+        return stem + '.npy', stem + '.json'
+
+    def _error(self, e: Exception) -> None:
+        with self._lock:
+            self.disk_errors += 1
+            self.last_error = f'{type(e).__name__}: {e}'
+
+    def _read(self, key: str) -> Optional[Result]:
+        blob_path, layout_path = self._paths(key)
+        try:
+            with open(layout_path) as f:
+                layout = json.load(f)
+            blob = np.load(blob_path, mmap_mode='r') if layout['bytes'] else np.empty(0, dtype=np.uint8)
+            arrays = {}
+            for name, dtype, shape, offset in layout['arrays']:
+                dtype = np.dtype(dtype)
+                count = int(np.prod(shape, dtype=np.int64))
+                arrays[name] = blob[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+            os.utime(layout_path)  # recency for pruning
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._error(e)
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return arrays, layout['extra']
+
+    def _write(self, key: str, result: Result) -> None:
+        """Blob first, layout last: a result is visible only once both are complete"""
+        arrays, extra = result
+        blob_path, layout_path = self._paths(key)
+        entries, offset = [], 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            entries.append((name, array.dtype.str, list(array.shape), offset))
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        blob = np.zeros(offset, dtype=np.uint8)
+        for (name, _, _, start), array in zip(entries, arrays.values()):
+            data = np.ascontiguousarray(array).view(np.uint8).reshape(-1)
+            blob[start:start + len(data)] = data
+        layout = json.dumps({'bytes': offset, 'arrays': entries, 'extra': extra}, separators=(',', ':'))
+        try:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            for path, write in ((blob_path, lambda f: np.save(f, blob)),
+                                (layout_path, lambda f: f.write(layout.encode('utf-8')))):
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        write(f)
+                    os.replace(tmp, path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+        except (OSError, TypeError, ValueError) as e:
+            self._error(e)
+            return
+        with self._lock:
+            self.disk_writes += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes += offset
+        self._prune()
+
+    def _entries(self):
+        """(last used, bytes, blob path, layout path) of every complete entry on disk"""
+        entries = []
+        for shard in os.listdir(self.directory):
+            shard_dir = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith('.json'):
+                    layout_path = os.path.join(shard_dir, name)
+                    blob_path = layout_path[:-len('.json')] + '.npy'
+                    try:
+                        entries.append((os.stat(layout_path).st_mtime, os.stat(blob_path).st_size, blob_path,
+                                        layout_path))
+                    except FileNotFoundError:
+                        pass
+        return entries
+
+    def _prune(self) -> None:
+        """Rescan when this process's running total passes the cap; other workers write too"""
+        if self._disk_bytes is not None and self._disk_bytes <= self.max_disk_bytes:
+            return
+        try:
+            entries = self._entries()
+            total = sum(size for _, size, _, _ in entries)
+            entries.sort()
+            for _, size, blob_path, layout_path in entries:
+                if total <= self.max_disk_bytes:
+                    break
+                for path in (layout_path, blob_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                self.disk_evictions += 1
+            self._disk_bytes = total
+        except OSError as e:
+            self._error(e)
+
+    def clear(self) -> None:
+        """Empty the memory tier; the disk tier is left to other workers and pruning"""
+        if self.memory is not None:
+            self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats() if self.memory is not None else {}
+        return {
+            'hits': memory.get('hits', 0),
+            'disk_hits': self.disk_hits,
+            'misses': self.computed,
+            'coalesced': self.coalesced,
+            'evictions': memory.get('evictions', 0),
+            'entries': memory.get('entries', 0),
+            'bytes': memory.get('bytes', 0),
+            'avg_compute_ms': round(self.compute_seconds / self.computed * 1000.0, 3) if self.computed else 0.0,
+            'directory': self.directory,
+            'disk_writes': self.disk_writes,
+            'disk_bytes': self._disk_bytes,
+            'disk_evictions': self.disk_evictions,
+            'disk_errors': self.disk_errors,
+            'last_error': self.last_error,
+        }
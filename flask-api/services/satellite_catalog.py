@@ -0,0 +1,215 @@
+import calendar
+import datetime
+import glob
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services.orbits import eci_state, eci_to_ecef, geodetic_from_ecef, gmst
+
+DEFAULT_TLE_DIR = os.environ.get('TLE_DIR', os.path.join(os.path.dirname(__file__), '..', 'data', 'tle'))
+
+# WGS72 gravity model, as used to fit published element sets
+MU_WGS72 = 398600.8  # km^3/s^2
+RE_WGS72 = 6378.135  # km
+J2 = 1.082616e-3
+
+REV_PER_DAY = 2.0 * np.pi / 86400.0  # rev/day -> rad/s
+
+# Element columns, in the order they are stored
+ELEMENTS = ('epoch', 'inclination', 'raan', 'eccentricity', 'argp', 'mean_anomaly', 'mean_motion', 'ndot')
+
+
+def _checksum(line: str) -> int:
+    return sum(int(c) if c.isdigit() else c == '-' for c in line[:68]) % 10
+
+
+def _tle_epoch(field: str) -> float:
+    """Unix seconds from a YYDDD.DDDDDDDD epoch field"""
+    year = int(field[:2])
+    year += 2000 if year < 57 else 1900
+    return calendar.timegm((year, 1, 1, 0, 0, 0)) + (float(field[2:]) - 1.0) * 86400.0
+
+
+def parse_tle(line1: str, line2: str) -> Tuple[int, Tuple[float, ...]]:
+    """Catalog number and ``ELEMENTS`` (radians, rad/s) from one element set
+
+    Fields are read from their fixed columns; raises ValueError on malformed
+    lines or a checksum mismatch.
+    """
+    line1, line2 = line1.rstrip(), line2.rstrip()
+    if len(line1) < 69 or len(line2) < 69 or line1[0] != '1' or line2[0] != '2':
+        raise ValueError('Not a two-line element set')
+    for line in (line1, line2):
+        if not line[68].isdigit() or _checksum(line) != int(line[68]):
+            raise ValueError(f'Checksum mismatch in line {line[0]}')
+    satnum = int(line1[2:7])
+    if int(line2[2:7]) != satnum:
+        raise ValueError('Lines belong to different objects')
+    elements = (
+        _tle_epoch(line1[18:32]),
+        np.radians(float(line2[8:16])),
+        np.radians(float(line2[17:25])),
+        float('0.' + line2[26:33].strip()),
+        np.radians(float(line2[34:42])),
+        np.radians(float(line2[43:51])),
+        float(line2[52:63]) * REV_PER_DAY,
+        float(line1[33:43]) * REV_PER_DAY / 86400.0,  # ndot/2, rad/s^2
+    )
+    return satnum, elements
+
+
+def read_tle_file(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield (name, line1, line2) from 2-line or 3-line TLE files; '#' lines are comments"""
+    with open(path, encoding='ascii', errors='replace') as tle_file:
+        lines = [line.rstrip() for line in tle_file if line.strip() and not line.startswith('#')]
+    i = 0
+    while i + 1 < len(lines):
+        if lines[i].startswith('1 ') and lines[i + 1].startswith('2 '):
+            yield lines[i][2:7].strip(), lines[i], lines[i + 1]
+            i += 2
+        elif i + 2 < len(lines) and lines[i + 1].startswith('1 ') and lines[i + 2].startswith('2 '):
+            # CelesTrak's 3LE format prefixes the name line with "0 "
+            name = lines[i][2:] if lines[i].startswith('0 ') else lines[i]
+            yield name.strip(), lines[i + 1], lines[i + 2]
+            i += 3
+        else:
+            i += 1
+
+
+class SatelliteCatalog:
+    """TLE catalog stored as one NumPy array per element, one row per object
+
+    Every ``*.tle`` file in ``directory`` is a group; its file stem is the
+    object type (``earth-observation.tle`` -> "Earth Observation"). Element
+    sets that fail to parse are skipped and counted in ``rejected``.
+    """
+
+    def __init__(self, directory: str = DEFAULT_TLE_DIR):
+        self.directory = os.path.abspath(directory)
+        self.types: List[str] = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        satnums: List[int] = []
+        names: List[str] = []
+        type_codes: List[int] = []
+        rows: List[Tuple[float, ...]] = []
+        types: List[str] = []
+        rejected = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.tle'))):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            types.append(stem.replace('-', ' ').replace('_', ' ').title())
+            for name, line1, line2 in read_tle_file(path):
+                try:
+                    satnum, elements = parse_tle(line1, line2)
+                except ValueError:
+                    rejected += 1
+                    continue
+                satnums.append(satnum)
+                names.append(name)
+                type_codes.append(len(types) - 1)
+                rows.append(elements)
+        self._install(satnums, names, type_codes, rows, types)
+        self.rejected = rejected
+
+    @classmethod
+    def from_arrays(cls, satnum: Iterable[int], names: Iterable[str], type_codes: Iterable[int],
+                    types: List[str], elements: np.ndarray) -> 'SatelliteCatalog':
+        """Catalog from prepared element rows (columns as in ``ELEMENTS``), e.g. for benchmarks"""
+        catalog = cls.__new__(cls)
+        catalog.directory = None
+        catalog.rejected = 0
+        catalog._lock = threading.Lock()
+        catalog._install(list(satnum), list(names), list(type_codes), elements, list(types))
+        return catalog
+
+    def _install(self, satnums, names, type_codes, rows, types) -> None:
+        columns = np.asarray(rows, dtype=np.float64).reshape(-1, len(ELEMENTS)).T
+        inclination, eccentricity = columns[1], columns[3]
+        kozai_motion = columns[6]
+
+        # Element sets carry Kozai mean motion; recover the Brouwer value and the
+        # J2 secular drift of the node, perigee and mean anomaly once at load time
+        cos_i = np.cos(inclination)
+        beta2 = 1.0 - eccentricity ** 2
+        ratio = (MU_WGS72 / RE_WGS72 ** 3) ** (1.0 / 3.0)
+        a1 = (ratio / np.maximum(kozai_motion, 1e-12)) ** (2.0 / 3.0)  # Earth radii
+        d1 = 0.75 * J2 * (3.0 * cos_i ** 2 - 1.0) / (np.sqrt(beta2) * beta2)
+        delta = d1 / a1 ** 2
+        a0 = a1 * (1.0 - delta ** 2 - delta * (1.0 / 3.0 + 134.0 * delta ** 2 / 81.0))
+        mean_motion = kozai_motion / (1.0 + d1 / a0 ** 2)
+        semi_major = (MU_WGS72 / mean_motion ** 2) ** (1.0 / 3.0)
+        k = 1.5 * J2 * (RE_WGS72 / (semi_major * beta2)) ** 2 * mean_motion
+
+        with self._lock:
+            self.types = types
+            self.satnum = np.asarray(satnums, dtype=np.int32)
+            self.names = np.asarray(names, dtype=str)
+            self.type_codes = np.asarray(type_codes, dtype=np.int16)
+            self.epoch, self.inclination, self.raan, self.eccentricity = columns[0], columns[1], columns[2], columns[3]
+            self.argp, self.mean_anomaly, self.ndot = columns[4], columns[5], columns[7]
+            self.semi_major = semi_major
+            self.raan_rate = -k * cos_i
+            self.argp_rate = 0.5 * k * (5.0 * cos_i ** 2 - 1.0)
+            self.mean_anomaly_rate = mean_motion + 0.5 * k * np.sqrt(beta2) * (3.0 * cos_i ** 2 - 1.0)
+
+    def __len__(self) -> int:
+        return len(self.satnum)
+
+    def type_code(self, name: str) -> int:
+        """Index into ``types`` for a type name or file stem, case-insensitive"""
+        wanted = name.replace('-', ' ').replace('_', ' ').strip().lower()
+        for code, type_name in enumerate(self.types):
+            if type_name.lower() == wanted:
+                return code
+        raise ValueError(f"Unknown satellite type '{name}'; expected one of: {', '.join(self.types)}")
+
+    def select(self, type_name: Optional[str] = None) -> np.ndarray:
+        """Row indices of the catalog, optionally restricted to one type"""
+        if type_name is None:
+            return np.arange(len(self))
+        return np.flatnonzero(self.type_codes == self.type_code(type_name))
+
+    def state_at(self, unix_time, index: Optional[np.ndarray] = None,
+                 with_velocity: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """ECI position and velocity (km, km/s) at Unix time(s)
+
+        ``unix_time`` is a scalar or an array matching ``index``, so callers can
+        evaluate each object at its own instant. Mean elements advance with the
+        J2 secular rates plus the ndot/2 drag term, then the whole selection is
+        converted to positions in a single vectorized Kepler solve.
+        """
+        sl = slice(None) if index is None else index
+        dt = unix_time - self.epoch[sl]
+        return eci_state(
+            self.semi_major[sl],
+            self.eccentricity[sl],
+            self.inclination[sl],
+            self.raan[sl] + self.raan_rate[sl] * dt,
+            self.argp[sl] + self.argp_rate[sl] * dt,
+            self.mean_anomaly[sl] + self.mean_anomaly_rate[sl] * dt + self.ndot[sl] * dt * dt,
+            mu=MU_WGS72,
+            with_velocity=with_velocity,
+        )
+
+    def propagate(self, when: datetime.datetime, index: Optional[np.ndarray] = None,
+                  with_velocity: bool = True) -> Dict[str, np.ndarray]:
+        """ECI state and geodetic position of every (or every indexed) object at ``when``
+
+        Returns ``position``/``velocity`` (km, km/s, shape (n, 3)),
+        ``latitude``/``longitude`` (degrees), ``altitude`` (km) and, with
+        velocities, ``speed`` (km/s).
+        """
+        when_unix = when.timestamp()
+        position, velocity = self.state_at(when_unix, index, with_velocity)
+        latitude, longitude, altitude = geodetic_from_ecef(eci_to_ecef(position, gmst(when_unix)))
+        state = {'position': position, 'latitude': latitude, 'longitude': longitude, 'altitude': altitude}
+        if with_velocity:
+            state['velocity'] = velocity
+            state['speed'] = np.linalg.norm(velocity, axis=-1)
+        return state
@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_SESSION_PATH = os.environ.get('CHAT_SESSION_PATH',
+                                      os.path.join(os.path.dirname(__file__), '..', 'data', 'sessions',
+                                                   'sessions.sqlite3'))
+# Most recent first; older context stops helping after a few turns
+MAX_TOPICS = 3
+MAX_ENTITIES = 4
+# Per-entry cost of the OrderedDict slot and link, including the table slack left behind by eviction
+# churn; measured with tracemalloc (benchmarks.sessions) so that max_bytes bounds the real footprint
+ENTRY_OVERHEAD = 160
+_FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+class Session:
+    """Recent context of one user: topics answered and keywords mentioned, most recent first
+
+    Topic names and keywords are references to the knowledge base's own
+    strings, so a session costs a small object and two short tuples.
+    Sessions are never changed in place; ``advance`` returns a new one.
+    """
+
+    __slots__ = ('topics', 'entities', 'last_seen')
+
+    def __init__(self, topics: Tuple[str, ...] = (), entities: Tuple[str, ...] = (), last_seen: float = 0.0):
+        self.topics = topics
+        self.entities = entities
+        self.last_seen = last_seen
+
+    def advance(self, topic: Optional[str], entities: Tuple[str, ...]) -> 'Session':
+        """The session after a turn that answered ``topic`` and mentioned ``entities``"""
+        topics = self.topics
+        if topic is not None:
+            topics = (topic,) + tuple(t for t in topics if t != topic)
+        if entities:
+            entities = entities + tuple(e for e in self.entities if e not in entities)
+        else:
+            entities = self.entities
+        return Session(topics[:MAX_TOPICS], entities[:MAX_ENTITIES])
+
+
+class MemorySessionStore:
+    """Sessions of this process, expired after ``ttl`` idle seconds and capped at ``max_bytes``
+
+    Entries stay ordered by their last ``put``, so idle sessions are always
+    at the front: every ``put`` drops the expired ones from there, then
+    evicts the least recently active until the accounted size fits.
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_bytes: int = 64 << 20):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: 'OrderedDict[str, Session]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_bytes(user_id: str, session: Session) -> int:
+        return (ENTRY_OVERHEAD + sys.getsizeof(user_id) + sys.getsizeof(session) + _FLOAT_SIZE
+                + sys.getsizeof(session.topics) + sys.getsizeof(session.entities))
+
+    def get(self, user_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._data.get(user_id)
+            if session is not None and session.last_seen + self.ttl <= time.monotonic():
+                self._remove(user_id)
+                self.expirations += 1
+                session = None
+            if session is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return session
+
+    def put(self, user_id: str, session: Session) -> None:
+        now = time.monotonic()
+        session.last_seen = now
+        size = self._entry_bytes(user_id, session)
+        with self._lock:
+            if user_id in self._data:
+                self._remove(user_id)
+            self._data[user_id] = session
+            self.current_bytes += size
+            while self._data:
+                oldest_id, oldest = next(iter(self._data.items()))
+                if oldest.last_seen + self.ttl <= now:
+                    self.expirations += 1
+                elif self.current_bytes > self.max_bytes:
+                    self.evictions += 1
+                else:
+                    break
+                self._remove(oldest_id)
+
+    def _remove(self, user_id: str) -> None:
+        self.current_bytes -= self._entry_bytes(user_id, self._data.pop(user_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'memory',
+            'entries': len(self._data),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file, shared by every worker on the host
+
+    Rows carry wall-clock activity times so that all processes agree on
+    expiry. Every ``prune_every`` puts, expired rows are deleted and the
+    least recently active beyond ``max_entries`` are evicted. The
+    connection is opened lazily in each process, so a store built before a
+    fork (gunicorn preload) is never shared across workers.
+    """
+
+    def __init__(self, path: str = DEFAULT_SESSION_PATH, ttl: float = 1800.0, max_entries: int = 1_000_000,
+                 prune_every: int = 1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Called holding the lock"""
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._pid = os.getpid()
+            self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                               timeout=1.0)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=OFF')  # sessions are disposable context
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions (user_id TEXT PRIMARY KEY, context TEXT, last_seen REAL) '
+                'WITHOUT ROWID')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)')
+        return self._connection
+
+    def get(self, user_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self._connect().execute('SELECT context, last_seen FROM sessions WHERE user_id = ? AND last_seen > ?',
+                                          (user_id, time.time() - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        topics, entities = json.loads(row[0])
+        return Session(tuple(topics), tuple(entities), row[1])
+
+    def put(self, user_id: str, session: Session) -> None:
+        session.last_seen = time.time()
+        context = json.dumps([session.topics, session.entities], separators=(',', ':'))
+        with self._lock:
+            connection = self._connect()
+            connection.execute('INSERT OR REPLACE INTO sessions (user_id, context, last_seen) VALUES (?, ?, ?)',
+                               (user_id, context, session.last_seen))
+            self._puts += 1
+            if self._puts % self.prune_every == 0:
+                self._prune(connection)
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        self.expirations += connection.execute('DELETE FROM sessions WHERE last_seen <= ?',
+                                               (time.time() - self.ttl,)).rowcount
+        excess = connection.execute('SELECT COUNT(*) FROM sessions').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.evictions += connection.execute(
+                'DELETE FROM sessions WHERE user_id IN (SELECT user_id FROM sessions ORDER BY last_seen LIMIT ?)',
+                (excess,)).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute('DELETE FROM sessions')
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
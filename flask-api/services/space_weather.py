@@ -0,0 +1,457 @@
+import datetime
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.metrics import registry
+
+# metric -> (Unix times, values), both 1-D and in time order
+Series = Dict[str, Tuple[np.ndarray, np.ndarray]]
+Source = Callable[[float, float], Series]
+
+DEFAULT_RETENTION_HOURS = float(os.environ.get('SPACE_WEATHER_RETENTION_HOURS', 7 * 24))
+DEFAULT_INTERVAL = float(os.environ.get('SPACE_WEATHER_INTERVAL', 60.0))
+
+CADENCE = 60.0  # seconds between solar wind samples
+MINUTE, HOUR, DAY = 60.0, 3600.0, 86400.0
+
+# name -> (unit, sampling interval in seconds)
+METRICS = {
+    'solar_wind_speed': ('km/s', CADENCE),
+    'proton_density': ('p/cm3', CADENCE),
+    'magnetic_field_strength': ('nT', CADENCE),
+    'bz': ('nT', CADENCE),
+    'xray_flux': ('W/m2', CADENCE),
+    'kp_index': ('', 3 * HOUR),
+    'solar_flux': ('sfu', DAY),
+}
+WINDOWS = (('1h', HOUR), ('6h', 6 * HOUR), ('24h', DAY))
+DOWNSAMPLING = ('lttb', 'minmax')
+DOWNSAMPLE_STAGE = registry.stage('space_weather', 'downsample')
+
+
+class RingBuffer:
+    """Fixed-capacity (time, value) series in two preallocated arrays
+
+    Appends overwrite the oldest sample once full. Samples must arrive in
+    time order; ``append`` ignores one that is not newer than the last.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._times = np.empty(capacity)
+        self._values = np.empty(capacity)
+        self._next = 0
+        self.size = 0
+
+    @property
+    def last_time(self) -> float:
+        return float(self._times[self._next - 1]) if self.size else -math.inf
+
+    def append(self, t: float, value: float) -> bool:
+        if t <= self.last_time:
+            return False
+        self._times[self._next] = t
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of the stored times and values, oldest first"""
+        if self.size < self.capacity:
+            return self._times[:self.size].copy(), self._values[:self.size].copy()
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self._times[order], self._values[order]
+
+    def range(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        times, values = self.ordered()
+        lo, hi = np.searchsorted(times, start, side='left'), np.searchsorted(times, end, side='right')
+        return times[lo:hi], values[lo:hi]
+
+
+class RollingWindow:
+    """Min, max and mean over the trailing ``seconds``, updated per sample in O(1) amortized
+
+    Min and max come from monotonic deques, the mean from a running sum.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._samples: deque = deque()
+        self._min: deque = deque()
+        self._max: deque = deque()
+        self._sum = 0.0
+
+    def add(self, t: float, value: float) -> None:
+        self._samples.append((t, value))
+        self._sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((t, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((t, value))
+        self._expire(t - self.seconds)
+
+    def _expire(self, cutoff: float) -> None:
+        samples = self._samples
+        while samples and samples[0][0] <= cutoff:
+            self._sum -= samples.popleft()[1]
+        for extreme in (self._min, self._max):
+            while extreme and extreme[0][0] <= cutoff:
+                extreme.popleft()
+        if not samples:
+            self._sum = 0.0  # drop accumulated rounding error
+
+    def stats(self) -> Dict[str, Any]:
+        count = len(self._samples)
+        if not count:
+            return {'count': 0, 'min': None, 'max': None, 'mean': None}
+        return {'count': count, 'min': self._min[0][1], 'max': self._max[0][1], 'mean': self._sum / count}
+
+
+def lttb(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """Indices of ``points`` samples chosen by Largest-Triangle-Three-Buckets
+
+    Keeps the first and last sample and, from each of ``points - 2`` equal
+    buckets in between, the sample forming the largest triangle with the
+    previously kept sample and the mean of the next bucket, which preserves
+    the visual shape (peaks included) of the series.
+    """
+    size = len(times)
+    if points >= size or points < 3:
+        return np.arange(size) if points >= size else np.array([0, size - 1][:points], dtype=np.intp)
+    edges = np.linspace(1, size - 1, points - 1).astype(np.intp)
+    # Mean of each bucket in one pass; the last bucket's "next bucket" is the final sample
+    counts = np.diff(np.r_[edges, size])
+    next_t = np.add.reduceat(times, edges) / counts
+    next_v = np.add.reduceat(values, edges) / counts
+    keep = np.empty(points, dtype=np.intp)
+    keep[0], keep[-1] = 0, size - 1
+    # Only the choice within a bucket depends on the previous choice; with
+    # a handful of samples per bucket plain Python beats NumPy's call overhead
+    small = size / (points - 2) < 64
+    t_list, v_list = (times.tolist(), values.tolist()) if small else (times, values)
+    anchor = 0
+    for i in range(points - 2):
+        lo, hi = int(edges[i]), int(edges[i + 1])
+        t_a, v_a = t_list[anchor], v_list[anchor]
+        dt, dv = t_a - next_t[i + 1], next_v[i + 1] - v_a
+        if small:
+            anchor = max(range(lo, hi), key=lambda j: abs(dt * (v_list[j] - v_a) - (t_a - t_list[j]) * dv))
+        else:
+            area = np.abs(dt * (values[lo:hi] - v_a) - (t_a - times[lo:hi]) * dv)
+            anchor = lo + int(np.argmax(area))
+        keep[i + 1] = anchor
+    return keep
+
+
+def minmax_buckets(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the minimum and maximum of each of ``points // 2`` equal time-order buckets"""
+    size = len(times)
+    buckets = max(points // 2, 1)
+    if size <= points:
+        return np.arange(size)
+    bucket = np.arange(size) * buckets // size
+    order = np.lexsort((values, bucket))  # by bucket, then value
+    first = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    last = np.r_[first[1:] - 1, size - 1]
+    return np.unique(np.concatenate([order[first], order[last]]))
+
+
+class AlertRule(NamedTuple):
+    name: str
+    metric: str
+    above: bool  # fires when the value rises above (True) or falls below (False) the threshold
+    threshold: float
+    clear: float  # value at which an active alert clears, for hysteresis
+    message: str  # formatted with ``value``
+
+
+DEFAULT_ALERT_RULES = (
+    AlertRule('geomagnetic_storm', 'kp_index', True, 4.0, 4.0, 'Geomagnetic storm conditions (Kp {value:.1f})'),
+    AlertRule('solar_wind_speed', 'solar_wind_speed', True, 600.0, 550.0,
+              'Solar wind speed elevated ({value:.0f} km/s)'),
+    AlertRule('southward_bz', 'bz', False, -10.0, -8.0, 'Strong southward IMF (Bz {value:.1f} nT)'),
+    AlertRule('radio_blackout', 'xray_flux', True, 1e-5, 1e-5, 'M-class or stronger X-ray flare ({value:.1e} W/m2)'),
+)
+
+
+class SpaceWeatherStore:
+    """In-process history of space-weather metrics with rolling aggregates and alerts
+
+    Each metric has a ring buffer sized for ``retention_hours`` at its own
+    sampling interval plus one rolling window per entry in ``WINDOWS``.
+    Alerts are evaluated as samples are ingested, with hysteresis, so
+    requests only read the current state.
+    """
+
+    def __init__(self, retention_hours: float = DEFAULT_RETENTION_HOURS,
+                 rules: Sequence[AlertRule] = DEFAULT_ALERT_RULES, max_alert_events: int = 200):
+        retention = retention_hours * HOUR
+        self.retention = retention
+        self.buffers = {name: RingBuffer(max(int(retention // interval), 1) + 1)
+                        for name, (_, interval) in METRICS.items()}
+        self.windows = {name: {label: RollingWindow(seconds) for label, seconds in WINDOWS} for name in METRICS}
+        self.rules = tuple(rules)
+        self.active_alerts: Dict[str, Dict[str, Any]] = {}
+        self.alert_events: deque = deque(maxlen=max_alert_events)
+        self.samples_ingested = 0
+        self._lock = threading.Lock()
+
+    def extend(self, metric: str, times: Iterable[float], values: Iterable[float]) -> int:
+        """Ingest samples of one metric in time order; returns how many were new"""
+        buffer, windows = self.buffers[metric], self.windows[metric].values()
+        rules = [rule for rule in self.rules if rule.metric == metric]
+        added = 0
+        with self._lock:
+            for t, value in zip(np.asarray(times, dtype=float).tolist(), np.asarray(values, dtype=float).tolist()):
+                if value != value or not buffer.append(t, value):
+                    continue  # gap (NaN) or already stored
+                added += 1
+                for window in windows:
+                    window.add(t, value)
+                for rule in rules:
+                    self._evaluate(rule, t, value)
+            self.samples_ingested += added
+        return added
+
+    def ingest(self, series: Series) -> int:
+        return sum(self.extend(metric, *series[metric]) for metric in series if metric in self.buffers)
+
+    def _evaluate(self, rule: AlertRule, t: float, value: float) -> None:
+        active = self.active_alerts.get(rule.name)
+        crossed = value > rule.threshold if rule.above else value < rule.threshold
+        cleared = value <= rule.clear if rule.above else value >= rule.clear
+        if active is None and crossed:
+            event = {'alert': rule.name, 'state': 'raised', 'time': t, 'value': value,
+                     'message': rule.message.format(value=value)}
+            self.active_alerts[rule.name] = event
+            self.alert_events.append(event)
+        elif active is not None:
+            if cleared:
+                del self.active_alerts[rule.name]
+                self.alert_events.append({'alert': rule.name, 'state': 'cleared', 'time': t, 'value': value,
+                                          'message': 'Cleared: ' + rule.message.format(value=value)})
+            elif (value > active['value']) == rule.above and value != active['value']:
+                # Track the peak so the message reports the worst value seen
+                self.active_alerts[rule.name] = {**active, 'value': value, 'message': rule.message.format(value=value)}
+
+    def latest(self) -> Dict[str, Tuple[float, float]]:
+        """Metric -> (time, value) of its newest sample"""
+        with self._lock:
+            return {name: (buffer.last_time, float(buffer._values[buffer._next - 1]))
+                    for name, buffer in self.buffers.items() if buffer.size}
+
+    def last_time(self) -> float:
+        with self._lock:
+            return max((buffer.last_time for buffer in self.buffers.values()), default=-math.inf)
+
+    def rolling(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            return {name: {label: window.stats() for label, window in windows.items()}
+                    for name, windows in self.windows.items()}
+
+    def alerts(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(active alerts, recent raise/clear events, newest first)"""
+        with self._lock:
+            return list(self.active_alerts.values()), list(reversed(self.alert_events))
+
+    def query(self, metric: str, start: float, end: float, points: int,
+              method: str = 'lttb') -> Tuple[np.ndarray, np.ndarray, int]:
+        """At most ``points`` samples of ``metric`` between ``start`` and ``end`` (Unix s)
+
+        Returns (times, values, samples in range before downsampling).
+        """
+        if method not in DOWNSAMPLING:
+            raise ValueError(f"Downsampling method must be one of: {', '.join(DOWNSAMPLING)}")
+        with self._lock:
+            times, values = self.buffers[metric].range(start, end)
+        with DOWNSAMPLE_STAGE.time():
+            keep = (lttb if method == 'lttb' else minmax_buckets)(times, values, points)
+        return times[keep], values[keep], len(times)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'samples_ingested': self.samples_ingested,
+            'stored': {name: buffer.size for name, buffer in self.buffers.items()},
+            'capacity': {name: buffer.capacity for name, buffer in self.buffers.items()},
+            'bytes': sum(buffer._times.nbytes + buffer._values.nbytes for buffer in self.buffers.values()),
+        }
+
+
+def xray_class(flux: float) -> str:
+    """GOES flare class letter for a 0.1-0.8 nm X-ray flux in W/m2"""
+    for letter, lower in (('X', 1e-4), ('M', 1e-5), ('C', 1e-6), ('B', 1e-7)):
+        if flux >= lower:
+            return letter
+    return 'A'
+
+
+def geomagnetic_activity(kp: float) -> str:
+    if kp >= 6:
+        return 'major storm'
+    if kp >= 5:
+        return 'minor storm'
+    if kp >= 4:
+        return 'active'
+    if kp >= 3:
+        return 'unsettled'
+    return 'quiet'
+
+
+def _smooth_noise(t: np.ndarray, period: float, seed: int) -> np.ndarray:
+    """Deterministic noise in [-1, 1] that varies smoothly over ``period`` seconds
+
+    Hashed random values at multiples of ``period`` are joined by cosine
+    interpolation, so the series depends only on absolute time: every
+    process generates the same history.
+    """
+    knot = np.floor(t / period)
+    frac = t / period - knot
+
+    def hashed(k):
+        return (np.sin(k * 12.9898 + seed * 78.233) * 43758.5453) % 1.0 * 2.0 - 1.0
+
+    weight = (1.0 - np.cos(np.pi * frac)) / 2.0
+    return hashed(knot) * (1.0 - weight) + hashed(knot + 1.0) * weight
+
+
+def synthetic_source(since: float, until: float) -> Series:
+    """Plausible solar wind, IMF, X-ray, Kp and F10.7 samples for ``(since, until]``
+
+    Stands in for the NOAA feeds when they are not configured. Kp follows a
+    simple solar wind coupling estimate, so storms coincide with fast wind
+    and southward Bz.
+    """
+    def grid(step):
+        first = math.floor(since / step) * step + step
+        return np.arange(first, until + step * 1e-9, step)
+
+    t = grid(CADENCE)
+    speed = np.clip(440 + 160 * _smooth_noise(t, 14 * HOUR, 1) + 40 * _smooth_noise(t, HOUR, 2), 260, 900)
+    density = np.clip(6 + 4 * _smooth_noise(t, 6 * HOUR, 3) + _smooth_noise(t, 20 * MINUTE, 4), 0.5, 40)
+    bt = np.clip(7 + 5 * _smooth_noise(t, 8 * HOUR, 5) + _smooth_noise(t, 30 * MINUTE, 6), 1, 40)
+    bz = bt * _smooth_noise(t, 3 * HOUR, 7)
+    flare = np.maximum(_smooth_noise(t, 2 * HOUR, 9) - 0.6, 0) / 0.4
+    xray = 10.0 ** (-6.4 + 0.5 * _smooth_noise(t, 6 * HOUR, 8) + 2.0 * flare)
+
+    kp_t = grid(3 * HOUR)
+    kp_speed = np.clip(440 + 160 * _smooth_noise(kp_t, 14 * HOUR, 1), 260, 900)
+    kp_bz = np.clip(7 + 5 * _smooth_noise(kp_t, 8 * HOUR, 5), 1, 40) * _smooth_noise(kp_t, 3 * HOUR, 7)
+    coupling = kp_speed * np.maximum(-kp_bz, 0) * 1e-3  # mV/m
+    kp = np.round(np.clip(1.0 + 0.8 * coupling + (kp_speed - 400) / 200, 0, 9) * 3) / 3
+
+    flux_t = grid(DAY)
+    solar_flux = 150 + 40 * _smooth_noise(flux_t, 27 * DAY, 10) + 10 * _smooth_noise(flux_t, 3 * DAY, 11)
+
+    return {
+        'solar_wind_speed': (t, np.round(speed, 1)),
+        'proton_density': (t, np.round(density, 2)),
+        'magnetic_field_strength': (t, np.round(bt, 2)),
+        'bz': (t, np.round(bz, 2)),
+        'xray_flux': (t, xray),
+        'kp_index': (kp_t, kp),
+        'solar_flux': (flux_t, np.round(solar_flux, 1)),
+    }
+
+
+def _time_tag(raw: str) -> float:
+    value = datetime.datetime.fromisoformat(raw.replace(' ', 'T').rstrip('Z'))
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _table_columns(table, columns: Dict[str, str]) -> Series:
+    """Metric series from a SWPC product: a header row plus rows, or a list of objects"""
+    if not table:
+        return {}
+    if isinstance(table[0], list):
+        header, rows = table[0], table[1:]
+        table = [dict(zip(header, row)) for row in rows]
+    times = np.array([_time_tag(row['time_tag']) for row in table])
+    order = np.argsort(times, kind='stable')
+    series = {}
+    for field, metric in columns.items():
+        values = np.array([float(row[field]) if row.get(field) not in (None, '') else np.nan for row in table])
+        series[metric] = (times[order], values[order])
+    return series
+
+
+def swpc_source(client) -> Source:
+    """A source reading the NOAA SWPC products through a ``NasaDataClient``
+
+    Each product covers the last day and is cached by the client, so
+    polling more often than the products update costs nothing upstream;
+    samples already stored are skipped on ingest.
+    """
+    def fetch(since: float, until: float) -> Series:
+        series: Series = {}
+        series.update(_table_columns(client.solar_wind('plasma'),
+                                     {'speed': 'solar_wind_speed', 'density': 'proton_density'}))
+        series.update(_table_columns(client.solar_wind('mag'), {'bt': 'magnetic_field_strength', 'bz_gsm': 'bz'}))
+        series.update(_table_columns(client.planetary_k_index(), {'Kp': 'kp_index'}))
+        xrays = [row for row in client.xray_flux() if row.get('energy') == '0.1-0.8nm']
+        series.update(_table_columns(xrays, {'flux': 'xray_flux'}))
+        flux = client.solar_flux()
+        series['solar_flux'] = (np.array([_time_tag(flux['TimeStamp'])]), np.array([float(flux['Flux'])]))
+        return series
+
+    return fetch
+
+
+class SpaceWeatherFeed:
+    """Polls a source every ``interval`` seconds into a store from a background thread
+
+    ``backfill`` loads the retention period up front. The thread is started
+    lazily, so a feed created before a fork (gunicorn preload) polls in
+    every worker.
+    """
+
+    def __init__(self, store: SpaceWeatherStore, source: Source, interval: float = DEFAULT_INTERVAL):
+        self.store = store
+        self.source = source
+        self.interval = interval
+        self.polls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def backfill(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return self.poll(now - self.store.retention, now)
+
+    def poll(self, since: Optional[float] = None, until: Optional[float] = None) -> int:
+        until = time.time() if until is None else until
+        since = self.store.last_time() if since is None else since
+        try:
+            added = self.store.ingest(self.source(max(since, until - self.store.retention), until))
+        except Exception as exc:
+            self.errors += 1
+            self.last_error = str(exc)
+            return 0
+        self.polls += 1
+        return added
+
+    def ensure_running(self) -> None:
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='space-weather-feed', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.poll()
+            time.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'interval': self.interval, 'polls': self.polls, 'errors': self.errors,
+                'last_error': self.last_error, **self.store.stats()}
@@ -0,0 +1,171 @@
+import itertools
+from typing import Tuple
+
+import numpy as np
+
+# Neighbour cell offsets: all 27, and the 13 "forward" ones that visit each
+# unordered pair of distinct cells exactly once
+_OFFSETS = np.array(list(itertools.product((-1, 0, 1), repeat=3)), dtype=np.int64)
+_FORWARD_OFFSETS = _OFFSETS[14:]
+
+
+def _expand(owners: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pair every owner with each position in its [start, stop) run, without a Python loop"""
+    counts = stops - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    shift = starts - (np.cumsum(counts) - counts)
+    return np.repeat(owners, counts), np.arange(total, dtype=np.int64) + np.repeat(shift, counts)
+
+
+class SpatialGrid:
+    """Uniform grid over 3-D points, built once per set of positions
+
+    Points are bucketed into cubes of side ``cell_size`` and kept sorted by
+    cell key, so every occupied cell is a contiguous run located by binary
+    search. A radius query up to ``cell_size`` only inspects the 27 cells
+    around a point, which keeps all-vs-all screening close to O(n) for sparse
+    populations instead of O(n^2). Nothing is updated in place: when the
+    points move, build a new grid.
+    """
+
+    def __init__(self, points: np.ndarray, cell_size: float):
+        if not cell_size > 0:
+            raise ValueError('cell_size must be positive')
+        self.points = np.asarray(points, dtype=np.float64)
+        self.cell_size = float(cell_size)
+        n = len(self.points)
+
+        cells = np.floor(self.points / self.cell_size).astype(np.int64).reshape(-1, 3)
+        # Keep one empty layer on every side so neighbour keys never wrap around
+        self._origin = cells.min(axis=0) - 1 if n else np.zeros(3, dtype=np.int64)
+        cells -= self._origin
+        self._dims = cells.max(axis=0) + 2 if n else np.ones(3, dtype=np.int64)
+        self._strides = np.array([self._dims[1] * self._dims[2], self._dims[2], 1], dtype=np.int64)
+
+        keys = cells @ self._strides
+        self.order = np.argsort(keys, kind='stable')
+        self.cell_keys, self.cell_start, counts = np.unique(keys[self.order], return_index=True,
+                                                            return_counts=True)
+        self.cell_stop = self.cell_start + counts
+        self._point_cell = np.repeat(np.arange(len(self.cell_keys)), counts)  # by sorted position
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _lookup(self, cells: np.ndarray) -> np.ndarray:
+        """Index into ``cell_keys`` for grid coordinates, or -1 where the cell is empty or off-grid"""
+        if not len(self.cell_keys):
+            return np.full(cells.shape[:-1], -1, dtype=np.int64)
+        inside = np.all((cells >= 0) & (cells < self._dims), axis=-1)
+        keys = np.where(inside, cells @ self._strides, -1)
+        found = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        return np.where(inside & (self.cell_keys[found] == keys), found, -1)
+
+    def _cell_coords(self) -> np.ndarray:
+        keys = self.cell_keys
+        return np.stack([keys // self._strides[0], keys // self._strides[1] % self._dims[1],
+                         keys % self._dims[2]], axis=-1)
+
+    def _check_radius(self, radius: float) -> None:
+        if radius > self.cell_size:
+            raise ValueError(f'radius {radius} exceeds the grid cell size {self.cell_size}')
+
+    def candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Every pair of points in the same or adjacent cells, each unordered pair once"""
+        if not len(self):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        sorted_positions = np.arange(len(self), dtype=np.int64)
+        own_cell = self._point_cell
+
+        # Same cell: each point with the points after it in the run
+        first, second = [], []
+        a, b = _expand(sorted_positions, sorted_positions + 1, self.cell_stop[own_cell])
+        first.append(a)
+        second.append(b)
+
+        cell_coords = self._cell_coords()
+        for offset in _FORWARD_OFFSETS:
+            neighbour = self._lookup(cell_coords + offset)
+            occupied = np.flatnonzero(neighbour >= 0)
+            if not len(occupied):
+                continue
+            # Points of each cell that has this neighbour, against all of the neighbour's points
+            cell_of_point = neighbour[own_cell]
+            points = sorted_positions[cell_of_point >= 0]
+            target = cell_of_point[points]
+            a, b = _expand(points, self.cell_start[target], self.cell_stop[target])
+            first.append(a)
+            second.append(b)
+
+        return self.order[np.concatenate(first)], self.order[np.concatenate(second)]
+
+    def pairs_within(self, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """All-vs-all: index pairs (i < j) of points no more than ``radius`` apart"""
+        self._check_radius(radius)
+        i, j = self.candidate_pairs()
+        close = np.sum((self.points[i] - self.points[j]) ** 2, axis=1) <= radius * radius
+        i, j = i[close], j[close]
+        return np.minimum(i, j), np.maximum(i, j)
+
+    def neighbors(self, queries: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(query index, point index) pairs with the point within ``radius`` of the query"""
+        self._check_radius(radius)
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+        query_cells = np.floor(queries / self.cell_size).astype(np.int64) - self._origin
+        owners = np.arange(len(queries), dtype=np.int64)
+        first, second = [], []
+        for offset in _OFFSETS:
+            cell = self._lookup(query_cells + offset)
+            hit = cell >= 0
+            a, b = _expand(owners[hit], self.cell_start[cell[hit]], self.cell_stop[cell[hit]])
+            first.append(a)
+            second.append(b)
+        q = np.concatenate(first)
+        p = self.order[np.concatenate(second)]
+        close = np.sum((queries[q] - self.points[p]) ** 2, axis=1) <= radius * radius
+        return q[close], p[close]
+
+    def query_box(self, lower, upper) -> np.ndarray:
+        """Sorted indices of points inside the axis-aligned box [lower, upper]"""
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        low_cell = np.floor(lower / self.cell_size).astype(np.int64) - self._origin
+        high_cell = np.floor(upper / self.cell_size).astype(np.int64) - self._origin
+        coords = self._cell_coords()
+        cells = np.flatnonzero(np.all((coords >= low_cell) & (coords <= high_cell), axis=1))
+        _, sorted_positions = _expand(cells, self.cell_start[cells], self.cell_stop[cells])
+        candidates = self.order[sorted_positions]
+        inside = np.all((self.points[candidates] >= lower) & (self.points[candidates] <= upper), axis=1)
+        return np.sort(candidates[inside])
+
+
+def brute_force_pairs(points: np.ndarray, radius: float, block: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """Reference O(n^2) all-vs-all search, blockwise to bound memory; same output as ``pairs_within``"""
+    points = np.asarray(points, dtype=np.float64)
+    squared = np.sum(points ** 2, axis=1)
+    # Slack for rounding in the expansion below; borderline pairs are settled exactly at the end
+    limit = radius * radius + 1e-12 * (squared.max() if len(points) else 0.0)
+    first, second = [], []
+    for start in range(0, len(points), block):
+        rows = points[start:start + block]
+        # |a-b|^2 = |a|^2 + |b|^2 - 2ab, only for columns after the row to skip duplicate pairs
+        cols = slice(start + 1, None)
+        d2 = squared[start:start + block, None] + squared[None, cols] - 2.0 * rows @ points[cols].T
+        i, j = np.nonzero(d2 <= limit)
+        j = j + start + 1
+        i = i + start
+        keep = j > i
+        first.append(i[keep])
+        second.append(j[keep])
+    if not first:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    i, j = np.concatenate(first), np.concatenate(second)
+    close = np.sum((points[i] - points[j]) ** 2, axis=1) <= radius * radius
+    return i[close], j[close]
@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+# channel -> object id -> record (flat dict of JSON-serializable fields)
+Frame = Dict[str, Dict[str, Dict[str, Any]]]
+Source = Callable[[float], Dict[str, Dict[str, Any]]]
+
+DEFAULT_INTERVAL = float(os.environ.get('TELEMETRY_INTERVAL', 1.0))
+DEFAULT_SUBSCRIBER_QUEUE = int(os.environ.get('TELEMETRY_SUBSCRIBER_QUEUE', 16))
+# Each stream holds a request thread for as long as it is open (8 per gthread worker by default)
+DEFAULT_MAX_SUBSCRIBERS = int(os.environ.get('TELEMETRY_MAX_SUBSCRIBERS', 4))
+
+
+def _encode(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(',', ':'))
+
+
+class HubFull(RuntimeError):
+    """Raised when the hub already has its maximum number of subscribers"""
+
+
+class Subscription:
+    """One consumer's bounded message queue, filled by the hub's producer thread
+
+    Messages are ``(kind, seq, json)`` tuples with kind ``snapshot`` or
+    ``delta``. When the queue is full the backlog is discarded and the next
+    message is a fresh snapshot, so a slow consumer skips ahead instead of
+    holding up the producer or growing without bound.
+    """
+
+    def __init__(self, hub: 'TelemetryHub', channels: FrozenSet[str], objects: FrozenSet[Tuple[str, str]],
+                 max_queue: int):
+        self.hub = hub
+        self.channels = channels
+        self.objects = objects
+        self.key = (channels, objects)
+        self.max_queue = max_queue
+        self.needs_snapshot = True
+        self.delivered = 0
+        self.overflows = 0
+        self.closed = False
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+
+    def _offer(self, kind: str, seq: int, payload: str) -> None:
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._queue.clear()
+                self.overflows += 1
+                self.needs_snapshot = True
+                return
+            self._queue.append((kind, seq, payload))
+            self.delivered += 1
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, int, str]]:
+        """Next message, or None on timeout or once the subscription is closed"""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+
+class TelemetryHub:
+    """Computes each telemetry tick once and fans it out to every subscriber
+
+    Sources are callables registered per channel that return the current
+    ``{object_id: record}`` for that channel. A single background thread
+    calls those with subscribers every ``interval`` seconds, diffs
+    the result against the previous frame field by field, and hands every
+    subscriber the part of the delta it asked for. Encoded payloads are shared
+    between subscribers with the same selection, so a tick costs one JSON
+    encode per distinct subscription rather than per connection.
+
+    Every open stream occupies one of the server's request threads, so the
+    hub accepts at most ``max_subscribers`` at a time (0 for no limit) and
+    raises HubFull beyond that, leaving the other threads for API requests.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, max_queue: int = DEFAULT_SUBSCRIBER_QUEUE,
+                 max_subscribers: int = DEFAULT_MAX_SUBSCRIBERS):
+        self.interval = interval
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.sources: Dict[str, Source] = {}
+        self._subscribers = set()
+        self._frame: Frame = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+        self.seq = 0
+        self.source_errors = 0
+        self.rejected = 0
+        self.last_tick_ms = 0.0
+        self.last_fanout_ms = 0.0
+        self.last_payload_bytes = 0
+
+    def add_source(self, channel: str, source: Source) -> None:
+        self.sources[channel] = source
+
+    def subscribe(self, channels: Optional[Iterable[str]] = None,
+                  objects: Optional[Iterable[Tuple[str, str]]] = None,
+                  replace: Optional[Subscription] = None) -> Subscription:
+        """Subscribe to whole channels and/or individual (channel, object id) pairs
+
+        With neither given, every channel is included. ``replace`` is a
+        subscription the new one takes the place of, which frees its slot.
+        """
+        channels = frozenset(channels or ())
+        objects = frozenset(objects or ())
+        if not channels and not objects:
+            channels = frozenset(self.sources)
+        unknown = (channels | {channel for channel, _ in objects}) - set(self.sources)
+        if unknown:
+            raise ValueError(f"Unknown telemetry channel(s): {', '.join(sorted(unknown))}")
+        subscription = Subscription(self, channels, objects, self.max_queue)
+        with self._wake:
+            if replace is not None:
+                self._subscribers.discard(replace)
+            elif self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                raise HubFull(f'Telemetry stream limit reached ({self.max_subscribers} per worker)')
+            self._ensure_worker()
+            self._subscribers.add(subscription)
+            self._wake.notify()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='telemetry-hub', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        next_tick = 0.0
+        while True:
+            with self._wake:
+                # Idle without subscribers; a new subscriber gets a tick straight away
+                while not self._subscribers:
+                    self._wake.wait()
+                    next_tick = 0.0
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    continue
+            next_tick = time.monotonic() + self.interval
+            self.tick()
+
+    def _collect(self, now: float, channels: Iterable[str]) -> Frame:
+        frame = {}
+        for channel in channels:
+            source = self.sources[channel]
+            try:
+                frame[channel] = source(now)
+            except Exception:
+                # Keep serving the last good data for this channel
+                self.source_errors += 1
+                frame[channel] = self._frame.get(channel, {})
+        return frame
+
+    @staticmethod
+    def _diff(old: Frame, new: Frame) -> Tuple[Frame, Dict[str, list]]:
+        changed: Frame = {}
+        removed: Dict[str, list] = {}
+        for channel, records in new.items():
+            previous = old.get(channel, {})
+            channel_changes = {}
+            for object_id, record in records.items():
+                before = previous.get(object_id)
+                if before is None:
+                    channel_changes[object_id] = record
+                elif before != record:
+                    channel_changes[object_id] = {k: v for k, v in record.items() if before.get(k) != v}
+            changed[channel] = channel_changes
+            gone = [object_id for object_id in previous if object_id not in records]
+            if gone:
+                removed[channel] = gone
+        return changed, removed
+
+    @staticmethod
+    def _select(frame: Frame, subscription: Subscription) -> Frame:
+        selected = {channel: frame[channel] for channel in subscription.channels if frame.get(channel)}
+        for channel, object_id in subscription.objects:
+            if channel in subscription.channels:
+                continue
+            record = frame.get(channel, {}).get(object_id)
+            if record is not None:
+                selected.setdefault(channel, {})[object_id] = record
+        return selected
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """Compute one frame and deliver it; called by the worker thread"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        with self._lock:
+            # Channels nobody watches are not computed at all
+            wanted = set()
+            for subscription in self._subscribers:
+                wanted.update(subscription.channels)
+                wanted.update(channel for channel, _ in subscription.objects)
+        frame = self._collect(now, sorted(wanted))
+        computed = time.perf_counter()
+
+        with self._lock:
+            changed, removed = self._diff(self._frame, frame)
+            self._frame = frame
+            self.seq += 1
+            seq = self.seq
+            subscribers = list(self._subscribers)
+
+        payloads: Dict[Tuple[str, tuple], Optional[str]] = {}
+        sent_bytes = 0
+        for subscription in subscribers:
+            kind = 'snapshot' if subscription.needs_snapshot else 'delta'
+            cache_key = (kind, subscription.key)
+            if cache_key not in payloads:
+                selected = self._select(frame if kind == 'snapshot' else changed, subscription)
+                gone = {
+                    channel: [object_id for object_id in ids
+                              if channel in subscription.channels or (channel, object_id) in subscription.objects]
+                    for channel, ids in removed.items()
+                } if kind == 'delta' else {}
+                gone = {channel: ids for channel, ids in gone.items() if ids}
+                if kind == 'delta' and not selected and not gone:
+                    payloads[cache_key] = None  # nothing this subscriber watches changed
+                else:
+                    message = {'type': kind, 'seq': seq, 'time': round(now, 3), 'objects': selected}
+                    if gone:
+                        message['removed'] = gone
+                    payloads[cache_key] = _encode(message)
+            payload = payloads[cache_key]
+            if payload is None:
+                continue
+            if kind == 'snapshot':
+                subscription.needs_snapshot = False
+            subscription._offer(kind, seq, payload)
+            sent_bytes += len(payload)
+
+        self.last_tick_ms = (computed - started) * 1000.0
+        self.last_fanout_ms = (time.perf_counter() - computed) * 1000.0
+        self.last_payload_bytes = sent_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            'channels': sorted(self.sources),
+            'interval': self.interval,
+            'subscribers': len(subscribers),
+            'max_subscribers': self.max_subscribers,
+            'rejected': self.rejected,
+            'distinct_subscriptions': len({s.key for s in subscribers}),
+            'seq': self.seq,
+            'last_tick_ms': round(self.last_tick_ms, 3),
+            'last_fanout_ms': round(self.last_fanout_ms, 3),
+            'last_payload_bytes': self.last_payload_bytes,
+            'queued_messages': sum(len(s._queue) for s in subscribers),
+            'overflows': sum(s.overflows for s in subscribers),
+            'source_errors': self.source_errors,
+        }
@@ -0,0 +1,171 @@
+import math
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import registry
+
+G0 = 9.80665  # m/s^2, standard gravity
+EARTH_RADIUS_M = 6_371_000.0
+SEA_LEVEL_DENSITY = 1.225  # kg/m^3
+SCALE_HEIGHT_M = 8_500.0
+# Bump whenever results change, so cached results (services.result_cache) are recomputed
+ENGINE_VERSION = 1
+
+INTEGRATE_STAGE = registry.stage('trajectory', 'integrate')
+
+
+@dataclass(frozen=True)
+class Vehicle:
+    """Single-stage launch vehicle; defaults are roughly a Falcon 9 first stage burn"""
+    dry_mass: float = 140_000.0  # kg, stage structure plus everything it carries
+    propellant_mass: float = 395_700.0  # kg
+    thrust: float = 7_607_000.0  # N
+    isp: float = 282.0  # s
+    drag_coefficient: float = 0.3
+    reference_area: float = 10.5  # m^2
+
+    def validate(self) -> None:
+        for name, value in asdict(self).items():
+            if not math.isfinite(value) or value < 0:
+                raise ValueError(f'{name} must be a non-negative number')
+        if self.dry_mass <= 0:
+            raise ValueError('dry_mass must be positive')
+        if self.thrust > 0 and self.isp <= 0:
+            raise ValueError('isp must be positive when thrust is non-zero')
+
+    @property
+    def mass_flow(self) -> float:
+        """Propellant consumption at full thrust, kg/s"""
+        return self.thrust / (self.isp * G0) if self.thrust else 0.0
+
+
+class TrajectoryResult:
+    """Time series of a simulated ascent, one NumPy array per quantity"""
+
+    def __init__(self, time: np.ndarray, altitude: np.ndarray, velocity: np.ndarray,
+                 mass: np.ndarray, vehicle: Vehicle, dt: float):
+        self.time = time
+        self.altitude = altitude
+        self.velocity = velocity
+        self.mass = mass
+        self.vehicle = vehicle
+        self.dt = dt
+
+    @property
+    def fuel_remaining(self) -> np.ndarray:
+        """Propellant left as a percentage of the initial load"""
+        if not self.vehicle.propellant_mass:
+            return np.zeros_like(self.mass)
+        return (self.mass - self.vehicle.dry_mass) / self.vehicle.propellant_mass * 100.0
+
+    @property
+    def burnout_time(self) -> Optional[float]:
+        burnt = np.nonzero(self.mass <= self.vehicle.dry_mass)[0]
+        return float(self.time[burnt[0]]) if len(burnt) else None
+
+    def sample_indices(self, points: int) -> np.ndarray:
+        """Evenly spaced indices (first and last included) for downsampled output"""
+        points = max(2, min(points, len(self.time)))
+        return np.unique(np.linspace(0, len(self.time) - 1, points).round().astype(np.int64))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'steps': len(self.time) - 1,
+            'dt': self.dt,
+            'max_altitude': float(self.altitude.max()),
+            'max_velocity': float(self.velocity.max()),
+            'burnout_time': self.burnout_time,
+        }
+
+
+def ascent_steps(vehicle: Vehicle, dt: float, duration: float) -> Tuple[int, float]:
+    """Validated step count and the step size actually used, which divides ``duration`` evenly"""
+    vehicle.validate()
+    if not (dt > 0 and duration > 0):
+        raise ValueError('dt and duration must be positive')
+    steps = max(1, int(round(duration / dt)))
+    return steps, duration / steps
+
+
+def ascent_blocks(vehicle: Vehicle = Vehicle(), dt: float = 0.1, duration: float = 300.0,
+                  block_size: int = 8192) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """Integrate a vertical ascent with classic RK4, yielding it in blocks as it goes
+
+    Yields ``(time, altitude, velocity, mass)`` arrays of at most
+    ``block_size`` consecutive steps, starting with the initial state, so a
+    run of any length needs only one block of memory. State is altitude,
+    vertical velocity and mass. Forces are thrust (until the propellant is
+    gone), drag from an exponential atmosphere and inverse-square gravity.
+    The loop runs on Python floats and writes each step into the block
+    arrays; nothing is allocated per step.
+    """
+    steps, dt = ascent_steps(vehicle, dt, duration)
+
+    dry_mass = vehicle.dry_mass
+    thrust = vehicle.thrust
+    mass_flow = vehicle.mass_flow
+    drag_factor = 0.5 * vehicle.drag_coefficient * vehicle.reference_area
+    gm = G0 * EARTH_RADIUS_M * EARTH_RADIUS_M
+    exp = math.exp
+
+    def acceleration(h, v, m):
+        if m > dry_mass:
+            force = thrust
+        else:
+            force = 0.0
+        drag = drag_factor * SEA_LEVEL_DENSITY * exp(-h / SCALE_HEIGHT_M) * v * abs(v)
+        r = EARTH_RADIUS_M + h
+        return (force - drag) / m - gm / (r * r)
+
+    h, v, m = 0.0, 0.0, dry_mass + vehicle.propellant_mass
+    half = 0.5 * dt
+    for start in range(0, steps + 1, block_size):
+        size = min(block_size, steps + 1 - start)
+        altitude = np.empty(size)
+        velocity = np.empty(size)
+        mass = np.empty(size)
+        first = 0
+        if start == 0:
+            altitude[0], velocity[0], mass[0] = h, v, m
+            first = 1
+        # Timed per block so the consumer's time between blocks is not counted
+        with INTEGRATE_STAGE.time():
+            for j in range(first, size):
+                mdot = mass_flow if m > dry_mass else 0.0
+                a1 = acceleration(h, v, m)
+                v2 = v + half * a1
+                m2 = m - half * mdot
+                a2 = acceleration(h + half * v, v2, m2)
+                v3 = v + half * a2
+                a3 = acceleration(h + half * v2, v3, m2)
+                v4 = v + dt * a3
+                a4 = acceleration(h + dt * v3, v4, m - dt * mdot)
+
+                h += dt / 6.0 * (v + 2.0 * v2 + 2.0 * v3 + v4)
+                v += dt / 6.0 * (a1 + 2.0 * a2 + 2.0 * a3 + a4)
+                m = max(m - dt * mdot, dry_mass)
+                if h < 0.0:
+                    # Resting on the pad until thrust exceeds weight, or after impact
+                    h, v = 0.0, max(v, 0.0)
+
+                altitude[j] = h
+                velocity[j] = v
+                mass[j] = m
+        yield np.arange(start, start + size, dtype=np.float64) * dt, altitude, velocity, mass
+
+
+def simulate_ascent(vehicle: Vehicle = Vehicle(), dt: float = 0.1, duration: float = 300.0) -> TrajectoryResult:
+    """Whole ascent from ``ascent_blocks`` collected into preallocated arrays"""
+    steps, step_dt = ascent_steps(vehicle, dt, duration)
+    time = np.empty(steps + 1)
+    altitude = np.empty(steps + 1)
+    velocity = np.empty(steps + 1)
+    mass = np.empty(steps + 1)
+    start = 0
+    for block in ascent_blocks(vehicle, dt, duration):
+        stop = start + len(block[0])
+        time[start:stop], altitude[start:stop], velocity[start:stop], mass[start:stop] = block
+        start = stop
+    return TrajectoryResult(time, altitude, velocity, mass, vehicle, step_dt)
@@ -0,0 +1,96 @@
+"""Shared fixtures: a local HTTP stub standing in for upstream APIs, and a manual clock"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET with ``{"path", "served_at"}`` after ``latency`` seconds; ``/fail`` answers 503"""
+
+    protocol_version = 'HTTP/1.1'
+    requests_served = 0
+    latency = 0.0
+
+    def do_GET(self):
+        StubHandler.requests_served += 1
+        time.sleep(self.latency)
+        if self.path.startswith('/fail'):
+            body, status = b'{"error": "unavailable"}', 503
+        else:
+            body, status = json.dumps({'path': self.path, 'served_at': time.time()}).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Stub:
+    def __init__(self, url: str):
+        self.url = url
+
+    @property
+    def requests_served(self) -> int:
+        return StubHandler.requests_served
+
+    @staticmethod
+    def reset(latency: float = 0.0) -> None:
+        StubHandler.requests_served = 0
+        StubHandler.latency = latency
+
+
+class ManualClock:
+    """Monotonic clock that only moves when told to; ``sleep`` advances it instead of waiting"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    sleep = advance
+
+
+@pytest.fixture(scope='session')
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield Stub(f'http://127.0.0.1:{server.server_port}')
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub(stub_server):
+    stub_server.reset()
+    return stub_server
+
+
+@pytest.fixture
+def clock():
+    return ManualClock()
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    """Poll ``predicate`` until it holds or ``timeout`` real seconds pass (for background threads)"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture(name='wait_until')
+def wait_until_fixture():
+    return wait_until
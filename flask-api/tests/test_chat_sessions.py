@@ -0,0 +1,40 @@
+"""Follow-up resolution from a user's chat session"""
+import pytest
+
+from services.ml_model import SpaceKnowledgeBot
+from services.sessions import MemorySessionStore
+
+
+@pytest.fixture(params=SpaceKnowledgeBot.ENGINES)
+def bot(request):
+    return SpaceKnowledgeBot(engine=request.param, seed=0, sessions=MemorySessionStore())
+
+
+def test_off_topic_message_still_gets_the_fallback(bot):
+    assert bot.get_response('tell me about mars exploration', 'user')['topic'] is not None
+    for message in ('what is the capital of france?', 'recipe for pancakes please'):
+        response = bot.get_response(message, 'user')
+        assert response['topic'] is None
+        assert response['confidence'] < bot.confidence_threshold
+
+
+def test_follow_up_resolves_with_bounded_confidence(bot):
+    alone = SpaceKnowledgeBot(engine=bot.engine, seed=0).get_response('what about its moons?')
+    if bot.engine == 'keyword':
+        assert alone['topic'] is None
+
+    bot.get_response('tell me about mars exploration', 'user')
+    response = bot.get_response('what about its moons?', 'user')
+    assert response['topic'] is not None
+    # The message's own score plus at most one boost; the context keywords add nothing
+    assert response['confidence'] <= alone['confidence'] + bot.CONTEXT_BOOSTS[bot.engine] + 0.01
+    assert response['confidence'] < 1.0
+
+
+def test_context_does_not_override_the_topic_a_message_names(bot):
+    alone = SpaceKnowledgeBot(engine=bot.engine, seed=0).get_response('How does a rocket work?')
+    bot.get_response('tell me about mars exploration', 'user')
+    response = bot.get_response('How does a rocket work?', 'user')
+    assert response['topic'] == alone['topic']
+    assert response['confidence'] == alone['confidence']
+    assert response['topic'] is None or response['confidence'] >= bot.confidence_threshold
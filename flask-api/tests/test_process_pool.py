@@ -0,0 +1,31 @@
+"""ProcessPool recovery after a worker dies"""
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils.process_pool import ProcessPool
+
+
+@pytest.fixture
+def pool():
+    pool = ProcessPool()
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_is_replaced_after_a_worker_dies(pool):
+    assert pool.run(abs, 1, [(-1,), (-2,)]) == [1, 2]
+    with pytest.raises(BrokenProcessPool):
+        pool.run(os._exit, 1, [(1,)])
+    assert pool.restarts == 1
+    assert pool.run(abs, 1, [(-3,)]) == [3]
+
+
+def test_pool_follows_the_requested_worker_count(pool):
+    pool.run(abs, 1, [(0,)])
+    first = pool._executor
+    pool.run(abs, 2, [(0,)])
+    assert pool._executor is not first
+    assert pool._executor._max_workers == 2
+    assert pool.restarts == 0
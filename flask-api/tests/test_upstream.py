@@ -0,0 +1,143 @@
+"""UpstreamClient against the local stub server, on a manual clock"""
+import threading
+
+import pytest
+
+from services.nasa_api import CircuitBreaker, CircuitOpen, RateLimited, UpstreamClient, UpstreamError
+
+
+def burst(client, callers, path='/iss-now.json'):
+    """``callers`` threads released at once on the same resource; their results and the number that failed"""
+    barrier = threading.Barrier(callers)
+    results, failures = [], []
+    lock = threading.Lock()
+
+    def call():
+        barrier.wait()
+        try:
+            value = client.get_json(path)
+        except UpstreamError as exc:
+            with lock:
+                failures.append(exc)
+        else:
+            with lock:
+                results.append(value)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, len(failures)
+
+
+def test_simultaneous_misses_share_one_fetch(stub, clock):
+    stub.reset(latency=0.05)
+    client = UpstreamClient(stub.url, ttl=60.0, clock=clock, sleep=clock.sleep)
+    _, failures = burst(client, 500)
+    assert failures == 0
+    assert stub.requests_served == 1
+    assert client.misses == 1
+    # The rest waited on that fetch, or arrived after it landed and hit the cache
+    assert client.coalesced + client.hits == 499
+    hits = client.hits
+    client.get_json('/iss-now.json')
+    assert stub.requests_served == 1
+    assert client.hits == hits + 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(stub, clock, wait_until):
+    client = UpstreamClient(stub.url, ttl=1.0, stale_ttl=60.0, clock=clock, sleep=clock.sleep)
+    first = client.get_json('/iss-now.json')
+    clock.advance(2.0)
+    stub.reset(latency=0.5)
+
+    results, failures = burst(client, 50)
+    # Every caller got the stale copy; none waited for the 500 ms upstream
+    assert failures == 0
+    assert results == [first] * 50
+    assert client.stale_hits == 50
+    assert client.misses == 1  # only the first fetch
+
+    assert wait_until(lambda: client.get_json('/iss-now.json') != first)
+    assert client.get_json('/iss-now.json')['served_at'] > first['served_at']
+    assert stub.requests_served == 1  # a single background refresh
+
+
+def test_failed_refresh_keeps_serving_the_old_value(stub, clock, wait_until):
+    client = UpstreamClient(stub.url, ttl=1.0, stale_ttl=60.0, clock=clock, sleep=clock.sleep)
+    client.get_json('/item/1')
+    client.base_url = stub.url + '/fail'
+    clock.advance(2.0)
+    assert client.get_json('/item/1')['path'] == '/item/1'
+    assert wait_until(lambda: client.upstream_errors == 1)
+    assert client.get_json('/item/1')['path'] == '/item/1'
+    # That read started another refresh; let it fail here rather than reach the stub in the next test
+    assert wait_until(lambda: client.upstream_errors == 2)
+
+
+def test_breaker_opens_then_half_opens_for_one_trial(stub, clock):
+    client = UpstreamClient(stub.url, ttl=0.0, stale_ttl=0.0, failure_threshold=3, reset_timeout=30.0,
+                            rate=1e6, burst=1000, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.get_json('/fail')
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert stub.requests_served == 3
+
+    # Open: refused without reaching the upstream, until reset_timeout has passed
+    clock.advance(29.0)
+    with pytest.raises(CircuitOpen):
+        client.get_json('/fail')
+    assert stub.requests_served == 3
+
+    # After reset_timeout one trial goes through; its failure opens the circuit again
+    clock.advance(1.0)
+    with pytest.raises(UpstreamError) as failure:
+        client.get_json('/fail')
+    assert not isinstance(failure.value, CircuitOpen)
+    assert stub.requests_served == 4
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert client.breaker.opened == 2
+
+    # Half-open admits a single caller; a successful trial closes the circuit
+    clock.advance(30.0)
+    assert client.breaker.allow()
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert not client.breaker.allow()
+    client.breaker.record_success()
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.get_json('/ok')['path'] == '/ok'
+    assert client.breaker.failures == 0
+
+
+def test_rate_limit_rejects_beyond_the_burst(stub, clock):
+    client = UpstreamClient(stub.url, ttl=60.0, rate=10.0, burst=5, rate_wait=0.0, clock=clock, sleep=clock.sleep)
+    for i in range(5):
+        client.get_json(f'/item/{i}')
+    with pytest.raises(RateLimited):
+        client.get_json('/item/5')
+    assert stub.requests_served == 5
+    assert client.rejected == 1
+    # Cached resources are not rate limited
+    assert client.get_json('/item/0')['path'] == '/item/0'
+
+    clock.advance(0.1)  # one token back at 10/s
+    client.get_json('/item/5')
+    assert stub.requests_served == 6
+
+
+def test_rate_limit_waits_up_to_rate_wait(stub, clock):
+    client = UpstreamClient(stub.url, ttl=60.0, rate=20.0, burst=1, rate_wait=1.0, clock=clock, sleep=clock.sleep)
+    start = clock()
+    for i in range(4):
+        client.get_json(f'/item/{i}')
+    # Three of the four waited 50 ms each for a token
+    assert clock() - start == pytest.approx(0.15)
+    assert client.rejected == 0
+    assert stub.requests_served == 4
+
+    # A wait longer than rate_wait is refused instead
+    client.rate_wait = 0.01
+    with pytest.raises(RateLimited):
+        client.get_json('/item/4')
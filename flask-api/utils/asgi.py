@@ -0,0 +1,200 @@
+# WSGI to ASGI adapter
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+
+class ClientDisconnected(OSError):
+    """Raised in the app's thread when it writes to a connection the client has closed"""
+
+
+class WsgiToAsgi:
+    """Serve a WSGI app from an ASGI server, one request per pool thread
+
+    The event loop owns the sockets: it reads request bodies, waits on slow
+    clients and keep-alive connections without tying up a thread, and only
+    hands complete requests to the pool. A view blocked on upstream I/O
+    holds one pool thread, never the loop or the worker process. Response
+    chunks are sent as the app yields them, so streaming responses (SSE,
+    NDJSON) work; when the client goes away the next write raises
+    ``ClientDisconnected`` and the response iterable is closed.
+
+    Unlike ``asgiref.wsgi.WsgiToAsgi``, which runs every request through one
+    thread-sensitive executor, requests here run concurrently up to
+    ``threads``. The pool is created on first use in each process, so it
+    is safe to build the adapter before a preloading server forks.
+    """
+
+    def __init__(self, wsgi_app, threads: int = DEFAULT_THREADS):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='asgi-wsgi')
+        return self._executor
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+        body = SpooledTemporaryFile(max_size=1 << 20)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+        outbox: asyncio.Queue = asyncio.Queue()
+        finished = False
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        def accept(message: Optional[Dict[str, Any]], done: Future) -> None:
+            if finished and message is not None:
+                done.set_exception(ClientDisconnected('Client disconnected'))
+            else:
+                outbox.put_nowait((message, done))
+
+        def deliver(message: Optional[Dict[str, Any]]) -> None:
+            # Called from the pool thread; waits until the loop has sent the
+            # message. None reports that the app has returned.
+            done: Future = Future()
+            loop.call_soon_threadsafe(accept, message, done)
+            if message is not None:
+                done.result()
+
+        watcher = loop.create_task(watch_disconnect())
+        running = loop.run_in_executor(self._pool(), self._run, scope, body, deliver, disconnected)
+        try:
+            # All sends happen on the loop and the coroutine returns as soon
+            # as the last body byte is out: a client on a keep-alive
+            # connection sends its next request then, and some servers drop
+            # it if the app has not returned yet. With a Content-Length that
+            # is when the declared length has been sent, not when the app
+            # gets round to its final empty chunk.
+            remaining = None
+            while True:
+                message, done = await outbox.get()
+                if message is None:
+                    await running
+                    return
+                if message['type'] == 'http.response.start':
+                    length = dict(message['headers']).get(b'content-length')
+                    remaining = 0 if scope['method'] == 'HEAD' else int(length) if length else None
+                elif remaining is not None:
+                    remaining -= len(message['body'])
+                    if remaining <= 0:
+                        message['more_body'] = False
+                try:
+                    await send(message)
+                except BaseException:
+                    done.set_exception(ClientDisconnected('Client disconnected'))
+                    raise
+                done.set_result(None)
+                if message['type'] == 'http.response.body' and not message['more_body']:
+                    return
+        finally:
+            finished = True
+            disconnected.set()
+            watcher.cancel()
+            while not outbox.empty():
+                message, done = outbox.get_nowait()
+                if message is not None:
+                    done.set_exception(ClientDisconnected('Client disconnected'))
+            running.add_done_callback(lambda _: body.close())
+
+    def _run(self, scope, body, deliver, disconnected: threading.Event) -> None:
+        """Call the app in a pool thread, handing its output to ``deliver``"""
+        state: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and state.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            }
+            return lambda data: emit(data, True)
+
+        def emit(data: bytes, more: bool) -> None:
+            if disconnected.is_set():
+                raise ClientDisconnected('Client disconnected')
+            if not state.get('sent'):
+                state['sent'] = True
+                deliver(state['start'])
+            if data or not more:
+                deliver({'type': 'http.response.body', 'body': bytes(data), 'more_body': more})
+
+        try:
+            result = self.wsgi_app(self._environ(scope, body), start_response)
+            try:
+                for chunk in result:
+                    emit(chunk, True)
+                emit(b'', False)
+            except ClientDisconnected:
+                pass
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            deliver(None)
+
+    @staticmethod
+    def _environ(scope: Dict[str, Any], body) -> Dict[str, Any]:
+        """PEP 3333 environ for an ASGI HTTP scope"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1] if server[1] is not None else 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            # Repeated headers are combined, as a WSGI server would
+            environ[name] = f'{environ[name]},{value}' if name in environ else value
+        return environ
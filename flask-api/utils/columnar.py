@@ -0,0 +1,136 @@
+# Columnar binary responses
+import functools
+import json
+import struct
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+from flask import Response, make_response
+
+try:
+    import msgpack
+except ImportError:  # MessagePack output is optional
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow IPC output is optional
+    pa = None
+
+COLUMNAR_MIMETYPE = 'application/vnd.spaceandtravel.columnar'
+FORMATS = {
+    'json': 'application/json',
+    'columnar': COLUMNAR_MIMETYPE,
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+_REQUIRES = {'msgpack': ('msgpack', msgpack), 'arrow': ('pyarrow', pa)}
+
+MAGIC = b'SCOL'
+ALIGNMENT = 8
+
+
+def available_formats() -> List[str]:
+    """Output formats this process can produce, JSON first"""
+    return [fmt for fmt in FORMATS if fmt not in _REQUIRES or _REQUIRES[fmt][1] is not None]
+
+
+def negotiate(request) -> str:
+    """Output format for a request: ``format=`` if given, otherwise the best match for ``Accept``
+
+    JSON wins ties and is the fallback, so browsers and ``*/*`` keep getting JSON.
+    """
+    fmt = request.args.get('format')
+    if fmt is not None:
+        if fmt not in FORMATS:
+            raise ValueError(f"'format' must be one of: {', '.join(FORMATS)}")
+        if fmt not in available_formats():
+            raise ValueError(f"'{fmt}' output needs the {_REQUIRES[fmt][0]} package installed")
+        return fmt
+    offered = [FORMATS[fmt] for fmt in available_formats()]
+    best = request.accept_mimetypes.best_match(offered, default=FORMATS['json'])
+    return next(fmt for fmt, mimetype in FORMATS.items() if mimetype == best)
+
+
+def vary_on_accept(view):
+    """Mark a negotiated view's responses as depending on ``Accept`` for caches"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        response.vary.add('Accept')
+        return response
+    return wrapper
+
+
+def _little_endian(column: np.ndarray) -> np.ndarray:
+    column = np.ascontiguousarray(column)
+    if column.ndim != 1:
+        raise ValueError('columns must be one-dimensional')
+    return column.astype(column.dtype.newbyteorder('<'), copy=False)
+
+
+def _json_bytes(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def encode_columnar(columns: Mapping[str, np.ndarray], header: Optional[Dict[str, Any]] = None) -> List[bytes]:
+    """Columns as ``COLUMNAR_MIMETYPE`` chunks, ready to be sent as a response body
+
+    Layout: ``SCOL``, the JSON header length as a little-endian uint32, the
+    header, then each column's raw little-endian buffer. The data section and
+    every buffer start on an 8-byte boundary, so a client can view them in
+    place (``new Float32Array(body, dataStart + offset, length)``). The header
+    is ``header`` plus ``rows`` and ``columns``, a list of
+    ``{name, dtype, offset, length}`` with numpy dtype strings (``<f4``) and
+    offsets relative to the data section. Buffers are memoryviews of the
+    arrays themselves; nothing is converted per element.
+    """
+    arrays = {name: _little_endian(column) for name, column in columns.items()}
+    rows = {len(column) for column in arrays.values()}
+    if len(rows) > 1:
+        raise ValueError('columns must all have the same length')
+
+    layout = []
+    buffers: List[Any] = []
+    offset = 0
+    for name, column in arrays.items():
+        layout.append({'name': name, 'dtype': column.dtype.str, 'offset': offset, 'length': len(column)})
+        buffers.append(memoryview(column).cast('B'))
+        padding = -column.nbytes % ALIGNMENT
+        if padding:
+            buffers.append(bytes(padding))
+        offset += column.nbytes + padding
+
+    encoded = _json_bytes({**(header or {}), 'rows': rows.pop() if rows else 0, 'columns': layout})
+    prefix = MAGIC + struct.pack('<I', len(encoded)) + encoded
+    return [prefix + bytes(-len(prefix) % ALIGNMENT)] + buffers
+
+
+def encode_msgpack(columns: Mapping[str, np.ndarray], header: Optional[Dict[str, Any]] = None) -> bytes:
+    """``{**header, rows, columns: {name: {dtype, data}}}`` with each column's buffer as a bin field"""
+    arrays = {name: _little_endian(column) for name, column in columns.items()}
+    return msgpack.packb({
+        **(header or {}),
+        'rows': len(next(iter(arrays.values()))) if arrays else 0,
+        'columns': {name: {'dtype': column.dtype.str, 'data': memoryview(column).cast('B')}
+                    for name, column in arrays.items()},
+    })
+
+
+def encode_arrow(columns: Mapping[str, np.ndarray], header: Optional[Dict[str, Any]] = None) -> bytes:
+    """Arrow IPC stream of one record batch; ``header`` is JSON in the schema metadata"""
+    table = pa.table({name: _little_endian(column) for name, column in columns.items()})
+    table = table.replace_schema_metadata({'header': _json_bytes(header or {})})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+_ENCODERS = {'columnar': encode_columnar, 'msgpack': encode_msgpack, 'arrow': encode_arrow}
+
+
+def columnar_response(fmt: str, columns: Mapping[str, np.ndarray], header: Optional[Dict[str, Any]] = None) -> Response:
+    """Binary response in a format returned by ``negotiate`` (anything but ``json``)"""
+    body = _ENCODERS[fmt](columns, header)
+    return Response(body if isinstance(body, list) else [body], mimetype=FORMATS[fmt])
@@ -1 +1,147 @@
-# Helpers 
+# Helpers
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Mapping, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and/or total size in bytes
+
+    With ``ttl`` (seconds) set, entries older than the TTL are treated as
+    misses and dropped when next looked up.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._sizes = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self._expires[key] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            # Values larger than the whole budget are never cached
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            self.current_bytes += size
+            self._evict()
+
+    def _remove(self, key: Hashable) -> None:
+        del self._data[key]
+        self.current_bytes -= self._sizes.pop(key)
+        self._expires.pop(key, None)
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            key, _ = self._data.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+            self._expires.pop(key, None)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> dict:
+        """Counters suitable for health/metrics endpoints"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def float_arg(args: Mapping[str, str], name: str, default: float,
+              minimum: Optional[float] = None, maximum: Optional[float] = None) -> float:
+    """Read a bounded float query parameter, raising ValueError with a client-facing message"""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number") from None
+    if value != value or (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}")
+    return value
+
+
+def int_arg(args: Mapping[str, str], name: str, default: int,
+            minimum: Optional[int] = None, maximum: Optional[int] = None) -> int:
+    """Read a bounded integer query parameter, raising ValueError with a client-facing message"""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer") from None
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}")
+    return value
+
+
+def datetime_arg(args: Mapping[str, str], name: str,
+                 default: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """Read an ISO 8601 timestamp query parameter as an aware UTC datetime (default: now)"""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return default or datetime.datetime.now(datetime.timezone.utc)
+    try:
+        value = datetime.datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 timestamp") from None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
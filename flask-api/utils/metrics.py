@@ -0,0 +1,334 @@
+# Metrics
+import bisect
+import itertools
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, type, help, [(labels, value), ...]) as produced by collectors
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Bucket bounds (seconds) exported to Prometheus; the histograms themselves are much finer
+EXPORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Log-linear (HDR-style) histogram with a fixed number of counters
+
+    Values between ``lowest`` and ``highest`` land in ``sub_buckets``
+    linear buckets per power of two, so any quantile is reported to within
+    1/sub_buckets (about 3% with the default of 32) of the true value, using
+    the same memory whatever the number of observations. Values outside the
+    range are clamped into the first or last bucket; ``max`` stays exact.
+    """
+
+    def __init__(self, lowest: float = 1e-6, highest: float = 1e3, sub_buckets: int = 32):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        octaves = max(1, math.ceil(math.log2(highest / lowest)))
+        # Bucket 0 holds values below lowest; bucket k > 0 covers [upper[k-1], upper[k])
+        self.upper = [lowest] + [lowest * 2.0 ** octave * (1.0 + (j + 1) / sub_buckets)
+                                 for octave in range(octaves) for j in range(sub_buckets)]
+        self.counts = [0] * len(self.upper)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._scale = 1.0 / lowest
+        self._last = len(self.upper) - 1
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        # frexp gives value/lowest = mantissa * 2**exponent with mantissa in [0.5, 1): the exponent picks
+        # the octave and the mantissa the linear sub-bucket inside it
+        mantissa, exponent = math.frexp(value * self._scale)
+        if exponent < 1:
+            index = 0
+        else:
+            index = min((exponent - 1) * self.sub_buckets + int((2.0 * mantissa - 1.0) * self.sub_buckets) + 1,
+                        self._last)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def time(self) -> '_Timer':
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+    def quantiles(self, qs: Sequence[float] = SUMMARY_QUANTILES) -> List[float]:
+        """Upper bounds of the buckets holding each quantile (capped at the exact max); 0 when empty"""
+        with self._lock:
+            counts, total, largest = list(self.counts), self.count, self.max
+        if not total:
+            return [0.0 for _ in qs]
+        cumulative = list(itertools.accumulate(counts))
+        return [min(self.upper[bisect.bisect_left(cumulative, max(1, math.ceil(q * total)))], largest) for q in qs]
+
+    def cumulative(self, bounds: Sequence[float] = EXPORT_BUCKETS) -> List[int]:
+        """Observations below each bound, to bucket precision"""
+        with self._lock:
+            cumulative = list(itertools.accumulate(self.counts))
+        return [cumulative[i - 1] if i else 0 for i in (bisect.bisect_right(self.upper, bound) for bound in bounds)]
+
+    def summary(self, decimals: int = 6) -> Dict[str, Any]:
+        p50, p95, p99 = self.quantiles((0.5, 0.95, 0.99))
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, decimals) if self.count else 0.0,
+            'p50': round(p50, decimals),
+            'p95': round(p95, decimals),
+            'p99': round(p99, decimals),
+            'max': round(self.max, decimals),
+        }
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Stage:
+    """Timer for one stage of an engine, recorded into ``stage_duration_seconds``
+
+    ``with stage.time():`` costs a null context manager while metrics are
+    disabled.
+    """
+
+    __slots__ = ('registry', 'histogram')
+
+    def __init__(self, registry: 'Registry', histogram: Histogram):
+        self.registry = registry
+        self.histogram = histogram
+
+    def time(self):
+        return self.histogram.time() if self.registry.enabled else _NULL_TIMER
+
+
+class CounterMetric:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    parts = [f'{key}="{escape(value)}"' for key, value in labels]
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Registry:
+    """Named histograms and counters plus collectors, rendered in the Prometheus text format
+
+    Metrics are created on first use and identified by name and label set.
+    Collectors are callables returning ``Family`` tuples; they read existing
+    counters (cache stats, queue depths) at scrape time instead of being
+    updated on every event.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._histograms: Dict[str, Tuple[str, Dict[Labels, Histogram]]] = {}
+        self._counters: Dict[str, Tuple[str, Dict[Labels, CounterMetric]]] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Family]]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str, **labels) -> Histogram:
+        key = _labels(labels)
+        _, series = self._histograms.get(name) or (None, {})
+        histogram = series.get(key)
+        if histogram is None:
+            with self._lock:
+                _, series = self._histograms.setdefault(name, (help, {}))
+                histogram = series.setdefault(key, Histogram())
+        return histogram
+
+    def counter(self, name: str, help: str, **labels) -> CounterMetric:
+        key = _labels(labels)
+        _, series = self._counters.get(name) or (None, {})
+        counter = series.get(key)
+        if counter is None:
+            with self._lock:
+                _, series = self._counters.setdefault(name, (help, {}))
+                counter = series.setdefault(key, CounterMetric())
+        return counter
+
+    def stage(self, component: str, stage: str) -> Stage:
+        return Stage(self, self.histogram('stage_duration_seconds', 'Time spent in one stage of an engine',
+                                          component=component, stage=stage))
+
+    def add_collector(self, name: str, collector: Callable[[], Iterable[Family]]) -> None:
+        """Register ``collector`` under ``name``, replacing any earlier one of that name"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def summaries(self, name: str, **match) -> Dict[Labels, Dict[str, Any]]:
+        """``Histogram.summary()`` of each series of ``name`` whose labels include ``match``"""
+        wanted = set(_labels(match))
+        _, series = self._histograms.get(name) or (None, {})
+        return {labels: histogram.summary() for labels, histogram in list(series.items())
+                if wanted <= set(labels) and histogram.count}
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, (help, series) in sorted(self._histograms.items()):
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} histogram']
+            for labels, histogram in sorted(series.items()):
+                for bound, count in zip(EXPORT_BUCKETS, histogram.cumulative()):
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", repr(bound)),))} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum!r}')
+                lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        for name, (help, series) in sorted(self._counters.items()):
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} counter']
+            for labels, counter in sorted(series.items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(counter.value)}')
+        for collector in list(self._collectors.values()):
+            try:
+                families = list(collector())
+            except Exception:
+                continue  # one broken collector must not take the endpoint down
+            for name, kind, help, samples in families:
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f'{name}{_format_labels(_labels(labels))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval into collapsed-stack counts
+
+    Output is one ``thread;outer;...;inner count`` line per distinct stack,
+    the input format of flamegraph.pl and speedscope. Nothing runs until
+    ``start``; sampling stops by itself after ``duration`` seconds. At most
+    ``max_stacks`` distinct stacks are kept, later ones are counted under
+    ``[other]``.
+    """
+
+    def __init__(self, max_stacks: int = 20000):
+        self.max_stacks = max_stacks
+        self.interval = 0.0
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: _Tally = _Tally()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, duration: float = 30.0) -> None:
+        """Start a fresh profile; raises RuntimeError if one is already running"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError('The profiler is already running')
+            self.interval = interval
+            self.samples = 0
+            self.started_at = time.time()
+            self._stacks = _Tally()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval, time.monotonic() + duration),
+                                            name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    @staticmethod
+    def _frame_name(code) -> str:
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    def _run(self, interval: float, deadline: float) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if not names.keys() >= frames.keys():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                parts = []
+                while frame is not None:
+                    parts.append(self._frame_name(frame.f_code))
+                    frame = frame.f_back
+                parts.append(names.get(ident, f'thread-{ident}'))
+                stacks.append(';'.join(reversed(parts)))
+            with self._lock:
+                for stack in stacks:
+                    if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                        stack = '[other]'
+                    self._stacks[stack] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'interval_ms': self.interval * 1000.0,
+            'samples': self.samples,
+            'distinct_stacks': len(self._stacks),
+            'started_at': self.started_at,
+        }
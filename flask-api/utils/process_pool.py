@@ -0,0 +1,73 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+
+class ProcessPool:
+    """Lazily started spawn process pool shared by every request in this process
+
+    The pool is sized by the ``workers`` of the call that starts it; a call
+    asking for a different number of workers replaces it. A worker that dies
+    (killed, out of memory, crashed in native code) breaks the executor for
+    good, so a broken pool is shut down and the next call starts a new one
+    instead of every later call failing until the process restarts.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers = 0
+        self._lock = threading.Lock()
+        self.restarts = 0
+        atexit.register(self.shutdown)
+
+    def _get(self, workers: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is not None and self._workers != workers:
+                # Work already submitted to the old pool still completes
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._executor is None:
+                # spawn rather than fork: the Flask process is multi-threaded
+                self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._workers = workers
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn: Callable[..., Any], workers: int, calls: Iterable[Sequence[Any]]) -> List[Any]:
+        """``fn(*args)`` for every ``args`` in ``calls`` on the pool, results in order
+
+        A pool found broken before any work was submitted (a worker died
+        while idle) is replaced once and the call retried. If it breaks while
+        this call's work runs, the pool is replaced for later calls and
+        BrokenProcessPool is raised, since the work itself may have killed it.
+        """
+        calls = list(calls)
+        executor = self._get(workers)
+        try:
+            futures = [executor.submit(fn, *args) for args in calls]
+        except BrokenProcessPool:
+            # A worker died while the pool sat idle; none of this call's work has run
+            self._discard(executor)
+            executor = self._get(workers)
+            futures = [executor.submit(fn, *args) for args in calls]
+        try:
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
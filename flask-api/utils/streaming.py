@@ -0,0 +1,93 @@
+# Streaming responses
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from flask import Response, stream_with_context
+
+STREAM_FORMATS = ('ndjson', 'json')
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+# (name, decimals); decimals None means integer column
+Field = Tuple[str, Optional[int]]
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+
+def row_formatter(fields: Sequence[Field]) -> Callable[[Mapping[str, np.ndarray]], Iterator[str]]:
+    """Build a function turning one block of columns into JSON object strings, one per row
+
+    Columns are rounded as whole arrays and rendered with a single %-template,
+    which is several times faster than building a dict per row for ``json``.
+    """
+    template = '{' + ','.join(f'"{name}":%s' for name, _ in fields) + '}'
+
+    def format_block(block: Mapping[str, np.ndarray]) -> Iterator[str]:
+        columns = []
+        for name, decimals in fields:
+            values = np.asarray(block[name])
+            if decimals is None:
+                columns.append(values.astype(np.int64).tolist())
+            else:
+                columns.append(values.round(decimals).tolist())
+        return (template % row for row in zip(*columns))
+
+    return format_block
+
+
+def stream_rows(fmt: str, rows_key: str, blocks: Iterable[Mapping[str, np.ndarray]], fields: Sequence[Field],
+                head: Optional[Dict[str, Any]] = None,
+                tail: Optional[Callable[[], Dict[str, Any]]] = None) -> Iterator[str]:
+    """Serialize ``blocks`` of columns as they are produced
+
+    ``json`` produces the same document a buffered response would:
+    ``{**head, rows_key: [...rows], **tail()}``. ``ndjson`` produces ``head``
+    as the first line, one line per row, and ``tail()`` as the last line.
+    ``tail`` is called once every block has been consumed, so it can report
+    totals gathered along the way. Memory use is bounded by one block.
+
+    An error part-way through cannot change the status code any more; it is
+    reported in the body instead (a final ``{"status": "error", ...}`` line
+    or the ``error``/``status`` keys of the JSON document).
+    """
+    format_block = row_formatter(fields)
+    head = head or {}
+    if fmt == 'ndjson':
+        if head:
+            yield _dumps(head) + '\n'
+    else:
+        yield '{' + ''.join(f'{_dumps(key)}:{_dumps(value)},' for key, value in head.items())
+        yield f'{_dumps(rows_key)}:['
+
+    first = True
+    try:
+        for block in blocks:
+            lines = format_block(block)
+            if fmt == 'ndjson':
+                text = '\n'.join(lines)
+                if text:
+                    yield text + '\n'
+            else:
+                text = ','.join(lines)
+                if text:
+                    yield text if first else ',' + text
+                    first = False
+        trailer = tail() if tail else {}
+    except Exception as e:
+        trailer = {'error': f'Simulation error: {str(e)}', 'status': 'error'}
+
+    if fmt == 'ndjson':
+        if trailer:
+            yield _dumps(trailer) + '\n'
+    else:
+        yield ']' + ''.join(f',{_dumps(key)}:{_dumps(value)}' for key, value in trailer.items()) + '}'
+
+
+def stream_response(fmt: str, rows_key: str, blocks: Iterable[Mapping[str, np.ndarray]], fields: Sequence[Field],
+                    head: Optional[Dict[str, Any]] = None,
+                    tail: Optional[Callable[[], Dict[str, Any]]] = None) -> Response:
+    """Chunked response wrapping ``stream_rows``"""
+    return Response(stream_with_context(stream_rows(fmt, rows_key, blocks, fields, head, tail)),
+                    mimetype=MIMETYPES[fmt])
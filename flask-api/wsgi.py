@@ -0,0 +1,7 @@
+"""WSGI entry point
+
+    gunicorn wsgi:app                 # settings from gunicorn.conf.py
+"""
+from app import create_app
+
+app = create_app()
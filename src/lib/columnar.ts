@@ -0,0 +1,52 @@
+// Decoder for the Flask API's columnar binary responses
+// Request with `Accept: application/vnd.spaceandtravel.columnar` (or `?format=columnar`);
+// columns are typed-array views on the response body, no per-point parsing.
+
+export const COLUMNAR_MIMETYPE = 'application/vnd.spaceandtravel.columnar';
+
+export type Column = Float32Array | Float64Array | Int8Array | Int16Array | Int32Array | Uint8Array | Uint16Array | Uint32Array;
+
+interface ColumnLayout { name: string; dtype: string; offset: number; length: number; }
+
+export interface ColumnarPayload<H = Record<string, any>> {
+	header: H & { rows: number; columns: ColumnLayout[] };
+	columns: Record<string, Column>;
+}
+
+const ARRAY_TYPES: Record<string, new (buffer: ArrayBuffer, offset: number, length: number) => Column> = {
+	'<f4': Float32Array,
+	'<f8': Float64Array,
+	'|i1': Int8Array,
+	'<i2': Int16Array,
+	'<i4': Int32Array,
+	'|u1': Uint8Array,
+	'<u2': Uint16Array,
+	'<u4': Uint32Array
+};
+
+export function decodeColumnar<H = Record<string, any>>(body: ArrayBuffer): ColumnarPayload<H> {
+	const view = new DataView(body);
+	const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+	if (magic !== 'SCOL') throw new Error('Not a columnar payload');
+	const headerLength = view.getUint32(4, true);
+	const header = JSON.parse(new TextDecoder().decode(new Uint8Array(body, 8, headerLength)));
+	// Data section starts at the next 8-byte boundary; every buffer inside it is aligned too
+	const dataStart = Math.ceil((8 + headerLength) / 8) * 8;
+
+	const columns: Record<string, Column> = {};
+	for (const column of header.columns as ColumnLayout[]) {
+		const ArrayType = ARRAY_TYPES[column.dtype];
+		if (!ArrayType) throw new Error(`Unsupported column type ${column.dtype} for ${column.name}`);
+		columns[column.name] = new ArrayType(body, dataStart + column.offset, column.length);
+	}
+	return { header, columns };
+}
+
+export async function fetchColumnar<H = Record<string, any>>(url: string): Promise<ColumnarPayload<H>> {
+	const res = await fetch(url, { headers: { Accept: COLUMNAR_MIMETYPE }, cache: 'no-store' });
+	if (!res.ok) {
+		const error = await res.json().catch(() => null);
+		throw new Error(error?.error || `API error ${res.status}`);
+	}
+	return decodeColumnar<H>(await res.arrayBuffer());
+}